@@ -0,0 +1,134 @@
+"""
+Measures the encode and decode throughput of every installed JSON backend of
+integration/clients/serializer.py on the payloads of a synthetic organization:
+Humanitec resource lists and dependency graphs as the clients decode them, and
+Port bulk upsert bodies as they are encoded. The decoded values of every
+backend are compared with the standard library before timing.
+
+The end-to-end effect of a backend or of uvloop is measured by passing
+--json-backend or --event-loop to the exporter through run_benchmark.py.
+
+Example:
+    python benchmarks/json_benchmark.py --apps 10 --resources 500 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "integration"))
+
+from clients.serializer import AVAILABLE, SERIALIZERS, JSONSerializer  # noqa: E402
+from mapping import EntityMapper  # noqa: E402
+from main import BLUEPRINT, RESOURCES_DIR  # noqa: E402
+from synthetic_org import SyntheticOrg  # noqa: E402
+
+
+def build_payloads(
+    org: SyntheticOrg, mapper: EntityMapper, batch_size: int
+) -> Dict[str, List[Any]]:
+    entities = mapper.map_batch(
+        BLUEPRINT.RESOURCE,
+        [
+            {"resource": resource}
+            for resources in org.resources.values()
+            for resource in resources
+        ],
+    )
+    return {
+        "humanitec_resources": list(org.resources.values()),
+        "humanitec_graphs": list(org.graphs.values()),
+        "port_bulk_upserts": [
+            {"entities": entities[start : start + batch_size]}
+            for start in range(0, len(entities), batch_size)
+        ],
+    }
+
+
+def best_of(rounds: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--envs", type=int, default=3)
+    parser.add_argument("--resources", type=int, default=200)
+    parser.add_argument("--graph-nodes", type=int, default=100)
+    parser.add_argument("--payload-bytes", type=int, default=1024)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Best of this many rounds is reported"
+    )
+    parser.add_argument(
+        "--mapping-file", default=os.path.join(RESOURCES_DIR, "mappings.json")
+    )
+    args = parser.parse_args()
+
+    org = SyntheticOrg(
+        apps=args.apps,
+        envs=args.envs,
+        resources=args.resources,
+        graph_nodes=args.graph_nodes,
+        payload_bytes=args.payload_bytes,
+    )
+    payloads = build_payloads(
+        org, EntityMapper.from_file(args.mapping_file), args.batch_size
+    )
+    serializers = [
+        serializer() for name, serializer in SERIALIZERS.items() if AVAILABLE[name]
+    ]
+    reference = JSONSerializer()
+
+    report: Dict[str, Any] = {
+        "org": org.summary(),
+        "backends": [serializer.name for serializer in serializers],
+        "payloads": {},
+    }
+    for payload_name, values in payloads.items():
+        encoded = [reference.dumps(value) for value in values]
+        size = sum(len(body) for body in encoded)
+        results: Dict[str, Any] = {"documents": len(values), "bytes": size}
+        for serializer in serializers:
+            if [serializer.loads(body) for body in encoded] != values:
+                raise SystemExit(
+                    f"{serializer.name} does not decode {payload_name} like the json module"
+                )
+            timings = {
+                "encode": best_of(
+                    args.rounds, lambda: [serializer.dumps(value) for value in values]
+                ),
+                "decode": best_of(
+                    args.rounds, lambda: [serializer.loads(body) for body in encoded]
+                ),
+            }
+            results[serializer.name] = {
+                f"{name}_mb_per_second": round(size / value / 1e6, 1)
+                for name, value in timings.items()
+            }
+        for serializer in serializers:
+            if serializer.name == "json":
+                continue
+            for name in ("encode", "decode"):
+                results[serializer.name][f"{name}_speedup"] = round(
+                    results[serializer.name][f"{name}_mb_per_second"]
+                    / results["json"][f"{name}_mb_per_second"],
+                    2,
+                )
+        report["payloads"][payload_name] = results
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Measures the per-entity cost of building Port entities with the compiled
+mappings of resources/mappings.json, one by one and in batches, against the
+hand-written create_*_entity functions they replaced, which are kept below as
+the reference. The outputs of both are compared before timing.
+
+Example:
+    python benchmarks/mapping_benchmark.py --apps 50 --resources 200 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "integration"))
+
+from mapping import EntityMapper, normalize_title  # noqa: E402
+from main import BLUEPRINT, RESOURCES_DIR  # noqa: E402
+from synthetic_org import SyntheticOrg  # noqa: E402
+
+
+def remove_symbols_and_title_case(input_string: str) -> str:
+    cleaned_string = re.sub(r"[^A-Za-z0-9\s]", " ", input_string)
+    return cleaned_string.title()
+
+
+def legacy_application(context):
+    application = context["application"]
+    return {
+        "identifier": application["id"],
+        "title": remove_symbols_and_title_case(application["name"]),
+        "properties": {"createdAt": application["created_at"]},
+        "relations": {},
+    }
+
+
+def legacy_environment(context):
+    application, environment = context["application"], context["environment"]
+    return {
+        "identifier": f"{application['id']}/{environment['id']}",
+        "title": environment["name"],
+        "properties": {
+            "type": environment["type"],
+            "createdAt": environment["created_at"],
+            "lastDeploymentStatus": environment.get("last_deploy", {}).get("status"),
+            "lastDeploymentDate": environment.get("last_deploy", {}).get("created_at"),
+            "lastDeploymentComment": environment.get("last_deploy", {}).get("comment"),
+        },
+        "relations": {BLUEPRINT.APPLICATION: application["id"]},
+    }
+
+
+def legacy_workload(context):
+    application, environment = context["application"], context["environment"]
+    resource = context["resource"]
+    identifier = f"{application['id']}/{environment['id']}/{resource['res_id'].replace('modules.', '')}"
+    return {
+        "identifier": identifier,
+        "title": remove_symbols_and_title_case(
+            resource["res_id"].replace("modules.", "")
+        ),
+        "properties": {
+            "status": resource["status"],
+            "class": resource["class"],
+            "driverType": resource["driver_type"],
+            "definitionVersionId": resource["def_version_id"],
+            "definitionId": resource["def_id"],
+            "updatedAt": resource["updated_at"],
+            "graphResourceID": resource["gu_res_id"],
+        },
+        "relations": {
+            BLUEPRINT.ENVIRONMENT: f"{application['id']}/{environment['id']}",
+        },
+    }
+
+
+def legacy_resource_graph(context):
+    application, environment = context["application"], context["environment"]
+    graph_data = context["node"]
+    return {
+        "identifier": graph_data["guresid"],
+        "title": remove_symbols_and_title_case(graph_data["def_id"]),
+        "properties": {
+            "type": graph_data["type"],
+            "class": graph_data["class"],
+            "resourceSchema": graph_data["resource_schema"],
+            "resource": graph_data["resource"],
+        },
+        "relations": {
+            BLUEPRINT.RESOURCE_GRAPH: graph_data["depends_on"],
+            BLUEPRINT.ENVIRONMENT: f"{application['id']}/{environment['id']}",
+        },
+    }
+
+
+def legacy_resource(context):
+    resource = context["resource"]
+    workload_id = (
+        resource["res_id"].split(".")[1]
+        if resource["res_id"].split(".")[0].startswith("modules")
+        else ""
+    )
+    entity = {
+        "identifier": f"{resource['app_id']}/{resource['env_id']}/{resource['res_id']}",
+        "title": remove_symbols_and_title_case(resource["def_id"]),
+        "properties": {
+            "type": resource["type"],
+            "class": resource["class"],
+            "resource": resource["resource"],
+            "status": resource["status"],
+            "updateAt": resource["updated_at"],
+            "driverType": resource["driver_type"],
+        },
+        "relations": {},
+    }
+    if "__resourceGraph" in resource:
+        entity["properties"]["resourceGraph"] = resource["__resourceGraph"]
+    if workload_id:
+        entity["relations"][
+            BLUEPRINT.WORKLOAD
+        ] = f"{resource['app_id']}/{resource['env_id']}/{workload_id}"
+    return entity
+
+
+LEGACY: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    BLUEPRINT.APPLICATION: legacy_application,
+    BLUEPRINT.ENVIRONMENT: legacy_environment,
+    BLUEPRINT.WORKLOAD: legacy_workload,
+    BLUEPRINT.RESOURCE_GRAPH: legacy_resource_graph,
+    BLUEPRINT.RESOURCE: legacy_resource,
+}
+
+
+def build_contexts(org: SyntheticOrg) -> Dict[str, List[Dict[str, Any]]]:
+    contexts: Dict[str, List[Dict[str, Any]]] = {
+        blueprint_id: [] for blueprint_id in LEGACY
+    }
+    for application in org.applications:
+        contexts[BLUEPRINT.APPLICATION].append({"application": application})
+        for environment in org.environments[application["id"]]:
+            scope = {"application": application, "environment": environment}
+            contexts[BLUEPRINT.ENVIRONMENT].append(dict(scope))
+            for resource in org.resources[(application["id"], environment["id"])]:
+                contexts[BLUEPRINT.RESOURCE].append({"resource": resource})
+                if resource["type"] == "workload":
+                    contexts[BLUEPRINT.WORKLOAD].append({**scope, "resource": resource})
+            graph_id = environment["last_deploy"]["dependency_graph_id"]
+            for node in org.graphs[graph_id]["nodes"]:
+                contexts[BLUEPRINT.RESOURCE_GRAPH].append({**scope, "node": node})
+    return contexts
+
+
+def best_of(rounds: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(rounds):
+        started_at = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--apps", type=int, default=20)
+    parser.add_argument("--envs", type=int, default=3)
+    parser.add_argument("--resources", type=int, default=100)
+    parser.add_argument("--graph-nodes", type=int, default=40)
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="Best of this many rounds is reported"
+    )
+    parser.add_argument(
+        "--mapping-file", default=os.path.join(RESOURCES_DIR, "mappings.json")
+    )
+    args = parser.parse_args()
+
+    org = SyntheticOrg(
+        apps=args.apps,
+        envs=args.envs,
+        resources=args.resources,
+        graph_nodes=args.graph_nodes,
+    )
+    contexts = build_contexts(org)
+    mapper = EntityMapper.from_file(args.mapping_file)
+
+    report: Dict[str, Any] = {"org": org.summary(), "blueprints": {}}
+    for blueprint_id, blueprint_contexts in contexts.items():
+        legacy = LEGACY[blueprint_id]
+        expected = [legacy(dict(context)) for context in blueprint_contexts]
+        actual = mapper.map_batch(
+            blueprint_id, [dict(context) for context in blueprint_contexts]
+        )
+        if actual != expected:
+            raise SystemExit(
+                f"Compiled mapping of {blueprint_id} differs from the reference implementation"
+            )
+
+        count = len(blueprint_contexts)
+        normalize_title.cache_clear()
+        timings = {
+            "legacy": best_of(
+                args.rounds, lambda: [legacy(context) for context in blueprint_contexts]
+            ),
+            "compiled": best_of(
+                args.rounds,
+                lambda: [
+                    mapper.map(blueprint_id, context) for context in blueprint_contexts
+                ],
+            ),
+            "compiled_batch": best_of(
+                args.rounds, lambda: mapper.map_batch(blueprint_id, blueprint_contexts)
+            ),
+        }
+        report["blueprints"][blueprint_id] = {
+            "entities": count,
+            **{
+                f"{name}_ns_per_entity": round(value / count * 1e9)
+                for name, value in timings.items()
+            },
+            "speedup": round(timings["legacy"] / timings["compiled_batch"], 2),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
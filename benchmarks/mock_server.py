@@ -0,0 +1,296 @@
+"""
+Local stand-in for the Humanitec and Port APIs used by the benchmark.
+
+Both APIs are served by a small asyncio HTTP/1.1 server with keep-alive, each
+on its own port, backed by a SyntheticOrg. Latency, error rate, 429 injection
+and page size are configurable, and request counts per endpoint template can
+be read from GET /__stats on either port.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic_org import SyntheticOrg
+
+REASONS = {200: "OK", 207: "Multi-Status", 304: "Not Modified", 404: "Not Found"}
+
+
+class MockApi:
+    def __init__(
+        self,
+        org: SyntheticOrg,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 0.1,
+        page_size: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.org = org
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.entities: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.counts: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.connections = 0
+        routes: List[Tuple[str, str, str, Callable]] = [
+            ("GET", r"/orgs/[^/]+/apps", "GET apps", self.list_applications),
+            ("GET", r"/orgs/[^/]+/apps/(?P<app>[^/]+)", "GET app", self.get_application),
+            ("GET", r"/orgs/[^/]+/apps/(?P<app>[^/]+)/envs", "GET envs", self.list_environments),
+            ("GET", r"/orgs/[^/]+/apps/(?P<app>[^/]+)/envs/(?P<env>[^/]+)", "GET env", self.get_environment),
+            ("GET", r"/orgs/[^/]+/apps/(?P<app>[^/]+)/envs/(?P<env>[^/]+)/resources", "GET resources", self.list_resources),
+            ("GET", r"/orgs/[^/]+/apps/[^/]+/envs/[^/]+/resources/graphs/(?P<graph>[^/]+)", "GET graph", self.get_graph),
+            ("POST", r"/orgs/[^/]+/apps/[^/]+/envs/[^/]+/resources/graph", "POST resource graph", self.resolve_graph),
+            ("POST", r"/v1/auth/access_token", "POST access token", self.access_token),
+            ("POST", r"/v1/blueprints/(?P<blueprint>[^/]+)/entities", "POST entity", self.upsert_entity),
+            ("POST", r"/v1/blueprints/(?P<blueprint>[^/]+)/entities/bulk", "POST entities bulk", self.upsert_entities),
+            ("POST", r"/v1/blueprints/(?P<blueprint>[^/]+)/entities/search", "POST entities search", self.search_entities),
+            ("DELETE", r"/v1/blueprints/(?P<blueprint>[^/]+)/bulk/entities", "DELETE entities bulk", self.delete_entities),
+        ]
+        self.routes: List[Tuple[str, re.Pattern, str, Callable]] = [
+            (method, re.compile(f"^{pattern}$"), template, handler)
+            for method, pattern, template, handler in routes
+        ]
+
+    def paginate(self, path: str, query: Dict[str, List[str]], items: List[Any]):
+        page_size = int(query.get("per_page", [self.page_size])[0] or 0)
+        if not page_size:
+            return 200, items, {}
+        page = int(query.get("page", ["0"])[0])
+        headers = {}
+        if (page + 1) * page_size < len(items):
+            headers["Link"] = f'<{path}?per_page={page_size}&page={page + 1}>; rel="next"'
+        return 200, items[page * page_size : (page + 1) * page_size], headers
+
+    def list_applications(self, path, query, body):
+        return self.paginate(path, query, self.org.applications)
+
+    def get_application(self, path, query, body, app):
+        for application in self.org.applications:
+            if application["id"] == app:
+                return 200, application, {}
+        return 404, {"message": "application not found"}, {}
+
+    def list_environments(self, path, query, body, app):
+        return self.paginate(path, query, self.org.environments.get(app, []))
+
+    def get_environment(self, path, query, body, app, env):
+        for environment in self.org.environments.get(app, []):
+            if environment["id"] == env:
+                return 200, environment, {}
+        return 404, {"message": "environment not found"}, {}
+
+    def list_resources(self, path, query, body, app, env):
+        return self.paginate(path, query, self.org.resources.get((app, env), []))
+
+    def get_graph(self, path, query, body, graph):
+        if graph not in self.org.graphs:
+            return 404, {"message": "graph not found"}, {}
+        return 200, self.org.graphs[graph], {}
+
+    def resolve_graph(self, path, query, body):
+        return 200, [
+            {
+                "guresid": f"resolved-{item['id']}",
+                "id": item["id"],
+                "type": item["type"],
+                "class": "default",
+                "resource": item.get("resource"),
+                "depends_on": [],
+            }
+            for item in body
+        ], {}
+
+    def access_token(self, path, query, body):
+        return 200, {"ok": True, "accessToken": "benchmark-token", "expiresIn": 3600}, {}
+
+    def store(self, blueprint: str, entity: Dict[str, Any]) -> None:
+        entities = self.entities.setdefault(blueprint, {})
+        current = entities.setdefault(
+            entity["identifier"],
+            {"identifier": entity["identifier"], "properties": {}, "relations": {}},
+        )
+        if "title" in entity:
+            current["title"] = entity["title"]
+        current["properties"].update(entity.get("properties") or {})
+        current["relations"].update(entity.get("relations") or {})
+
+    def upsert_entity(self, path, query, body, blueprint):
+        self.store(blueprint, body)
+        return 200, {"ok": True, "entity": {"identifier": body["identifier"]}}, {}
+
+    def upsert_entities(self, path, query, body, blueprint):
+        for entity in body["entities"]:
+            self.store(blueprint, entity)
+        return 207, {
+            "ok": True,
+            "entities": [
+                {"identifier": entity["identifier"], "index": index, "created": True}
+                for index, entity in enumerate(body["entities"])
+            ],
+            "errors": [],
+        }, {}
+
+    def search_entities(self, path, query, body, blueprint):
+        identifiers = sorted(self.entities.get(blueprint, {}))
+        start = int(body.get("from") or 0)
+        limit = body.get("limit", 1000)
+        page = [
+            self.entities[blueprint][identifier]
+            for identifier in identifiers[start : start + limit]
+        ]
+        if body.get("include") == ["identifier"]:
+            page = [{"identifier": entity["identifier"]} for entity in page]
+        next_cursor = str(start + limit) if start + limit < len(identifiers) else None
+        return 200, {"ok": True, "entities": page, "next": next_cursor}, {}
+
+    def delete_entities(self, path, query, body, blueprint):
+        for identifier in body["entities"]:
+            self.entities.get(blueprint, {}).pop(identifier, None)
+        return 200, {"ok": True}, {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": dict(self.counts),
+            "status_codes": {str(code): count for code, count in self.status_counts.items()},
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            "connections": self.connections,
+            "entities": {blueprint: len(items) for blueprint, items in self.entities.items()},
+        }
+
+    async def dispatch(self, method: str, target: str, body: bytes):
+        url = urlsplit(target)
+        if url.path == "/__stats":
+            return 200, self.stats(), {}
+        if url.path == "/__reset":
+            self.counts.clear()
+            self.status_counts.clear()
+            self.entities.clear()
+            self.bytes_received = self.bytes_sent = self.connections = 0
+            return 200, {"ok": True}, {}
+
+        for route_method, pattern, template, handler in self.routes:
+            if route_method == method and (match := pattern.match(url.path)):
+                break
+        else:
+            return 404, {"message": f"no route for {method} {url.path}"}, {}
+
+        self.counts[template] += 1
+        if self.latency:
+            await asyncio.sleep(self.random.uniform(0.5, 1.5) * self.latency)
+        if self.throttle_rate and self.random.random() < self.throttle_rate:
+            return 429, {"message": "rate limited"}, {"Retry-After": str(self.retry_after)}
+        if self.error_rate and self.random.random() < self.error_rate:
+            return 503, {"message": "injected error"}, {}
+        payload = json.loads(body) if body else None
+        return handler(url.path, parse_qs(url.query), payload, **match.groupdict())
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if headers.get("content-encoding") == "gzip":
+                    body = gzip.decompress(body)
+                self.bytes_received += len(request_line) + len(body)
+
+                status, payload, extra_headers = await self.dispatch(method, target, body)
+                self.status_counts[status] += 1
+                response_body = json.dumps(payload).encode()
+                head = [
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+                    "Content-Type: application/json",
+                    f"Content-Length: {len(response_body)}",
+                ] + [f"{name}: {value}" for name, value in extra_headers.items()]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + response_body)
+                self.bytes_sent += len(response_body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(api: MockApi, humanitec_port: int, port_port: int) -> None:
+    humanitec_server = await asyncio.start_server(api.handle_connection, "127.0.0.1", humanitec_port)
+    port_server = await asyncio.start_server(api.handle_connection, "127.0.0.1", port_port)
+    print(
+        json.dumps(
+            {
+                "humanitec_port": humanitec_server.sockets[0].getsockname()[1],
+                "port_port": port_server.sockets[0].getsockname()[1],
+                "org": api.org.summary(),
+                "started_at": time.time(),
+            }
+        ),
+        flush=True,
+    )
+    async with humanitec_server, port_server:
+        await asyncio.gather(humanitec_server.serve_forever(), port_server.serve_forever())
+
+
+def add_org_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--apps", type=int, default=10)
+    parser.add_argument("--envs", type=int, default=3)
+    parser.add_argument("--resources", type=int, default=20)
+    parser.add_argument("--graph-nodes", type=int, default=20)
+    parser.add_argument("--workloads", type=int, default=3)
+    parser.add_argument("--payload-bytes", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean latency per request in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--server-page-size", type=int, default=0, help="Default page size of Humanitec list endpoints")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_org_arguments(parser)
+    parser.add_argument("--humanitec-port", type=int, default=0)
+    parser.add_argument("--port-port", type=int, default=0)
+    args = parser.parse_args()
+
+    org = SyntheticOrg(
+        apps=args.apps,
+        envs=args.envs,
+        resources=args.resources,
+        graph_nodes=args.graph_nodes,
+        workloads=args.workloads,
+        payload_bytes=args.payload_bytes,
+        seed=args.seed,
+    )
+    api = MockApi(
+        org,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        page_size=args.server_page_size,
+        seed=args.seed,
+    )
+    asyncio.run(serve(api, args.humanitec_port, args.port_port))
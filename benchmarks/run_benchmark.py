@@ -0,0 +1,122 @@
+"""
+Runs HumanitecExporter.sync_all against the local mock APIs and reports wall
+time, request throughput, request counts per endpoint and peak RSS.
+
+Example:
+    python benchmarks/run_benchmark.py --apps 50 --envs 3 --resources 100 \\
+        --latency 0.02 --throttle-rate 0.01 -- --max-concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCHMARKS_DIR), "integration"))
+
+from loguru import logger  # noqa: E402
+from main import HumanitecExporter, build_parser  # noqa: E402
+from mock_server import add_org_arguments  # noqa: E402
+
+
+def start_mock_server(server_args: List[str]) -> tuple[subprocess.Popen, Dict[str, Any]]:
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(BENCHMARKS_DIR, "mock_server.py"), *server_args],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert process.stdout is not None
+    return process, json.loads(process.stdout.readline())
+
+
+def get_server_stats(base_url: str) -> Dict[str, Any]:
+    return httpx.get(f"{base_url}/__stats").json()
+
+
+async def run_exporter(exporter_args: argparse.Namespace) -> HumanitecExporter:
+    exporter = HumanitecExporter(exporter_args)
+    await exporter.sync_all()
+    return exporter
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_org_arguments(parser)
+    parser.add_argument("--output", type=str, default="", help="Write the JSON report to this file")
+    parser.add_argument("--log-level", type=str, default="WARNING")
+    parser.add_argument("exporter_args", nargs=argparse.REMAINDER, help="Arguments passed to the exporter after --")
+    args = parser.parse_args()
+
+    server_args = [
+        f"--{name.replace('_', '-')}={value}"
+        for name, value in vars(args).items()
+        if name not in {"output", "log_level", "exporter_args"}
+    ]
+    process, server = start_mock_server(server_args)
+    humanitec_url = f"http://127.0.0.1:{server['humanitec_port']}"
+    port_url = f"http://127.0.0.1:{server['port_port']}"
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    exporter_args = build_parser().parse_args(
+        [
+            "--org-id", "benchmark",
+            "--api-key", "benchmark",
+            "--api-url", humanitec_url,
+            "--port-client-id", "benchmark",
+            "--port-client-secret", "benchmark",
+            "--port-api-url", f"{port_url}/v1",
+            *[arg for arg in args.exporter_args if arg != "--"],
+        ]
+    )
+
+    try:
+        started_at = time.perf_counter()
+        exporter = asyncio.run(run_exporter(exporter_args))
+        wall_time = time.perf_counter() - started_at
+        humanitec_stats = get_server_stats(humanitec_url)
+    finally:
+        process.terminate()
+        process.wait()
+
+    total_requests = sum(humanitec_stats["requests"].values())
+    report = {
+        "org": server["org"],
+        "exporter_args": exporter_args.__dict__ | {"api_key": "***", "port_client_secret": "***"},
+        "wall_time_seconds": round(wall_time, 3),
+        "requests_total": total_requests,
+        "requests_per_second": round(total_requests / wall_time, 1) if wall_time else 0,
+        "requests_by_endpoint": humanitec_stats["requests"],
+        "status_codes": humanitec_stats["status_codes"],
+        "bytes_received_by_server": humanitec_stats["bytes_received"],
+        "bytes_sent_by_server": humanitec_stats["bytes_sent"],
+        "connections_opened": humanitec_stats["connections"],
+        "entities_in_port": humanitec_stats["entities"],
+        "phases_seconds": exporter.metrics.report()["phases_seconds"],
+        "connection_pools": {
+            "humanitec": exporter.humanitec_pool.summary(),
+            "port": exporter.port_pool.summary(),
+        },
+        # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            / (1024 * 1024 if sys.platform == "darwin" else 1024),
+            1,
+        ),
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import random
+from typing import Any, Dict, List
+
+RESOURCE_TYPES = ["postgres", "redis", "s3", "dns", "k8s-service-account", "config"]
+RESOURCE_CLASSES = ["default", "large", "ha"]
+
+
+class SyntheticOrg:
+    """
+    Deterministic Humanitec organization of apps x envs x resources x graph
+    nodes, generated from a seed. A share of the graph nodes of every app is
+    reused by all of its environments to exercise deduplication by guresid.
+    """
+
+    def __init__(
+        self,
+        apps: int = 10,
+        envs: int = 3,
+        resources: int = 20,
+        graph_nodes: int = 20,
+        workloads: int = 3,
+        payload_bytes: int = 256,
+        seed: int = 42,
+    ) -> None:
+        self.random = random.Random(seed)
+        self.payload = "x" * payload_bytes
+        self.applications: List[Dict[str, Any]] = []
+        self.environments: Dict[str, List[Dict[str, Any]]] = {}
+        self.resources: Dict[tuple, List[Dict[str, Any]]] = {}
+        self.graphs: Dict[str, Dict[str, Any]] = {}
+
+        for app_index in range(apps):
+            app_id = f"app-{app_index}"
+            self.applications.append(
+                {
+                    "id": app_id,
+                    "name": f"Application {app_index}",
+                    "created_at": "2024-01-01T00:00:00Z",
+                }
+            )
+            self.environments[app_id] = []
+            for env_index in range(envs):
+                env_id = f"env-{env_index}"
+                graph_id = f"graph-{app_id}-{env_id}"
+                self.environments[app_id].append(
+                    {
+                        "id": env_id,
+                        "name": f"Environment {env_index}",
+                        "type": ["development", "staging", "production"][env_index % 3],
+                        "created_at": "2024-01-01T00:00:00Z",
+                        "last_deploy": {
+                            "status": "succeeded",
+                            "created_at": "2024-06-01T00:00:00Z",
+                            "comment": f"Deploy {app_id}/{env_id}",
+                            "dependency_graph_id": graph_id,
+                        },
+                    }
+                )
+                self.resources[(app_id, env_id)] = self.build_resources(
+                    app_id, env_id, resources, workloads
+                )
+                self.graphs[graph_id] = {
+                    "id": graph_id,
+                    "nodes": self.build_graph(app_id, env_id, graph_nodes),
+                }
+
+    def build_resources(
+        self, app_id: str, env_id: str, count: int, workloads: int
+    ) -> List[Dict[str, Any]]:
+        resources = []
+        for index in range(count):
+            workload = f"workload-{index % max(1, workloads)}"
+            is_workload = index < workloads
+            resource_type = (
+                "workload" if is_workload else self.random.choice(RESOURCE_TYPES)
+            )
+            res_id = (
+                f"modules.{workload}"
+                if is_workload
+                else f"modules.{workload}.externals.{resource_type}-{index}"
+            )
+            resources.append(
+                {
+                    "app_id": app_id,
+                    "env_id": env_id,
+                    "res_id": res_id,
+                    "gu_res_id": f"{app_id}-{env_id}-{index:08d}",
+                    "type": resource_type,
+                    "class": self.random.choice(RESOURCE_CLASSES),
+                    "def_id": f"{resource_type}-definition",
+                    "def_version_id": f"version-{index % 5}",
+                    "driver_type": f"humanitec/{resource_type}",
+                    "status": "Active",
+                    "updated_at": "2024-06-01T00:00:00Z",
+                    "resource": {"host": f"{res_id}.internal", "blob": self.payload},
+                }
+            )
+        return resources
+
+    def build_graph(self, app_id: str, env_id: str, count: int) -> List[Dict[str, Any]]:
+        shared = count // 4
+        nodes = []
+        for index in range(count):
+            scope = app_id if index < shared else f"{app_id}-{env_id}"
+            candidates = list(range(index + 1, count))
+            depends_on = self.random.sample(candidates, min(2, len(candidates)))
+            nodes.append(
+                {
+                    "guresid": f"{scope}-node-{index}",
+                    "def_id": f"definition-{index % 7}",
+                    "type": self.random.choice(RESOURCE_TYPES),
+                    "class": "default",
+                    "resource_schema": {"type": "object", "properties": {}},
+                    "resource": {"value": self.payload},
+                    "depends_on": [
+                        f"{app_id if dep < shared else f'{app_id}-{env_id}'}-node-{dep}"
+                        for dep in depends_on
+                    ],
+                }
+            )
+        return nodes
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "applications": len(self.applications),
+            "environments": sum(len(envs) for envs in self.environments.values()),
+            "resources": sum(len(items) for items in self.resources.values()),
+            "graph_nodes": sum(len(graph["nodes"]) for graph in self.graphs.values()),
+        }
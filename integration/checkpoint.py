@@ -0,0 +1,232 @@
+import os
+import time
+from typing import Any, Dict, List, Set
+from loguru import logger
+from clients.serializer import JSONSerializer
+
+
+class SyncCheckpoint:
+    """
+    Records the progress of a sync run in a local file, so that a run that dies
+    halfway (runner timeout, Port outage) can be resumed with --resume instead
+    of starting over.
+
+    Progress is tracked per unit: a whole blueprint, or the entities of one
+    blueprint in one environment. A unit is complete once all of its entities
+    were queued and Port acknowledged every one of them, so units with failed
+    or unacknowledged entities are retried on resume. The checkpoint also keeps
+    the hash of every acknowledged entity, which lets a resumed run skip
+    entities it already wrote, and the entities still queued in the writer when
+    it was saved.
+    """
+
+    VERSION = 1
+    # Seconds between two saves when --resume enables checkpoints without an
+    # explicit --checkpoint-interval
+    DEFAULT_INTERVAL = 30.0
+
+    def __init__(
+        self,
+        path: str,
+        scope: Dict[str, Any],
+        serializer: JSONSerializer | None = None,
+    ) -> None:
+        self.path = path
+        # Encodes the file and hashes the entities
+        self.serializer = serializer or JSONSerializer()
+        # The options that select what is synced, a checkpoint is only resumed
+        # by a run that syncs the same entities
+        self.scope = scope
+        self.completed_blueprints: Set[str] = set()
+        self.completed_units: Dict[str, Set[str]] = {}
+        self.acknowledged: Dict[str, Dict[str, str]] = {}
+        self.pending: Dict[str, List[Dict[str, Any]]] = {}
+        self.resumed = False
+        # [entity, number of writes awaiting acknowledgement, unit], entities
+        # are only hashed once acknowledged or saved as pending
+        self.queued: Dict[str, Dict[str, List[Any]]] = {}
+        self.unit_counts: Dict[str, Dict[str, int]] = {}
+        self.closed_blueprints: Set[str] = set()
+        self.closed_units: Dict[str, Set[str]] = {}
+        self.offsets: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {"skipped": 0, "replayed": 0, "saves": 0}
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            logger.info(f"No checkpoint found at {self.path}, running a full sync")
+            return False
+        try:
+            with open(self.path, "rb") as checkpoint_file:
+                data = self.serializer.loads(checkpoint_file.read())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+            return False
+        if data.get("version") != self.VERSION or data.get("scope") != self.scope:
+            logger.warning(
+                f"Ignoring checkpoint {self.path}, it was written by a sync of other entities"
+            )
+            return False
+
+        self.completed_blueprints = set(data["completed_blueprints"])
+        self.completed_units = {
+            blueprint_id: set(units)
+            for blueprint_id, units in data["completed_units"].items()
+        }
+        self.acknowledged = data["acknowledged"]
+        self.pending = data["pending"]
+        self.resumed = True
+        logger.info(
+            f"Resuming from checkpoint {self.path} saved at {data['saved_at']}: "
+            f"completed blueprints {sorted(self.completed_blueprints)}, "
+            f"{sum(len(units) for units in self.completed_units.values())} completed environment units, "
+            f"{sum(len(ids) for ids in self.acknowledged.values())} acknowledged and "
+            f"{sum(len(records) for records in self.pending.values())} pending entities"
+        )
+        return True
+
+    def save(self, queued_entities: Dict[str, List[Dict[str, Any]]]) -> None:
+        """
+        Writes the checkpoint, with the entities that are buffered or in flight
+        in the writer as pending entities.
+        """
+        pending = {
+            blueprint_id: [
+                {
+                    "hash": self.serializer.hash(
+                        self.queued[blueprint_id][entity["identifier"]][0]
+                    ),
+                    "entity": entity,
+                }
+                for entity in entities
+                if entity["identifier"] in self.queued.get(blueprint_id, {})
+            ]
+            for blueprint_id, entities in queued_entities.items()
+            if entities
+        }
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "wb") as checkpoint_file:
+            checkpoint_file.write(
+                self.serializer.dumps(
+                    {
+                        "version": self.VERSION,
+                        "scope": self.scope,
+                        "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                        "completed_blueprints": sorted(self.completed_blueprints),
+                        "completed_units": {
+                            blueprint_id: sorted(units)
+                            for blueprint_id, units in self.completed_units.items()
+                        },
+                        "acknowledged": self.acknowledged,
+                        "pending": pending,
+                    }
+                )
+            )
+        os.replace(temporary_path, self.path)
+        self.stats["saves"] += 1
+        logger.debug(f"Saved checkpoint to {self.path}")
+
+    def remove(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+            logger.info(f"Sync completed, removed checkpoint {self.path}")
+
+    def take_pending(self) -> Dict[str, List[Dict[str, Any]]]:
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def is_complete(self, blueprint_id: str, unit: str | None = None) -> bool:
+        return blueprint_id in self.completed_blueprints or (
+            unit is not None and unit in self.completed_units.get(blueprint_id, set())
+        )
+
+    def is_acknowledged(self, blueprint_id: str, entity: Dict[str, Any]) -> bool:
+        """
+        Whether Port already acknowledged this exact entity in the run that
+        wrote the checkpoint.
+        """
+        previous_hash = self.acknowledged.get(blueprint_id, {}).get(
+            entity["identifier"]
+        )
+        if previous_hash and previous_hash == self.serializer.hash(entity):
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def track(
+        self,
+        blueprint_id: str,
+        entity: Dict[str, Any],
+        unit: str | None = None,
+        writes: int = 1,
+    ) -> None:
+        """
+        Records an entity queued for writing. Entities written in two phases
+        are tracked with two writes and only acknowledged with the second.
+        """
+        queued = self.queued.setdefault(blueprint_id, {})
+        identifier = entity["identifier"]
+        if identifier in queued:
+            queued[identifier][0] = entity
+            queued[identifier][1] += writes
+            return
+        queued[identifier] = [entity, writes, unit]
+        if unit is not None:
+            counts = self.unit_counts.setdefault(blueprint_id, {})
+            counts[unit] = counts.get(unit, 0) + 1
+
+    def close(self, blueprint_id: str, unit: str | None = None) -> None:
+        """
+        Marks that every entity of the unit was queued, it is complete once
+        they are all acknowledged.
+        """
+        if unit is None:
+            self.closed_blueprints.add(blueprint_id)
+        else:
+            self.closed_units.setdefault(blueprint_id, set()).add(unit)
+        self.check_complete(blueprint_id, unit)
+
+    def check_complete(self, blueprint_id: str, unit: str | None) -> None:
+        if unit is not None:
+            if unit in self.closed_units.get(
+                blueprint_id, set()
+            ) and not self.unit_counts.get(blueprint_id, {}).get(unit):
+                self.completed_units.setdefault(blueprint_id, set()).add(unit)
+        if blueprint_id in self.closed_blueprints and not self.queued.get(blueprint_id):
+            self.completed_blueprints.add(blueprint_id)
+
+    def acknowledge(self, blueprint_id: str, identifier: str, entity_hash: str) -> None:
+        self.acknowledged.setdefault(blueprint_id, {})[identifier] = entity_hash
+
+    def update(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Applies the acknowledgements the writer received since the last update.
+        Failed entities stay queued, which keeps their units incomplete.
+        """
+        for blueprint_id, blueprint_results in results.items():
+            upserted = blueprint_results["upserted"]
+            offset = self.offsets.get(blueprint_id, 0)
+            self.offsets[blueprint_id] = len(upserted)
+            queued = self.queued.get(blueprint_id, {})
+            for identifier in upserted[offset:]:
+                if not (record := queued.get(identifier)):
+                    continue
+                record[1] -= 1
+                if record[1] > 0:
+                    continue
+                entity, _, unit = queued.pop(identifier)
+                self.acknowledge(blueprint_id, identifier, self.serializer.hash(entity))
+                if unit is not None:
+                    self.unit_counts[blueprint_id][unit] -= 1
+                    self.check_complete(blueprint_id, unit)
+            self.check_complete(blueprint_id, None)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "resumed": self.resumed,
+            "completed_blueprints": sorted(self.completed_blueprints),
+            **self.stats,
+        }
+
+    def reset(self) -> None:
+        """Forgets the acknowledgements of the writer, whose results were reset."""
+        self.offsets = {}
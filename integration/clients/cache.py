@@ -1,52 +1,106 @@
-import asyncio
-from typing import Dict, Any
+import sys
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List
 
 
-class InMemoryCache:
-    def __init__(self):
-        self.cache = {}
-        self.lock = asyncio.Lock()
+class EnvironmentResources:
+    """
+    Resources of a single environment stored once in a list, with O(1) lookups
+    by gu_res_id and res_id and secondary indexes by type, class and res_id
+    prefix (e.g. "modules") holding positions into that list.
+    """
 
-    async def set(self, key, data):
-        """
-        Sets or updates a cache entry with the given key.
+    __slots__ = (
+        "resources",
+        "by_gu_res_id",
+        "by_res_id",
+        "by_type",
+        "by_class",
+        "by_prefix",
+    )
 
-        Parameters:
-        - key (str): The key to use for the cache entry.
-        - data (dict): The data to be cached.
-        """
-        async with self.lock:
-            if key in self.cache:
-                self.cache[key].update(data)
-            else:
-                self.cache[key] = data
-            return True
-
-    async def get(self, key) -> Dict[str, Any]:
-        """
-        Retrieves cached data using the given key.
+    INTERNED_FIELDS = (
+        "app_id",
+        "env_id",
+        "type",
+        "class",
+        "status",
+        "driver_type",
+        "def_id",
+        "def_version_id",
+    )
 
-        Parameters:
-        - key (str): The key to retrieve from the cache.
+    def __init__(self, resources: Iterable[Dict[str, Any]] = ()) -> None:
+        self.resources: List[Dict[str, Any]] = []
+        self.by_gu_res_id: Dict[str, int] = {}
+        self.by_res_id: Dict[str, int] = {}
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_class: Dict[str, List[int]] = {}
+        self.by_prefix: Dict[str, List[int]] = {}
+        for resource in resources:
+            self.add(resource)
 
-        Returns:
-        - dict: The cached data associated with the key, or None if not found.
-        """
-        async with self.lock:
-            return self.cache.get(key, {})
+    def __len__(self) -> int:
+        return len(self.resources)
 
-    async def delete(self, key):
-        """
-        Deletes cached data associated with the given key.
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.resources)
 
-        Parameters:
-        - key (str): The key to delete from the cache.
+    @classmethod
+    def compact(cls, resource: Dict[str, Any]) -> Dict[str, Any]:
+        # Types, classes, drivers and ids repeat across hundreds of thousands of
+        # resources, interning them keeps a single copy of each string
+        for field in cls.INTERNED_FIELDS:
+            value = resource.get(field)
+            if isinstance(value, str):
+                resource[field] = sys.intern(value)
+        return resource
 
-        Returns:
-        - bool: True if deletion was successful, False otherwise (key not found).
+    def add(self, resource: Dict[str, Any]) -> None:
+        position = len(self.resources)
+        self.resources.append(self.compact(resource))
+        self.by_gu_res_id[resource["gu_res_id"]] = position
+        self.by_res_id[resource["res_id"]] = position
+        self.by_type.setdefault(resource.get("type", ""), []).append(position)
+        self.by_class.setdefault(resource.get("class", ""), []).append(position)
+        prefix = sys.intern(resource["res_id"].split(".", 1)[0])
+        self.by_prefix.setdefault(prefix, []).append(position)
+
+    def get(self, gu_res_id: str) -> Dict[str, Any] | None:
+        position = self.by_gu_res_id.get(gu_res_id)
+        return None if position is None else self.resources[position]
+
+    def get_by_res_id(self, res_id: str) -> Dict[str, Any] | None:
+        position = self.by_res_id.get(res_id)
+        return None if position is None else self.resources[position]
+
+    def find(
+        self,
+        resource_type: str | None = None,
+        resource_class: str | None = None,
+        prefix: str | None = None,
+        start: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Resources matching all the given criteria, in the order they were
+        added. Only resources added at position start or later are considered,
+        so that a caller adding pages can select the resources of the last page.
         """
-        async with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                return True
-            return False
+        selected = []
+        for index, key in (
+            (self.by_type, resource_type),
+            (self.by_class, resource_class),
+            (self.by_prefix, prefix),
+        ):
+            if key is not None:
+                positions = index.get(key, [])
+                selected.append(positions[bisect_left(positions, start) :])
+        if not selected:
+            return self.resources[start:]
+        selected.sort(key=len)
+        others = [set(positions) for positions in selected[1:]]
+        return [
+            self.resources[position]
+            for position in selected[0]
+            if all(position in positions for positions in others)
+        ]
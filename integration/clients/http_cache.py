@@ -0,0 +1,200 @@
+import re
+import sqlite3
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Tuple
+from .serializer import JSONSerializer
+
+
+class CacheBackend(ABC):
+    """
+    Storage interface used by HumanitecClient to persist GET responses between
+    runs. Entries are dicts with the keys data, next_url, etag, last_modified
+    and expires_at (None for entries that never expire).
+    """
+
+    def __init__(self) -> None:
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stores": 0,
+            "evictions": 0,
+        }
+
+    @abstractmethod
+    def get(self, key: str) -> Dict[str, Any] | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Stores zlib-compressed JSON responses in a local SQLite database and evicts
+    the least recently used entries once the total payload size exceeds
+    max_bytes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        serializer: JSONSerializer | None = None,
+    ) -> None:
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.serializer = serializer or JSONSerializer()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                next_url TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """)
+        self.connection.commit()
+        self.total_size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        row = self.connection.execute(
+            "SELECT body, next_url, etag, last_modified, expires_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        self.connection.execute(
+            "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+        )
+        body, next_url, etag, last_modified, expires_at = row
+        return {
+            "data": self.serializer.loads(zlib.decompress(body)),
+            "next_url": next_url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+        }
+
+    def set(self, key: str, entry: Dict[str, Any]) -> None:
+        body = zlib.compress(self.serializer.dumps(entry["data"]))
+        previous = self.connection.execute(
+            "SELECT size FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        self.connection.execute(
+            """
+            INSERT OR REPLACE INTO responses
+                (key, body, next_url, etag, last_modified, expires_at, size, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                key,
+                body,
+                entry.get("next_url"),
+                entry.get("etag"),
+                entry.get("last_modified"),
+                entry.get("expires_at"),
+                len(body),
+                time.time(),
+            ),
+        )
+        self.total_size += len(body) - (previous[0] if previous else 0)
+        self.stats["stores"] += 1
+        self.evict()
+        self.connection.commit()
+
+    def delete_prefix(self, prefix: str) -> None:
+        condition = "substr(key, 1, ?) = ?"
+        self.total_size -= self.connection.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM responses WHERE {condition}",
+            (len(prefix), prefix),
+        ).fetchone()[0]
+        self.connection.execute(
+            f"DELETE FROM responses WHERE {condition}", (len(prefix), prefix)
+        )
+        self.connection.commit()
+
+    def evict(self) -> None:
+        while self.total_size > self.max_bytes:
+            row = self.connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.total_size -= row[1]
+            self.stats["evictions"] += 1
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+
+class CachePolicy:
+    """
+    Maps Humanitec endpoints to a time to live in seconds. A TTL of None caches
+    the response forever, which is used for dependency graphs since they are
+    addressed by an immutable dependency_graph_id.
+    """
+
+    ENDPOINTS: List[Tuple[str, re.Pattern]] = [
+        ("graphs", re.compile(r"^apps/[^/]+/envs/[^/]+/resources/graphs/[^/]+$")),
+        ("resources", re.compile(r"^apps/[^/]+/envs/[^/]+/resources$")),
+        ("envs", re.compile(r"^apps/[^/]+/envs$")),
+        ("apps", re.compile(r"^apps$")),
+    ]
+    DEFAULT_TTLS: Dict[str, float | None] = {
+        "apps": 300,
+        "envs": 300,
+        "resources": 60,
+        "graphs": None,
+    }
+
+    def __init__(self, ttls: Dict[str, float | None] | None = None) -> None:
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+
+    @staticmethod
+    def parse_ttls(value: str) -> Dict[str, float | None]:
+        """
+        Parses a comma separated list such as "apps=600,resources=0,graphs=forever".
+        """
+        ttls: Dict[str, float | None] = {}
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            name, _, ttl = item.partition("=")
+            ttls[name.strip()] = None if ttl.strip() == "forever" else float(ttl)
+        return ttls
+
+    def get_endpoint_name(self, endpoint: str) -> str | None:
+        path = endpoint.split("?", 1)[0]
+        for name, pattern in self.ENDPOINTS:
+            if pattern.match(path):
+                return name
+        return None
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self.get_endpoint_name(endpoint) is not None
+
+    def get_expires_at(self, endpoint: str) -> float | None:
+        ttl = self.ttls.get(self.get_endpoint_name(endpoint) or "", 0)
+        return None if ttl is None else time.time() + ttl
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any]) -> bool:
+        return entry["expires_at"] is None or entry["expires_at"] > time.time()
@@ -0,0 +1,138 @@
+import httpx
+from typing import Any, AsyncIterator, Callable, Dict, Tuple
+from loguru import logger
+
+try:
+    import h2  # type: ignore  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    """
+    Response body wrapper that reports when the response is closed, which is
+    when its connection goes back to the pool.
+    """
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self.stream = stream
+        self.on_close = on_close
+        self.closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self.stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self.stream.aclose()
+        finally:
+            if not self.closed:
+                self.closed = True
+                self.on_close()
+
+
+class PoolStatsTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a connection pool transport and keeps track of requests waiting for
+    a connection, requests in flight and connections opened, using the
+    httpcore trace extension.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "connections_opened": 0,
+            "peak_waiting": 0,
+            "peak_in_flight": 0,
+            "pool_timeouts": 0,
+            "http_versions": {},
+        }
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats["requests"] += 1
+        self.waiting += 1
+        self.stats["peak_waiting"] = max(self.stats["peak_waiting"], self.waiting)
+        state = {"waiting": True}
+        parent_trace = request.extensions.get("trace")
+
+        def stop_waiting() -> None:
+            if state["waiting"]:
+                state["waiting"] = False
+                self.waiting -= 1
+
+        async def trace(event_name: str, info: Dict[str, Any]) -> None:
+            if event_name == "connection.connect_tcp.complete":
+                self.stats["connections_opened"] += 1
+            elif event_name.endswith(".send_request_headers.started"):
+                # The pool handed out a connection and the request is on the wire
+                stop_waiting()
+            if parent_trace:
+                await parent_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        self.in_flight += 1
+        self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+
+        def release() -> None:
+            stop_waiting()
+            self.in_flight -= 1
+
+        try:
+            response = await self.transport.handle_async_request(request)
+        except httpx.PoolTimeout:
+            self.stats["pool_timeouts"] += 1
+            release()
+            raise
+        except BaseException:
+            release()
+            raise
+
+        http_version = (
+            response.extensions.get("http_version", b"").decode() or "unknown"
+        )
+        versions = self.stats["http_versions"]
+        versions[http_version] = versions.get(http_version, 0) + 1
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=TrackedStream(response.stream, release),  # type: ignore[arg-type]
+            extensions=response.extensions,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {**self.stats, "waiting": self.waiting, "in_flight": self.in_flight}
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def create_http_client(
+    max_connections: int,
+    max_keepalive_connections: int | None = None,
+    keepalive_expiry: float = 5.0,
+    http2: bool = False,
+    pool_timeout: float = 10.0,
+) -> Tuple[httpx.AsyncClient, PoolStatsTransport]:
+    """
+    Builds a client with its own connection pool for a single API host, along
+    with the transport that exposes the statistics of that pool.
+    """
+    if http2 and not HTTP2_AVAILABLE:
+        logger.warning("HTTP/2 requires the h2 package, falling back to HTTP/1.1")
+        http2 = False
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections or max_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    timeout = httpx.Timeout(
+        10.0, connect=10.0, read=20.0, write=10.0, pool=pool_timeout
+    )
+    transport = PoolStatsTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2))
+    return httpx.AsyncClient(transport=transport, timeout=timeout), transport
@@ -1,16 +1,12 @@
 import httpx
 import asyncio
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, List, Tuple
 import datetime
 import re
 from loguru import logger
-from .cache import InMemoryCache
-
-
-class CACHE_KEYS:
-    APPLICATION = "APPLICATION_CACHE_KEY"
-    ENVIRONMENT = "ENVIRONMENT_CACHE_KEY"
-    RESOURCE = "RESOURCE_CACHE_KEY"
+from .http_cache import CacheBackend, CachePolicy
+from .request_executor import RequestExecutor
+from .serializer import JSONSerializer
 
 
 class HumanitecClient:
@@ -20,7 +16,16 @@ class HumanitecClient:
             f"{kwargs.get('base_url','https://api.humanitec.io')}/orgs/{org_id}/"
         )
         self.api_token = api_token
-        self.cache = InMemoryCache()
+        self.request_executor: RequestExecutor = kwargs.get(
+            "request_executor"
+        ) or RequestExecutor(self.client)
+        # Listing failures are logged and swallowed, this lets callers tell a
+        # partial crawl apart from an empty organization
+        self.failed_requests: List[str] = []
+        self.http_cache: CacheBackend | None = kwargs.get("http_cache")
+        self.cache_policy: CachePolicy = kwargs.get("cache_policy", CachePolicy())
+        self.page_size: int | None = kwargs.get("page_size")
+        self.serializer: JSONSerializer = kwargs.get("serializer") or JSONSerializer()
         self.port_headers = None
 
     def get_humanitec_headers(self) -> Dict[str, str]:
@@ -36,15 +41,23 @@ class HumanitecClient:
         endpoint: str,
         headers: Dict[str, str] | None = None,
         json: Dict[str, Any] | List[Dict[str, Any]] | None = None,
+        idempotent: bool | None = None,
     ) -> Any:
         url = self.base_url + endpoint
+        if method == "GET":
+            data, _ = await self.send_get_request(url, endpoint, headers)
+            return data
         try:
             logger.debug(f"Requesting Humanitec data for endpoint: {endpoint}")
-            response = await self.client.request(
-                method, url, headers=headers, json=json
+            response = await self.request_executor.request(
+                method,
+                url,
+                idempotent=idempotent,
+                headers=headers,
+                content=self.serializer.dumps(json) if json is not None else None,
             )
             response.raise_for_status()
-            return response.json()
+            return self.serializer.loads(response.content)
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error occurred: {e.response.text}")
             raise
@@ -52,97 +65,179 @@ class HumanitecClient:
             logger.error(f"An error occurred: {str(e)}")
             raise
 
-    async def get_all_applications(self) -> List[Dict[str, Any]]:
-        if cached_applications := await self.cache.get(CACHE_KEYS.APPLICATION):
-            logger.info(f"Retrieved {len(cached_applications)} applications from cache")
-            return list(cached_applications.values())
-
-        endpoint = "apps"
-        humanitec_headers = self.get_humanitec_headers()
-        applications: List[Dict[str, Any]] = await self.send_api_request(
-            "GET", endpoint, headers=humanitec_headers
-        )
+    @staticmethod
+    def get_next_url(response: httpx.Response) -> str | None:
+        if next_link := response.links.get("next", {}).get("url"):
+            return str(response.url.join(next_link))
+        return None
 
-        await self.cache.set(
-            CACHE_KEYS.APPLICATION, {app["id"]: app for app in applications}
+    async def send_get_request(
+        self, url: str, endpoint: str, headers: Dict[str, str] | None = None
+    ) -> Tuple[Any, str | None]:
+        """
+        Sends a GET request and returns the decoded body along with the URL of
+        the next page from the Link header, if any. Cacheable endpoints are
+        served from the persistent HTTP cache while they are fresh, and expired
+        entries are revalidated with If-None-Match / If-Modified-Since.
+        """
+        http_cache = (
+            self.http_cache if self.cache_policy.is_cacheable(endpoint) else None
         )
-        logger.info(f"Received {len(applications)} applications from Humanitec")
+        entry = http_cache.get(url) if http_cache else None
+        if http_cache and entry and self.cache_policy.is_fresh(entry):
+            http_cache.stats["hits"] += 1
+            logger.debug(f"Serving Humanitec endpoint {endpoint} from the HTTP cache")
+            return entry["data"], entry.get("next_url")
 
-        return applications
-
-    async def get_all_environments(self, app) -> List[Dict[str, Any]]:
+        request_headers = dict(headers or {})
+        if entry and entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
 
         try:
-            if cached_environments := await self.cache.get(CACHE_KEYS.ENVIRONMENT):
-                if app_environments := cached_environments.get(app["id"]):
-                    logger.info(
-                        f"Retrieved {len(app_environments)} environment for {app['id']} from cache"
-                    )
-                    return list(app_environments.values())
-
-            logger.info("Fetching environments from Humanitec")
-
-            endpoint = f"apps/{app['id']}/envs"
-            humanitec_headers = self.get_humanitec_headers()
-            environments: List[Dict[str, Any]] = await self.send_api_request(
-                "GET", endpoint, headers=humanitec_headers
+            logger.debug(f"Requesting Humanitec data for endpoint: {endpoint}")
+            response = await self.request_executor.request(
+                "GET", url, headers=request_headers
             )
-            await self.cache.set(
-                CACHE_KEYS.ENVIRONMENT,
+            if http_cache and entry and response.status_code == 304:
+                http_cache.stats["revalidated"] += 1
+                entry["expires_at"] = self.cache_policy.get_expires_at(endpoint)
+                http_cache.set(url, entry)
+                return entry["data"], entry.get("next_url")
+            response.raise_for_status()
+            data = self.serializer.loads(response.content)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error occurred: {e.response.text}")
+            raise
+        except Exception as e:
+            logger.error(f"An error occurred: {str(e)}")
+            raise
+
+        next_url = self.get_next_url(response)
+        if http_cache:
+            http_cache.stats["misses"] += 1
+            http_cache.set(
+                url,
                 {
-                    app["id"]: {
-                        environment["id"]: environment for environment in environments
-                    }
+                    "data": data,
+                    "next_url": next_url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "expires_at": self.cache_policy.get_expires_at(endpoint),
                 },
             )
-            logger.info(f"Received {len(environments)} environments from Humanitec")
-            return environments
+        return data, next_url
+
+    async def iter_pages(self, endpoint: str) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Follows the Link rel="next" pagination of a list endpoint and yields
+        every page as soon as it is received.
+        """
+        next_url: str | None = self.base_url + endpoint
+        if self.page_size:
+            next_url = f"{next_url}?per_page={self.page_size}"
+        humanitec_headers = self.get_humanitec_headers()
+        while next_url:
+            page, next_url = await self.send_get_request(
+                next_url, endpoint, humanitec_headers
+            )
+            yield page
+
+    async def iter_applications(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        count = 0
+        async for page in self.iter_pages("apps"):
+            count += len(page)
+            yield page
+        logger.info(f"Received {count} applications from Humanitec")
+
+    async def iter_environments(self, app) -> AsyncIterator[List[Dict[str, Any]]]:
+        logger.info("Fetching environments from Humanitec")
+        count = 0
+        try:
+            async for page in self.iter_pages(f"apps/{app['id']}/envs"):
+                count += len(page)
+                yield page
         except Exception as e:
             logger.error(f"Failed to fetch environments from {app['id']}: {str(e)}")
-            return []
+            self.failed_requests.append(f"apps/{app['id']}/envs")
+            return
+        logger.info(f"Received {count} environments from Humanitec")
 
-    async def get_all_resources(self, app, env) -> List[Dict[str, Any]]:
+    async def iter_resources(self, app, env) -> AsyncIterator[List[Dict[str, Any]]]:
+        logger.info("Fetching resources from Humanitec")
+        count = 0
         try:
-            if cached_resources := await self.cache.get(CACHE_KEYS.RESOURCE):
-                if env_resources := cached_resources.get(app["id"], {}).get(
-                    env["id"]
-                ):
-                    logger.info(
-                        f"Retrieved {len(env_resources)} resources from cache for app {app['id']} and env {env['id']}"
-                    )
-                    return list(env_resources.values())
-
-            logger.info("Fetching resources from Humanitec")
-            endpoint = f"apps/{app['id']}/envs/{env['id']}/resources"
-            humanitec_headers = self.get_humanitec_headers()
-            resources: List[Dict[str, Any]] = await self.send_api_request(
-                "GET", endpoint, headers=humanitec_headers
-            )
-            await self.cache.set(
-                CACHE_KEYS.RESOURCE,
-                {
-                    app["id"]: {
-                        env["id"]: {
-                            resource["gu_res_id"]: resource for resource in resources
-                        }
-                    }
-                },
-            )
-            logger.info(
-                f"Received {len(resources)} resources for {env['id']} environment in {app['id']}"
-            )
-            return resources
+            async for page in self.iter_pages(
+                f"apps/{app['id']}/envs/{env['id']}/resources"
+            ):
+                count += len(page)
+                yield page
         except Exception as e:
             logger.error(
-                f"Failed to fetch resources for {env['id']} environment in {app[id]}: {str(e)}"
+                f"Failed to fetch resources for {env['id']} environment in {app['id']}: {str(e)}"
             )
-            return []
+            self.failed_requests.append(f"apps/{app['id']}/envs/{env['id']}/resources")
+            return
+        logger.info(
+            f"Received {count} resources for {env['id']} environment in {app['id']}"
+        )
+
+    async def get_application(self, app_id: str) -> Dict[str, Any]:
+        return await self.send_api_request(
+            "GET", f"apps/{app_id}", headers=self.get_humanitec_headers()
+        )
+
+    async def get_environment(self, app_id: str, env_id: str) -> Dict[str, Any]:
+        return await self.send_api_request(
+            "GET", f"apps/{app_id}/envs/{env_id}", headers=self.get_humanitec_headers()
+        )
+
+    def invalidate_environment(self, app_id: str, env_id: str) -> None:
+        """
+        Drops the resources of an environment from the HTTP cache, so that they
+        are fetched again after a deployment.
+        """
+        if self.http_cache:
+            self.http_cache.delete_prefix(
+                f"{self.base_url}apps/{app_id}/envs/{env_id}/resources"
+            )
+
+    def reset(self) -> None:
+        """
+        Forgets the failed requests of the previous crawl, used before every
+        crawl of a long-running process.
+        """
+        self.failed_requests = []
+
+    async def get_all_applications(self) -> List[Dict[str, Any]]:
+        return [
+            application
+            async for page in self.iter_applications()
+            for application in page
+        ]
+
+    async def get_all_environments(self, app) -> List[Dict[str, Any]]:
+        return [
+            environment
+            async for page in self.iter_environments(app)
+            for environment in page
+        ]
+
+    async def get_all_resources(self, app, env) -> List[Dict[str, Any]]:
+        return [
+            resource
+            async for page in self.iter_resources(app, env)
+            for resource in page
+        ]
 
     async def get_dependency_graph(
         self, app: Dict[str, Any], env: Dict[str, Any]
     ) -> List[Dict[str, Any]]:
         try:
-            if dependency_graph_id := env.get("last_deploy", {}).get("dependency_graph_id"):
+            if dependency_graph_id := env.get("last_deploy", {}).get(
+                "dependency_graph_id"
+            ):
                 endpoint = f"apps/{app['id']}/envs/{env['id']}/resources/graphs/{dependency_graph_id}"
                 humanitec_headers = self.get_humanitec_headers()
                 graph = await self.send_api_request(
@@ -162,6 +257,9 @@ class HumanitecClient:
             logger.error(
                 f"Failed to fetch dependency graphs for {env['id']} environment in {app['id']}: {str(e)}"
             )
+            self.failed_requests.append(
+                f"apps/{app['id']}/envs/{env['id']}/resources/graphs"
+            )
             return []
 
     async def get_resource_graph(
@@ -169,18 +267,8 @@ class HumanitecClient:
     ) -> Any:
         endpoint = f"apps/{app['id']}/envs/{env['id']}/resources/graph"
         humanitec_headers = self.get_humanitec_headers()
+        # Resolving a resource graph does not change any state, so it is safe to retry
         graph = await self.send_api_request(
-            "POST", endpoint, headers=humanitec_headers, json=data
+            "POST", endpoint, headers=humanitec_headers, json=data, idempotent=True
         )
         return graph
-
-    def group_resources_by_type(
-        self, data: List[Dict[str, Any]]
-    ) -> Dict[str, List[Dict[str, Any]]]:
-        grouped_resources: dict[str, Any] = {}
-        for resource in data:
-            workload_id = resource["res_id"].split(".")[0]
-            if workload_id not in grouped_resources:
-                grouped_resources[workload_id] = []
-            grouped_resources[workload_id].append(resource)
-        return grouped_resources
@@ -1,7 +1,69 @@
+import asyncio
+import gzip
+import time
 import httpx
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Set
 from loguru import logger
-from typing import Dict
+from .request_executor import RequestExecutor
+from .serializer import JSONSerializer
+
+
+class PortTokenManager:
+    """
+    Caches the Port access token and refreshes it shortly before it expires.
+
+    Concurrent callers share a single in-flight token request, so a burst of
+    upserts fired through asyncio.gather results in one call to the auth endpoint.
+    """
+
+    def __init__(
+        self,
+        fetch_token: Callable[[], Awaitable[Dict[str, Any]]],
+        refresh_margin: float = 60.0,
+    ) -> None:
+        self.fetch_token = fetch_token
+        self.refresh_margin = refresh_margin
+        self.access_token: str | None = None
+        self.expires_at = 0.0
+        self.lock = asyncio.Lock()
+        self.stats = {"token_requests": 0, "cache_hits": 0, "unauthorized_retries": 0}
+
+    def is_valid(self) -> bool:
+        return bool(self.access_token) and time.monotonic() < (
+            self.expires_at - self.refresh_margin
+        )
+
+    async def get_token(self) -> str:
+        if self.is_valid():
+            self.stats["cache_hits"] += 1
+            return self.access_token  # type: ignore[return-value]
+
+        async with self.lock:
+            # Another coroutine may have refreshed the token while we waited
+            if self.is_valid():
+                self.stats["cache_hits"] += 1
+                return self.access_token  # type: ignore[return-value]
+
+            self.stats["token_requests"] += 1
+            response = await self.fetch_token()
+            self.access_token = response["accessToken"]
+            # Port returns the token lifetime in seconds, default to one hour otherwise
+            self.expires_at = time.monotonic() + float(response.get("expiresIn", 3600))
+            logger.info("Retrieved a new Port access token")
+            return self.access_token  # type: ignore[return-value]
+
+    def invalidate(self, access_token: str) -> None:
+        """
+        Drops the cached token if it is still the one that was rejected, so that
+        a burst of 401 responses triggers a single refresh.
+        """
+        if self.access_token == access_token:
+            self.access_token = None
+            self.expires_at = 0.0
+
+
+# Smaller request bodies are sent uncompressed, gzip would barely shrink them
+COMPRESSION_MIN_BYTES = 1024
 
 
 class PortClient:
@@ -10,14 +72,26 @@ class PortClient:
         self.client_id = client_id
         self.client_secret = client_secret
         self.base_url = kwargs.get("base_url", "https://api.getport.io/v1")
-        self.port_headers = None
+        self.request_executor: RequestExecutor = kwargs.get(
+            "request_executor"
+        ) or RequestExecutor(self.httpx_async_client)
+        self.token_manager = PortTokenManager(
+            self.request_access_token,
+            refresh_margin=kwargs.get("token_refresh_margin", 60.0),
+        )
+        self.serializer: JSONSerializer = kwargs.get("serializer") or JSONSerializer()
+        self.compress_requests: bool = kwargs.get("compress_requests", False)
+        self.compression_stats = {"requests": 0, "bytes": 0, "compressed_bytes": 0}
 
-    async def get_port_access_token(self) -> str:
+    async def request_access_token(self) -> Dict[str, Any]:
         credentials = {"clientId": self.client_id, "clientSecret": self.client_secret}
         endpoint = f"/auth/access_token"
-        response = await self.send_api_request("POST", endpoint, json=credentials)
-        access_token = response["accessToken"]
-        return access_token
+        return await self.send_api_request(
+            "POST", endpoint, json=credentials, idempotent=True
+        )
+
+    async def get_port_access_token(self) -> str:
+        return await self.token_manager.get_token()
 
     async def get_port_headers(self) -> Dict[str, str]:
         access_token = await self.get_port_access_token()
@@ -30,30 +104,297 @@ class PortClient:
         endpoint: str,
         headers: Dict[str, str] | None = None,
         json: Dict[str, Any] | None = None,
+        idempotent: bool | None = None,
     ) -> Dict[str, Any]:
         url = f"{self.base_url}{endpoint}"
+        content = None
+        if json is not None:
+            content = self.serializer.dumps(json)
+            headers = {**(headers or {}), "Content-Type": "application/json"}
+            if self.compress_requests and len(content) >= COMPRESSION_MIN_BYTES:
+                compressed = gzip.compress(content)
+                headers["Content-Encoding"] = "gzip"
+                self.compression_stats["requests"] += 1
+                self.compression_stats["bytes"] += len(content)
+                self.compression_stats["compressed_bytes"] += len(compressed)
+                content = compressed
         try:
-            response = await self.httpx_async_client.request(
-                method, url, headers=headers, json=json
+            response = await self.request_executor.request(
+                method, url, idempotent=idempotent, headers=headers, content=content
             )
             response.raise_for_status()
-            return response.json()
+            return self.serializer.loads(response.content)
         except httpx.HTTPStatusError as e:
+            if e.response.status_code == 415 and "Content-Encoding" in (headers or {}):
+                logger.warning(
+                    f"Port does not accept compressed requests on {endpoint}, sending them uncompressed"
+                )
+                self.compress_requests = False
+                headers = {
+                    key: value
+                    for key, value in (headers or {}).items()
+                    if key not in ("Content-Type", "Content-Encoding")
+                }
+                return await self.send_api_request(
+                    method, endpoint, headers, json, idempotent
+                )
             logger.error(f"HTTP error occurred: {e.response.text}")
             raise
         except Exception as e:
             logger.error(f"An error occurred: {str(e)}")
             raise
 
+    async def send_authenticated_request(
+        self,
+        method: str,
+        endpoint: str,
+        json: Dict[str, Any] | None = None,
+        idempotent: bool | None = None,
+    ) -> Dict[str, Any]:
+        access_token = await self.get_port_access_token()
+        try:
+            return await self.send_api_request(
+                method,
+                endpoint,
+                headers={"Authorization": f"Bearer {access_token}"},
+                json=json,
+                idempotent=idempotent,
+            )
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 401:
+                raise
+            logger.warning("Port rejected the access token, re-authenticating once")
+            self.token_manager.stats["unauthorized_retries"] += 1
+            self.token_manager.invalidate(access_token)
+            access_token = await self.get_port_access_token()
+            return await self.send_api_request(
+                method,
+                endpoint,
+                headers={"Authorization": f"Bearer {access_token}"},
+                json=json,
+                idempotent=idempotent,
+            )
+
     async def upsert_entity(
         self, blueprint_id: str, entity_object: Dict[str, Any]
     ) -> Dict[str, Any]:
         endpoint = f"/blueprints/{blueprint_id}/entities?upsert=true&merge=true"
-        port_headers = (
-            self.port_headers if self.port_headers else await self.get_port_headers()
-        )
-        response = await self.send_api_request(
-            "POST", endpoint, headers=port_headers, json=entity_object
+        # Upserts are idempotent, so they can be retried after server errors
+        response = await self.send_authenticated_request(
+            "POST", endpoint, json=entity_object, idempotent=True
         )
-        logger.info(response)
+        logger.debug(response)
         return response
+
+    async def upsert_entities(
+        self, blueprint_id: str, entities: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        endpoint = f"/blueprints/{blueprint_id}/entities/bulk?upsert=true&merge=true"
+        return await self.send_authenticated_request(
+            "POST", endpoint, json={"entities": entities}, idempotent=True
+        )
+
+    async def iter_entities(
+        self,
+        blueprint_id: str,
+        include: List[str] | None = None,
+        page_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields pages of the entities of a blueprint using the paginated search
+        endpoint. include limits the returned fields, e.g. ["identifier"].
+        """
+        endpoint = f"/blueprints/{blueprint_id}/entities/search"
+        cursor = None
+        while True:
+            body: Dict[str, Any] = {
+                "query": {"combinator": "and", "rules": []},
+                "limit": page_size,
+            }
+            if include:
+                body["include"] = include
+            if cursor:
+                body["from"] = cursor
+            # Searching does not change any state, so it is safe to retry
+            response = await self.send_authenticated_request(
+                "POST", endpoint, json=body, idempotent=True
+            )
+            yield response.get("entities", [])
+            cursor = response.get("next")
+            if not cursor:
+                return
+
+    async def get_entity_identifiers(self, blueprint_id: str) -> Set[str]:
+        identifiers: Set[str] = set()
+        async for entities in self.iter_entities(blueprint_id, include=["identifier"]):
+            identifiers.update(entity["identifier"] for entity in entities)
+        logger.info(
+            f"Retrieved {len(identifiers)} {blueprint_id} identifiers from Port"
+        )
+        return identifiers
+
+    async def delete_entities(
+        self, blueprint_id: str, identifiers: List[str]
+    ) -> Dict[str, Any]:
+        endpoint = f"/blueprints/{blueprint_id}/bulk/entities"
+        return await self.send_authenticated_request(
+            "DELETE", endpoint, json={"entities": identifiers}
+        )
+
+
+class PortEntityWriter:
+    """
+    Accumulates entities per blueprint and flushes them through the Port bulk
+    endpoint in chunks of batch_size, keeping at most max_concurrency requests
+    in flight. Callers of add() wait while all request slots are taken, which
+    bounds the number of open sockets and buffered entities.
+    """
+
+    MAX_BATCH_SIZE = 20
+
+    def __init__(
+        self,
+        port_client: PortClient,
+        batch_size: int = 20,
+        max_concurrency: int = 5,
+        max_batch_bytes: int = 0,
+    ) -> None:
+        self.port_client = port_client
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        # Batches of large entities are sent early to stay below this size
+        self.max_batch_bytes = max_batch_bytes
+        self.buffer_bytes: Dict[str, int] = {}
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.buffers: Dict[str, List[Dict[str, Any]]] = {}
+        # In-flight batch requests and the entities they write
+        self.pending: Dict[str, Dict[asyncio.Task, List[Dict[str, Any]]]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def get_results(self, blueprint_id: str) -> Dict[str, Any]:
+        if blueprint_id not in self.results:
+            self.results[blueprint_id] = {"upserted": [], "failed": []}
+        return self.results[blueprint_id]
+
+    async def add(
+        self, blueprint_id: str, entity: Dict[str, Any], size: int | None = None
+    ) -> None:
+        """
+        Buffers the entity, size is its serialized size when the caller already
+        measured it.
+        """
+        buffer = self.buffers.setdefault(blueprint_id, [])
+        if self.max_batch_bytes:
+            if size is None:
+                size = len(self.port_client.serializer.dumps(entity))
+            if buffer and (
+                self.buffer_bytes.get(blueprint_id, 0) + size > self.max_batch_bytes
+            ):
+                self.buffers[blueprint_id] = []
+                self.buffer_bytes[blueprint_id] = 0
+                await self.schedule_batch(blueprint_id, buffer)
+                buffer = self.buffers.setdefault(blueprint_id, [])
+            self.buffer_bytes[blueprint_id] = (
+                self.buffer_bytes.get(blueprint_id, 0) + size
+            )
+        buffer.append(entity)
+        if len(buffer) >= self.batch_size:
+            self.buffers[blueprint_id] = []
+            self.buffer_bytes[blueprint_id] = 0
+            await self.schedule_batch(blueprint_id, buffer)
+
+    async def add_without_relations(
+        self, blueprint_id: str, entity: Dict[str, Any]
+    ) -> None:
+        """
+        Queues the entity without its relations, used for the first write of
+        entities that are part of a relation cycle.
+        """
+        await self.add(
+            blueprint_id,
+            {key: value for key, value in entity.items() if key != "relations"},
+        )
+
+    async def schedule_batch(
+        self, blueprint_id: str, batch: List[Dict[str, Any]]
+    ) -> None:
+        await self.semaphore.acquire()
+        task = asyncio.create_task(self.write_batch(blueprint_id, batch))
+        pending = self.pending.setdefault(blueprint_id, {})
+        pending[task] = batch
+
+        def on_done(done_task: asyncio.Task) -> None:
+            pending.pop(done_task, None)
+            self.semaphore.release()
+
+        task.add_done_callback(on_done)
+
+    async def write_batch(self, blueprint_id: str, batch: List[Dict[str, Any]]) -> None:
+        results = self.get_results(blueprint_id)
+        try:
+            response = await self.port_client.upsert_entities(blueprint_id, batch)
+        except asyncio.CancelledError:
+            # Keep the entities of an interrupted request as unsent
+            self.buffers.setdefault(blueprint_id, []).extend(batch)
+            raise
+        except Exception as e:
+            logger.error(
+                f"Failed to upsert {len(batch)} entities of blueprint {blueprint_id}: {str(e)}"
+            )
+            results["failed"].extend(
+                {"identifier": entity["identifier"], "error": str(e)}
+                for entity in batch
+            )
+            return
+
+        results["upserted"].extend(
+            entity["identifier"] for entity in response.get("entities", [])
+        )
+        for error in response.get("errors", []):
+            results["failed"].append(
+                {
+                    "identifier": error.get("identifier"),
+                    "error": error.get("message") or error.get("error"),
+                }
+            )
+
+    async def flush(self, blueprint_id: str | None = None, wait: bool = True) -> None:
+        """
+        Sends any buffered entities of the given blueprint (or of every
+        blueprint). When wait is set, also waits for all of its in-flight
+        batches to complete.
+        """
+        blueprint_ids = [blueprint_id] if blueprint_id else list(self.buffers)
+        for current_blueprint in blueprint_ids:
+            buffer = self.buffers.pop(current_blueprint, [])
+            self.buffer_bytes.pop(current_blueprint, None)
+            for index in range(0, len(buffer), self.batch_size):
+                await self.schedule_batch(
+                    current_blueprint, buffer[index : index + self.batch_size]
+                )
+
+        if not wait:
+            return
+
+        pending_ids = [blueprint_id] if blueprint_id else list(self.pending)
+        tasks = [task for key in pending_ids for task in self.pending.get(key, {})]
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    def get_queued(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Returns the buffered and in-flight entities of every blueprint."""
+        queued: Dict[str, List[Dict[str, Any]]] = {}
+        for blueprint_id, buffer in self.buffers.items():
+            queued.setdefault(blueprint_id, []).extend(buffer)
+        for blueprint_id, batches in self.pending.items():
+            for batch in list(batches.values()):
+                queued.setdefault(blueprint_id, []).extend(batch)
+        return queued
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            blueprint_id: {
+                "upserted": len(results["upserted"]),
+                "failed": len(results["failed"]),
+            }
+            for blueprint_id, results in self.results.items()
+        }
@@ -0,0 +1,218 @@
+import asyncio
+import email.utils
+import random
+import time
+import httpx
+from typing import Any, Dict
+from urllib.parse import urlsplit
+from loguru import logger
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class TokenBucket:
+    """
+    Limits the request rate to a host. A rate of 0 disables the limit. pause()
+    blocks every caller until the given time, which is used to honor Retry-After.
+    """
+
+    def __init__(self, rate: float, burst: int | None = None) -> None:
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            if not self.rate:
+                return
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: every successful request grows the limit by
+    1/limit (roughly one slot per window of successes), every throttled
+    request halves it.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1) -> None:
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+            else:
+                self.limit = min(
+                    float(self.max_concurrency), self.limit + 1 / self.limit
+                )
+            self.condition.notify_all()
+
+
+class RequestExecutor:
+    """
+    Request layer shared by the Humanitec and Port clients. Every host gets its
+    own token bucket and adaptive concurrency limit. 429 responses are retried
+    after Retry-After (or a backoff) for any method since the server did not
+    process them; 5xx responses and transport errors are only retried for
+    idempotent calls, with exponential backoff and full jitter.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        rate_limit: float = 0,
+        max_concurrency: int = 10,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        metrics: Any = None,
+    ) -> None:
+        self.client = client
+        self.metrics = metrics
+        self.rate_limit = rate_limit
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def get_host_state(
+        self, host: str
+    ) -> tuple[TokenBucket, AdaptiveConcurrencyLimiter, Dict[str, Any]]:
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate_limit)
+            self.limiters[host] = AdaptiveConcurrencyLimiter(self.max_concurrency)
+            self.stats[host] = {
+                "requests": 0,
+                "retries": 0,
+                "throttled": 0,
+                "server_errors": 0,
+                "transport_errors": 0,
+                "pool_timeouts": 0,
+            }
+        return self.buckets[host], self.limiters[host], self.stats[host]
+
+    def get_backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * (2**attempt))
+        )
+
+    @staticmethod
+    def parse_retry_after(value: str | None) -> float | None:
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            host: {**stats, "concurrency_limit": round(self.limiters[host].limit, 2)}
+            for host, stats in self.stats.items()
+        }
+
+    async def request(
+        self, method: str, url: str, idempotent: bool | None = None, **kwargs: Any
+    ) -> httpx.Response:
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        bucket, limiter, stats = self.get_host_state(urlsplit(url).netloc)
+
+        attempt = 0
+        while True:
+            await bucket.acquire()
+            await limiter.acquire()
+            throttled = False
+            try:
+                stats["requests"] += 1
+                started_at = time.monotonic()
+                response = await self.client.request(method, url, **kwargs)
+                if self.metrics:
+                    self.metrics.observe_request(
+                        method,
+                        url,
+                        response.status_code,
+                        time.monotonic() - started_at,
+                        len(response.request.content),
+                        len(response.content),
+                    )
+            except httpx.PoolTimeout:
+                # The request never left the client, so it is safe to retry
+                # whatever the method
+                stats["pool_timeouts"] += 1
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.get_backoff(attempt)
+                logger.warning(
+                    f"{method} {url} waited too long for a free connection, retrying in {delay:.2f}s"
+                )
+            except httpx.TransportError as e:
+                stats["transport_errors"] += 1
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+                delay = self.get_backoff(attempt)
+                logger.warning(
+                    f"{method} {url} failed with {type(e).__name__}, retrying in {delay:.2f}s"
+                )
+            else:
+                if response.status_code == 429:
+                    stats["throttled"] += 1
+                    throttled = True
+                    retry_after = self.parse_retry_after(
+                        response.headers.get("Retry-After")
+                    )
+                    if retry_after is not None:
+                        bucket.pause(retry_after)
+                    delay = max(retry_after or 0.0, self.get_backoff(attempt))
+                elif response.status_code >= 500 and idempotent:
+                    stats["server_errors"] += 1
+                    delay = self.get_backoff(attempt)
+                else:
+                    return response
+
+                if attempt >= self.max_retries:
+                    return response
+                logger.warning(
+                    f"{method} {url} returned {response.status_code}, retrying in {delay:.2f}s"
+                )
+            finally:
+                await limiter.release(throttled)
+
+            stats["retries"] += 1
+            attempt += 1
+            await asyncio.sleep(delay)
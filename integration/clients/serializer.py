@@ -0,0 +1,112 @@
+import hashlib
+import json
+from typing import Any, Dict, Type
+from loguru import logger
+
+orjson: Any
+msgspec: Any
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec  # type: ignore
+except ImportError:
+    msgspec = None
+
+
+class JSONSerializer:
+    """
+    Encodes request bodies and decodes response bodies for the Humanitec and
+    Port clients, and the local state, checkpoint and hashes of the sync. This
+    implementation uses the standard library and is always available, the
+    subclasses use faster optional packages.
+
+    dumps_canonical sorts object keys, so equal values always give equal bytes
+    with one backend. Backends escape non-ASCII characters differently, so
+    hashes of such values change when the backend does.
+    """
+
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+    def dumps_canonical(self, value: Any) -> bytes:
+        return json.dumps(
+            value, sort_keys=True, separators=(",", ":"), default=str
+        ).encode()
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def hash(self, value: Any) -> str:
+        """SHA-1 of the canonical JSON of the value."""
+        return hashlib.sha1(self.dumps_canonical(value)).hexdigest()
+
+
+class OrjsonSerializer(JSONSerializer):
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def dumps_canonical(self, value: Any) -> bytes:
+        return orjson.dumps(
+            value,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS,
+        )
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+
+class MsgspecSerializer(JSONSerializer):
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        self.encoder = msgspec.json.Encoder(enc_hook=str)
+        self.canonical_encoder = msgspec.json.Encoder(enc_hook=str, order="sorted")
+        self.decoder = msgspec.json.Decoder()
+
+    def dumps(self, value: Any) -> bytes:
+        return self.encoder.encode(value)
+
+    def dumps_canonical(self, value: Any) -> bytes:
+        return self.canonical_encoder.encode(value)
+
+    def loads(self, data: bytes | str) -> Any:
+        return self.decoder.decode(data)
+
+
+# In order of preference for "auto"
+SERIALIZERS: Dict[str, Type[JSONSerializer]] = {
+    "orjson": OrjsonSerializer,
+    "msgspec": MsgspecSerializer,
+    "json": JSONSerializer,
+}
+AVAILABLE = {
+    "orjson": orjson is not None,
+    "msgspec": msgspec is not None,
+    "json": True,
+}
+
+
+def get_serializer(name: str = "auto") -> JSONSerializer:
+    """
+    Returns the serializer of the given backend, or the fastest installed one
+    for "auto". A backend that is not installed falls back to the standard
+    library.
+    """
+    if name == "auto":
+        name = next(backend for backend in SERIALIZERS if AVAILABLE[backend])
+    if name not in SERIALIZERS:
+        raise ValueError(
+            f"Unknown JSON backend {name}, expected auto or one of {', '.join(SERIALIZERS)}"
+        )
+    if not AVAILABLE[name]:
+        logger.warning(f"The {name} package is not installed, falling back to json")
+        name = "json"
+    return SERIALIZERS[name]()
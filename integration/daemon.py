@@ -0,0 +1,189 @@
+import asyncio
+import hmac
+import json
+from typing import Any, Awaitable, Dict, Tuple
+from loguru import logger
+
+# Webhook events are small, larger bodies are rejected without being read
+MAX_BODY_SIZE = 64 * 1024
+MAX_HEADERS = 100
+# Seconds a client may take to send each part of a request, which also closes
+# idle keep-alive connections
+READ_TIMEOUT = 10.0
+REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    413: "Payload Too Large",
+}
+
+
+class SyncDaemon:
+    """
+    Long-running mode of the exporter. A small HTTP endpoint receives Humanitec
+    deployment webhooks, events are debounced per (app_id, env_id) and only the
+    environment that was deployed is re-synced. A full sync runs on start and
+    then every full_sync_interval seconds as a safety net, which is also when
+    stale entities are reconciled.
+
+    Syncs never overlap, they share the Port writer and the incremental state.
+    """
+
+    def __init__(
+        self,
+        exporter: Any,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        secret: str = "",
+        debounce: float = 30.0,
+        full_sync_interval: float = 86400.0,
+    ) -> None:
+        self.exporter = exporter
+        self.host = host
+        self.port = port
+        self.secret = secret
+        self.debounce = debounce
+        self.full_sync_interval = full_sync_interval
+        self.sync_lock = asyncio.Lock()
+        self.deadlines: Dict[Tuple[str, str], float] = {}
+        self.timers: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats = {
+            "events": 0,
+            "rejected_events": 0,
+            "environment_syncs": 0,
+            "full_syncs": 0,
+            "failed_syncs": 0,
+        }
+
+    def submit(self, app_id: str, env_id: str) -> None:
+        """
+        Schedules a sync of the environment once no event arrived for it during
+        the debounce delay. Events received while it is being synced schedule
+        another sync.
+        """
+        key = (app_id, env_id)
+        self.deadlines[key] = asyncio.get_running_loop().time() + self.debounce
+        if key not in self.timers:
+            self.timers[key] = asyncio.create_task(self.sync_when_quiet(key))
+
+    async def sync_when_quiet(self, key: Tuple[str, str]) -> None:
+        loop = asyncio.get_running_loop()
+        while (delay := self.deadlines[key] - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        del self.deadlines[key]
+        del self.timers[key]
+        async with self.sync_lock:
+            try:
+                await self.exporter.sync_environment(*key)
+                self.stats["environment_syncs"] += 1
+            except Exception as e:
+                self.stats["failed_syncs"] += 1
+                logger.error(
+                    f"Failed to sync environment {key[1]} of {key[0]}: {str(e)}"
+                )
+
+    async def run_full_syncs(self) -> None:
+        while True:
+            async with self.sync_lock:
+                try:
+                    await self.exporter.sync_all()
+                    self.stats["full_syncs"] += 1
+                except Exception as e:
+                    self.stats["failed_syncs"] += 1
+                    logger.error(f"Full sync failed: {str(e)}")
+            await asyncio.sleep(self.full_sync_interval)
+
+    def handle_request(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, str, bytes]:
+        if method == "GET" and path == "/healthz":
+            payload = {
+                **self.stats,
+                "pending_environments": [f"{app}/{env}" for app, env in self.timers],
+            }
+            return 200, "application/json", json.dumps(payload).encode()
+        if method == "GET" and path == "/metrics":
+            metrics = self.exporter.metrics.to_prometheus()
+            return 200, "text/plain; version=0.0.4", metrics.encode()
+        if method != "POST" or path != "/webhook":
+            return 404, "application/json", b'{"error": "not found"}'
+
+        if self.secret and not hmac.compare_digest(
+            headers.get("authorization", ""), f"Bearer {self.secret}"
+        ):
+            self.stats["rejected_events"] += 1
+            return 401, "application/json", b'{"error": "unauthorized"}'
+        try:
+            event = json.loads(body)
+            app_id, env_id = str(event["app_id"]), str(event["env_id"])
+        except (ValueError, KeyError, TypeError):
+            self.stats["rejected_events"] += 1
+            return (
+                400,
+                "application/json",
+                b'{"error": "app_id and env_id are required"}',
+            )
+
+        self.stats["events"] += 1
+        logger.info(f"Received deployment event for environment {env_id} of {app_id}")
+        self.submit(app_id, env_id)
+        return 202, "application/json", b'{"status": "accepted"}'
+
+    async def read(self, read: Awaitable[bytes]) -> bytes:
+        return await asyncio.wait_for(read, READ_TIMEOUT)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while request_line := await self.read(reader.readline()):
+                method, target, _ = request_line.decode().split(" ", 2)
+                headers: Dict[str, str] = {}
+                while (line := await self.read(reader.readline())) not in (
+                    b"\r\n",
+                    b"\n",
+                    b"",
+                ):
+                    if len(headers) >= MAX_HEADERS:
+                        raise ValueError("Too many headers")
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", 0))
+                if not 0 <= length <= MAX_BODY_SIZE:
+                    status, content_type, body = 413, "application/json", b"{}"
+                    headers["connection"] = "close"
+                else:
+                    status, content_type, body = self.handle_request(
+                        method,
+                        target.split("?", 1)[0],
+                        headers,
+                        await self.read(reader.readexactly(length)),
+                    )
+                head = [
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'Error')}",
+                    f"Content-Type: {content_type}",
+                    f"Content-Length: {len(body)}",
+                ]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.TimeoutError,
+            ConnectionResetError,
+            ValueError,
+        ):
+            pass
+        finally:
+            writer.close()
+
+    async def run(self) -> None:
+        server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port
+        )
+        logger.info(f"Listening for Humanitec webhooks on {self.host}:{self.port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_full_syncs())
@@ -0,0 +1,74 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterator
+from loguru import logger
+
+
+class NDJSONEntitySink:
+    """
+    Drop-in replacement for PortEntityWriter that writes every entity to a
+    gzip compressed NDJSON file instead of Port, one
+    {"blueprint": ..., "entity": ...} record per line.
+
+    Waiting flushes are recorded as {"flush": blueprint} barriers so that an
+    import replays the dependency order of the original sync, and a final
+    {"summary": ...} record tells a complete export apart from a truncated one.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.temporary_path = f"{path}.tmp"
+        self.file = gzip.open(self.temporary_path, "wt", encoding="utf-8")
+        self.counts: Dict[str, int] = {}
+        # Nothing can fail to be written to Port, kept for PortEntityWriter parity
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def write_record(self, record: Dict[str, Any]) -> None:
+        self.file.write(json.dumps(record, separators=(",", ":"), default=str))
+        self.file.write("\n")
+
+    async def add(
+        self, blueprint_id: str, entity: Dict[str, Any], size: int | None = None
+    ) -> None:
+        self.write_record({"blueprint": blueprint_id, "entity": entity})
+        self.counts[blueprint_id] = self.counts.get(blueprint_id, 0) + 1
+
+    async def add_without_relations(
+        self, blueprint_id: str, entity: Dict[str, Any]
+    ) -> None:
+        # The full entity is kept so that an import can hash and diff it, the
+        # relations are stripped when it is replayed
+        self.write_record(
+            {"blueprint": blueprint_id, "entity": entity, "without_relations": True}
+        )
+        self.counts[blueprint_id] = self.counts.get(blueprint_id, 0) + 1
+
+    async def flush(self, blueprint_id: str | None = None, wait: bool = True) -> None:
+        if wait:
+            self.write_record({"flush": blueprint_id})
+
+    def close(self, crawl_complete: bool) -> None:
+        self.write_record(
+            {"summary": {"entities": self.counts, "crawl_complete": crawl_complete}}
+        )
+        self.file.close()
+        os.replace(self.temporary_path, self.path)
+        logger.info(f"Exported {sum(self.counts.values())} entities to {self.path}")
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        return {
+            blueprint_id: {"exported": count}
+            for blueprint_id, count in self.counts.items()
+        }
+
+
+def iter_export_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Streams the records of a file written by NDJSONEntitySink one line at a
+    time, so replaying an export does not load it into memory.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as export_file:
+        for line in export_file:
+            if line.strip():
+                yield json.loads(line)
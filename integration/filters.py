@@ -0,0 +1,75 @@
+import fnmatch
+import re
+from typing import Any, Dict, List
+
+GLOB_CHARACTERS = re.compile(r"[*?\[]")
+
+
+def parse_patterns(value: str) -> List[str]:
+    return [pattern.strip() for pattern in value.split(",") if pattern.strip()]
+
+
+class SyncFilter:
+    """
+    Restricts a sync to some applications, environments and blueprints. The
+    filters are checked before anything is requested: environments are only
+    listed for matching applications, resources and graphs only fetched for
+    matching environments and only when a selected blueprint needs them.
+
+    Application and environment patterns are fnmatch globs on ids, environment
+    type patterns globs on the environment type. Empty filters match everything.
+    """
+
+    def __init__(
+        self,
+        apps: str = "",
+        envs: str = "",
+        env_types: str = "",
+        blueprints: str = "",
+    ) -> None:
+        self.app_patterns = parse_patterns(apps)
+        self.env_patterns = parse_patterns(envs)
+        self.env_type_patterns = parse_patterns(env_types)
+        self.blueprints = set(parse_patterns(blueprints))
+        self.app_regex = self.compile(self.app_patterns)
+        self.env_regex = self.compile(self.env_patterns)
+        self.env_type_regex = self.compile(self.env_type_patterns)
+
+    @staticmethod
+    def compile(patterns: List[str]) -> re.Pattern | None:
+        if not patterns:
+            return None
+        return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+    @property
+    def is_scoped(self) -> bool:
+        """
+        Whether only part of the applications or environments is synced, in
+        which case the entities seen are not the full set of entities.
+        """
+        return bool(self.app_patterns or self.env_patterns or self.env_type_patterns)
+
+    def get_app_ids(self) -> List[str] | None:
+        """
+        Returns the application ids when every application pattern is a plain
+        id, so they can be fetched directly instead of listing all applications.
+        """
+        if self.app_patterns and not any(
+            GLOB_CHARACTERS.search(pattern) for pattern in self.app_patterns
+        ):
+            return list(dict.fromkeys(self.app_patterns))
+        return None
+
+    def match_application(self, application: Dict[str, Any]) -> bool:
+        return not self.app_regex or bool(self.app_regex.match(application["id"]))
+
+    def match_environment(self, environment: Dict[str, Any]) -> bool:
+        if self.env_regex and not self.env_regex.match(environment["id"]):
+            return False
+        return not self.env_type_regex or bool(
+            self.env_type_regex.match(environment.get("type") or "")
+        )
+
+    def includes(self, *blueprint_ids: str) -> bool:
+        """Whether any of the blueprints is synced."""
+        return not self.blueprints or bool(self.blueprints.intersection(blueprint_ids))
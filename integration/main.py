@@ -1,13 +1,44 @@
 import asyncio
 import argparse
+import copy
+import json
+import os
 import time
 import datetime
 from decouple import config  # type: ignore
-import re
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    ContextManager,
+    Dict,
+    List,
+    Set,
+    Tuple,
+)
 import asyncio
 from loguru import logger
+from clients.cache import EnvironmentResources
 from clients.humanitec_client import HumanitecClient
-from clients.port_client import PortClient
+from clients.http_pool import create_http_client
+from clients.http_cache import CachePolicy, SQLiteCacheBackend
+from clients.port_client import PortClient, PortEntityWriter
+from clients.request_executor import RequestExecutor
+from clients.serializer import SERIALIZERS, get_serializer
+from model import HumanitecModel, order_graph_nodes
+from state import SyncState
+from reconciler import Reconciler
+from port_diff import PortSnapshot
+from metrics import MetricsRegistry
+from entity_export import NDJSONEntitySink, iter_export_records
+from daemon import SyncDaemon
+from sharding import get_shard, get_shard_path, merge_reports
+from filters import SyncFilter, parse_patterns
+from mapping import EntityMapper, normalize_title
+from checkpoint import SyncCheckpoint
+from payload_policy import PayloadPolicy
+from orgs import FairScheduler, OrgConfig, OrgSlots, load_orgs
 import httpx
 
 
@@ -19,22 +50,245 @@ class BLUEPRINT:
     RESOURCE = "humanitecResource"
 
 
+RESOURCES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "resources"
+)
+BLUEPRINTS_FILE = os.path.join(RESOURCES_DIR, "blueprints.json")
+
+# Children come first so entities are deleted before the entities they relate to
+RECONCILE_ORDER = [
+    BLUEPRINT.RESOURCE,
+    BLUEPRINT.RESOURCE_GRAPH,
+    BLUEPRINT.WORKLOAD,
+    BLUEPRINT.ENVIRONMENT,
+    BLUEPRINT.APPLICATION,
+]
+
+
 class HumanitecExporter:
     def __init__(self, args) -> None:
 
-        timeout = httpx.Timeout(10.0, connect=10.0, read=20.0, write=10.0)
-        httpx_async_client = httpx.AsyncClient(timeout=timeout)
+        # Each API gets its own connection pool sized to the concurrency used
+        # against it, so Port writes never wait behind Humanitec reads
+        self.humanitec_http_client, self.humanitec_pool = create_http_client(
+            args.humanitec_max_connections or args.max_concurrency,
+            args.max_keepalive_connections or None,
+            keepalive_expiry=args.keepalive_expiry,
+            http2=args.http2,
+            pool_timeout=args.pool_timeout,
+        )
+        self.port_http_client, self.port_pool = create_http_client(
+            args.port_max_connections or args.port_max_concurrency,
+            args.max_keepalive_connections or None,
+            keepalive_expiry=args.keepalive_expiry,
+            http2=args.http2,
+            pool_timeout=args.pool_timeout,
+        )
+        self.metrics = MetricsRegistry()
+        self.serializer = get_serializer(args.json_backend)
+        self.port_request_executor = RequestExecutor(
+            self.port_http_client,
+            rate_limit=args.port_rate_limit,
+            max_concurrency=args.port_max_concurrency,
+            max_retries=args.max_retries,
+            metrics=self.metrics,
+        )
+        self.humanitec_request_executor = RequestExecutor(
+            self.humanitec_http_client,
+            rate_limit=args.humanitec_rate_limit,
+            max_concurrency=args.max_concurrency,
+            max_retries=args.max_retries,
+            metrics=self.metrics,
+        )
         self.port_client = PortClient(
             args.port_client_id,
             args.port_client_secret,
-            httpx_async_client=httpx_async_client,
+            httpx_async_client=self.port_http_client,
+            request_executor=self.port_request_executor,
+            base_url=args.port_api_url,
+            compress_requests=args.port_compress_requests,
+            serializer=self.serializer,
+        )
+        self.payload_policy = PayloadPolicy(
+            PayloadPolicy.parse_rules(args.payload_rules),
+            dedupe_properties=set(parse_patterns(args.dedupe_properties)),
+            max_entity_bytes=int(args.max_entity_kb * 1024),
+            serializer=self.serializer,
+            measure=not args.export_to and args.port_max_batch_kb > 0,
+        )
+        self.entity_writer: PortEntityWriter | NDJSONEntitySink
+        self.import_from = args.import_from
+        # An export is a complete snapshot of the organization, the options that
+        # compare against Port or against previous runs only apply when importing
+        self.export_to = args.export_to
+        if self.export_to:
+            if args.incremental or args.diff_against_port or args.reconcile:
+                logger.warning(
+                    "--incremental, --diff-against-port and --reconcile are ignored when exporting"
+                )
+            args.incremental = args.diff_against_port = args.reconcile = False
+            self.entity_writer = NDJSONEntitySink(self.export_to)
+        else:
+            self.entity_writer = PortEntityWriter(
+                self.port_client,
+                batch_size=args.port_batch_size,
+                max_batch_bytes=int(args.port_max_batch_kb * 1024),
+                max_concurrency=args.port_max_concurrency,
+            )
+        self.sync_filter = SyncFilter(
+            args.apps, args.envs, args.env_types, args.blueprints
+        )
+        self.synced_blueprints = [
+            blueprint_id
+            for blueprint_id in RECONCILE_ORDER
+            if self.sync_filter.includes(blueprint_id)
+        ]
+        if self.sync_filter.is_scoped and args.reconcile:
+            logger.warning(
+                "Reconciliation is disabled when syncing only some applications or environments"
+            )
+            args.reconcile = False
+        self.shard_index = args.shard_index
+        self.shard_count = max(1, args.shard_count)
+        if self.shard_count > 1 and args.reconcile:
+            logger.warning(
+                "Stale entities of a sharded sync are deleted by the --merge-reports step"
+            )
+            args.reconcile = False
+        # The first organization is synced by this exporter, the others by
+        # copies of it that share everything but the Humanitec side
+        self.orgs = (
+            []
+            if self.import_from or args.merge_reports
+            else load_orgs(args.org_id, args.api_key, args.orgs_file)
+        ) or [OrgConfig(args.org_id, args.api_key)]
+        self.org = self.orgs[0]
+        self.scheduler = (
+            FairScheduler(args.max_concurrency) if len(self.orgs) > 1 else None
+        )
+        self.checkpoint = self.create_checkpoint(args, self.org)
+        self.checkpoint_interval = (
+            args.checkpoint_interval or SyncCheckpoint.DEFAULT_INTERVAL
+        )
+        self.http_cache = (
+            SQLiteCacheBackend(
+                get_shard_path(args.http_cache, self.shard_index, self.shard_count),
+                max_bytes=args.http_cache_max_mb * 1024 * 1024,
+                serializer=self.serializer,
+            )
+            if args.http_cache
+            else None
         )
-        self.humanitec_client = HumanitecClient(
-            args.org_id,
-            args.api_key,
-            api_url=args.api_url,
-            httpx_async_client=httpx_async_client,
+        self.humanitec_client = self.create_humanitec_client(args, self.org)
+        self.fan_out_semaphore: asyncio.Semaphore | OrgSlots = (
+            self.scheduler.for_org(self.org.org_id)
+            if self.scheduler
+            else asyncio.Semaphore(args.max_concurrency)
         )
+        self.sync_state = (
+            SyncState(
+                get_shard_path(args.state_file, self.shard_index, self.shard_count),
+                serializer=self.serializer,
+            )
+            if args.incremental
+            else None
+        )
+        self.graph_stats: Dict[str, int] = {}
+        # Environment every shared graph node is related to, by guresid, kept
+        # between the syncs of a daemon
+        self.graph_owners: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self.failed_orgs: List[str] = []
+        self.seen_identifiers: Dict[str, Set[str]] = {}
+        self.port_snapshot = (
+            PortSnapshot(self.serializer) if args.diff_against_port else None
+        )
+        self.snapshot_task: asyncio.Task | None = None
+        self.mapper = EntityMapper.from_file(args.mapping_file)
+        if os.path.exists(BLUEPRINTS_FILE):
+            self.mapper.check_blueprints(BLUEPRINTS_FILE)
+        self.enrich_resources = args.enrich_resources
+        self.enrichment_chunk_size = max(1, args.enrichment_chunk_size)
+        self.report_file = args.report_file
+        self.prometheus_file = args.prometheus_file
+        self.pushgateway_url = args.pushgateway_url
+        self.org_exporters: List[HumanitecExporter] = [self] + [
+            self.for_org(args, org) for org in self.orgs[1:]
+        ]
+        if args.reconcile and any(
+            exporter.checkpoint and exporter.checkpoint.resumed
+            for exporter in self.org_exporters
+        ):
+            logger.warning(
+                "Reconciliation is disabled when resuming a sync, stale entities are deleted by the next full sync"
+            )
+            args.reconcile = False
+        self.reconciler = (
+            Reconciler(
+                self.port_client,
+                self.synced_blueprints,
+                max_delete_ratio=args.reconcile_max_delete_ratio,
+                batch_size=args.delete_batch_size,
+                max_concurrency=args.port_max_concurrency,
+            )
+            if args.reconcile
+            else None
+        )
+
+    def create_humanitec_client(self, args, org: OrgConfig) -> HumanitecClient:
+        return HumanitecClient(
+            org.org_id,
+            org.api_key,
+            base_url=args.api_url,
+            httpx_async_client=self.humanitec_http_client,
+            http_cache=self.http_cache,
+            request_executor=self.humanitec_request_executor,
+            page_size=args.page_size or None,
+            cache_policy=CachePolicy(CachePolicy.parse_ttls(args.http_cache_ttl)),
+            serializer=self.serializer,
+        )
+
+    def create_checkpoint(self, args, org: OrgConfig) -> SyncCheckpoint | None:
+        # Checkpoints are opt-in, and only syncs that crawl Humanitec and
+        # write to Port are checkpointed
+        if not (args.checkpoint_interval > 0 or args.resume) or (
+            self.export_to or self.import_from or args.daemon or args.merge_reports
+        ):
+            return None
+        path = get_shard_path(args.checkpoint_file, self.shard_index, self.shard_count)
+        checkpoint = SyncCheckpoint(
+            f"{path}.org-{org.org_id}" if self.scheduler else path,
+            scope={
+                "org_id": org.org_id,
+                "prefix": org.prefix,
+                "apps": args.apps,
+                "envs": args.envs,
+                "env_types": args.env_types,
+                "blueprints": args.blueprints,
+                "shard": [self.shard_index, self.shard_count],
+            },
+            serializer=self.serializer,
+        )
+        if args.resume:
+            checkpoint.load()
+        return checkpoint
+
+    def for_org(self, args, org: OrgConfig) -> "HumanitecExporter":
+        """
+        Returns the exporter of another organization synced by this process. It
+        shares the connection pools, the Port client and writer, the state and
+        the metrics of this exporter, and crawls its organization with its own
+        Humanitec client and checkpoint, taking turns with the other
+        organizations for the --max-concurrency slots.
+        """
+        exporter = copy.copy(self)
+        exporter.org = org
+        exporter.humanitec_client = self.create_humanitec_client(args, org)
+        exporter.checkpoint = self.create_checkpoint(args, org)
+        exporter.fan_out_semaphore = self.scheduler.for_org(org.org_id)  # type: ignore[union-attr]
+        exporter.seen_identifiers = {}
+        exporter.graph_stats = {}
+        exporter.graph_owners = {}
+        return exporter
 
     @staticmethod
     def convert_to_datetime(timestamp: int) -> str:
@@ -45,292 +299,1123 @@ class HumanitecExporter:
 
     @staticmethod
     def remove_symbols_and_title_case(input_string: str) -> str:
-        cleaned_string = re.sub(r"[^A-Za-z0-9\s]", " ", input_string)
-        title_case_string = cleaned_string.title()
-        return title_case_string
-
-    async def sync_applications(self) -> None:
-        logger.info(f"Syncing entities for blueprint {BLUEPRINT.APPLICATION}")
-        applications = await self.humanitec_client.get_all_applications()
-
-        def create_entity(application):
-            return {
-                "identifier": application["id"],
-                "title": self.remove_symbols_and_title_case(application["name"]),
-                "properties": {"createdAt": application["created_at"]},
-                "relations": {},
-            }
+        return normalize_title(input_string)
 
-        tasks = [
-            self.port_client.upsert_entity(
-                blueprint_id=BLUEPRINT.APPLICATION,
-                entity_object=create_entity(application),
+    async def fan_out(
+        self,
+        items: List[Any],
+        fetch: Callable[..., Awaitable[Any]],
+    ) -> AsyncIterator[Tuple[Any, Any]]:
+        """
+        Runs fetch for every item concurrently, keeping at most --max-concurrency
+        calls in flight, and yields (item, result) pairs in completion order.
+        Tuple items are unpacked into the fetch arguments. When a fetch raises
+        or the caller stops iterating, the remaining calls are cancelled and
+        awaited before the generator exits.
+        """
+
+        async def run(item):
+            async with self.fan_out_semaphore:
+                args = item if isinstance(item, tuple) else (item,)
+                return item, await fetch(*args)
+
+        tasks = [asyncio.create_task(run(item)) for item in items]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def crawl_applications(self, model: HumanitecModel) -> None:
+        """
+        Lists applications page by page and queues their entities as soon as
+        each page arrives.
+        """
+        async for page in self.list_applications():
+            page = [
+                application
+                for application in page
+                if self.in_shard(application["id"])
+                and self.sync_filter.match_application(application)
+            ]
+            model.applications.extend(page)
+            if self.snapshot_task:
+                await self.snapshot_task
+            await self.sync_applications(page)
+        await self.entity_writer.flush(BLUEPRINT.APPLICATION, wait=False)
+
+    async def list_applications(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Yields the applications page by page, or fetches them one by one when
+        --apps only lists plain application ids.
+        """
+        app_ids = self.sync_filter.get_app_ids()
+        if app_ids is None:
+            async for page in self.humanitec_client.iter_applications():
+                yield page
+            return
+
+        async def fetch(app_id):
+            try:
+                return await self.humanitec_client.get_application(app_id)
+            except Exception:
+                self.humanitec_client.failed_requests.append(f"apps/{app_id}")
+                return None
+
+        app_ids = [app_id for app_id in app_ids if self.in_shard(app_id)]
+        async for _, application in self.fan_out(app_ids, fetch):
+            if application:
+                yield [application]
+
+    def in_shard(self, app_id: str) -> bool:
+        return (
+            self.shard_count == 1
+            or get_shard(app_id, self.shard_count) == self.shard_index
+        )
+
+    def is_pending(self, *blueprint_ids: str, unit: str | None = None) -> bool:
+        """
+        Whether any of the blueprints is synced and was not completed by the
+        interrupted run being resumed, as a whole or for the environment unit.
+        """
+        return any(
+            self.sync_filter.includes(blueprint_id)
+            and not (
+                self.checkpoint and self.checkpoint.is_complete(blueprint_id, unit)
             )
-            for application in applications
-        ]
+            for blueprint_id in blueprint_ids
+        )
 
-        await asyncio.gather(*tasks)
-        logger.info(f"Finished syncing entities for blueprint {BLUEPRINT.APPLICATION}")
-
-    async def sync_environments(self) -> None:
-        logger.info(f"Syncing entities for blueprint {BLUEPRINT.ENVIRONMENT}")
-        applications = await self.humanitec_client.get_all_applications()
-
-        def create_entity(application, environment):
-            return {
-                "identifier": f"{application['id']}/{environment['id']}",
-                "title": environment["name"],
-                "properties": {
-                    "type": environment["type"],
-                    "createdAt": environment["created_at"],
-                    "lastDeploymentStatus": environment.get("last_deploy", {}).get(
-                        "status"
-                    ),
-                    "lastDeploymentDate": environment.get("last_deploy", {}).get(
-                        "created_at"
-                    ),
-                    "lastDeploymentComment": environment.get("last_deploy", {}).get(
-                        "comment"
-                    ),
-                },
-                "relations": {BLUEPRINT.APPLICATION: application["id"]},
-            }
+    async def crawl_environments(self, model: HumanitecModel) -> None:
+        if not self.is_pending(
+            BLUEPRINT.ENVIRONMENT,
+            BLUEPRINT.WORKLOAD,
+            BLUEPRINT.RESOURCE_GRAPH,
+            BLUEPRINT.RESOURCE,
+        ):
+            return
+        applications_written = asyncio.create_task(
+            self.entity_writer.flush(BLUEPRINT.APPLICATION)
+        )
 
-        tasks = [
-            self.port_client.upsert_entity(
-                blueprint_id=BLUEPRINT.ENVIRONMENT,
-                entity_object=create_entity(application, environment),
+        async def crawl(application):
+            environments = []
+            async for page in self.humanitec_client.iter_environments(application):
+                page = [
+                    environment
+                    for environment in page
+                    if self.sync_filter.match_environment(environment)
+                ]
+                environments.extend(page)
+                await applications_written
+                await self.sync_environments(application, page)
+            return environments
+
+        async for application, environments in self.fan_out(model.applications, crawl):
+            model.add_environments(application, environments)
+        await applications_written
+        await self.entity_writer.flush(BLUEPRINT.ENVIRONMENT, wait=False)
+
+    async def crawl_environment_data(self, model: HumanitecModel) -> None:
+        """
+        Lists the resources and fetches the dependency graph of every
+        environment. Workload entities are queued from each page of resources
+        as it arrives, once the environments they relate to are written.
+        """
+        fetch_graphs = self.is_pending(BLUEPRINT.RESOURCE_GRAPH)
+        fetch_resources = self.is_pending(BLUEPRINT.WORKLOAD, BLUEPRINT.RESOURCE)
+        if not (fetch_graphs or fetch_resources):
+            return
+        environments_written = asyncio.create_task(
+            self.entity_writer.flush(BLUEPRINT.ENVIRONMENT)
+        )
+
+        async def crawl(application, environment):
+            graph_task = asyncio.create_task(
+                self.humanitec_client.get_dependency_graph(application, environment)
+                if fetch_graphs
+                else asyncio.sleep(0, [])
             )
-            for application in applications
-            for environments in [
-                await self.humanitec_client.get_all_environments(application)
-            ]
+            resources = EnvironmentResources()
+            try:
+                if fetch_resources and self.is_pending(
+                    BLUEPRINT.WORKLOAD,
+                    BLUEPRINT.RESOURCE,
+                    unit=f"{application['id']}/{environment['id']}",
+                ):
+                    async for page in self.humanitec_client.iter_resources(
+                        application, environment
+                    ):
+                        start = len(resources)
+                        for resource in page:
+                            resources.add(resource)
+                        await environments_written
+                        await self.sync_workloads(
+                            application, environment, resources, start
+                        )
+                    self.close_checkpoint_unit(
+                        BLUEPRINT.WORKLOAD, application, environment
+                    )
+                return resources, await graph_task
+            finally:
+                # The graph request must not outlive a failed or cancelled crawl
+                if not graph_task.done():
+                    graph_task.cancel()
+                    await asyncio.gather(graph_task, return_exceptions=True)
+
+        async for (application, environment), (resources, graph_nodes) in self.fan_out(
+            list(model.iter_environments()), crawl
+        ):
+            self.dedupe_graph_nodes(graph_nodes)
+            model.add_environment_data(application, environment, resources, graph_nodes)
+        await environments_written
+        await self.entity_writer.flush(BLUEPRINT.WORKLOAD, wait=False)
+
+    def dedupe_graph_nodes(self, graph_nodes: List[Dict[str, Any]]) -> None:
+        """
+        Keeps a single copy of identical resource schemas, which many graph
+        nodes share, for the rest of the run.
+        """
+        if "resourceSchema" not in self.payload_policy.dedupe_properties:
+            return
+        for node in graph_nodes:
+            if isinstance(node.get("resource_schema"), (dict, list)):
+                node["resource_schema"] = self.payload_policy.intern(
+                    node["resource_schema"]
+                )
+
+    def create_application_entity(self, application):
+        return self.mapper.map(BLUEPRINT.APPLICATION, {"application": application})
+
+    def create_environment_entity(self, application, environment):
+        return self.mapper.map(
+            BLUEPRINT.ENVIRONMENT,
+            {"application": application, "environment": environment},
+        )
+
+    def create_workload_entity(self, application, environment, resource):
+        return self.mapper.map(
+            BLUEPRINT.WORKLOAD,
+            {
+                "application": application,
+                "environment": environment,
+                "resource": resource,
+            },
+        )
+
+    def create_resource_graph_entity(
+        self, application, environment, graph_data, include_relations
+    ):
+        entity = self.mapper.map(
+            BLUEPRINT.RESOURCE_GRAPH,
+            {
+                "application": application,
+                "environment": environment,
+                "node": graph_data,
+            },
+        )
+        if not include_relations:
+            entity["relations"] = {}
+        return entity
+
+    def create_resource_entity(self, resource):
+        return self.mapper.map(BLUEPRINT.RESOURCE, {"resource": resource})
+
+    def is_unchanged(
+        self, blueprint_id: str, identifier: str, marker: str | None
+    ) -> bool:
+        identifier = self.org.namespace(identifier)
+        self.seen_identifiers.setdefault(blueprint_id, set()).add(identifier)
+        return bool(self.sync_state) and self.sync_state.is_unchanged(  # type: ignore[union-attr]
+            blueprint_id, identifier, marker
+        )
+
+    def should_write(
+        self, blueprint_id: str, entity: Dict[str, Any], marker: str | None = None
+    ) -> bool:
+        self.seen_identifiers.setdefault(blueprint_id, set()).add(entity["identifier"])
+        if self.checkpoint and self.checkpoint.is_acknowledged(blueprint_id, entity):
+            return False
+        if not self.sync_state:
+            return True
+        return self.sync_state.should_write(blueprint_id, entity, marker)
+
+    def diff_entity(
+        self, blueprint_id: str, entity: Dict[str, Any]
+    ) -> Dict[str, Any] | None:
+        if not self.port_snapshot:
+            return entity
+        return self.port_snapshot.diff(blueprint_id, entity)
+
+    async def write_entity(
+        self,
+        blueprint_id: str,
+        entity: Dict[str, Any],
+        marker: str | None = None,
+        unit: str | None = None,
+        defer_relations: bool = False,
+    ) -> Dict[str, Any] | None:
+        """
+        Queues the entity if it needs writing and returns what was queued. With
+        defer_relations, the entity is queued without its relations and the
+        caller writes the returned changes again once their targets exist.
+        """
+        entity, size = self.payload_policy.apply(
+            blueprint_id, self.org.namespace_entity(entity)
+        )
+        if not self.should_write(blueprint_id, entity, marker):
+            return None
+        if not (changes := self.diff_entity(blueprint_id, entity)):
+            # Port is up to date, the next incremental run can skip the entity
+            if self.sync_state:
+                self.sync_state.confirm(blueprint_id, entity["identifier"])
+            return None
+        self.metrics.count_entity(blueprint_id)
+        if self.checkpoint:
+            self.checkpoint.track(
+                blueprint_id, entity, unit, writes=2 if defer_relations else 1
+            )
+        if defer_relations:
+            await self.entity_writer.add_without_relations(blueprint_id, changes)
+        else:
+            # A diff against Port is smaller than the measured entity
+            await self.entity_writer.add(
+                blueprint_id, changes, size if changes is entity else None
+            )
+        return changes
+
+    async def sync_applications(self, applications: List[Dict[str, Any]]) -> None:
+        if not self.is_pending(BLUEPRINT.APPLICATION):
+            return
+        logger.debug(f"Syncing entities for blueprint {BLUEPRINT.APPLICATION}")
+        for entity in self.mapper.map_batch(
+            BLUEPRINT.APPLICATION,
+            [{"application": application} for application in applications],
+        ):
+            await self.write_entity(BLUEPRINT.APPLICATION, entity)
+
+    async def sync_environments(
+        self, application: Dict[str, Any], environments: List[Dict[str, Any]]
+    ) -> None:
+        if not self.is_pending(BLUEPRINT.ENVIRONMENT):
+            return
+        logger.debug(f"Syncing entities for blueprint {BLUEPRINT.ENVIRONMENT}")
+        markers = {
+            environment["id"]: environment.get("last_deploy", {}).get("created_at")
             for environment in environments
+        }
+        changed = [
+            {"application": application, "environment": environment}
+            for environment in environments
+            if not self.is_unchanged(
+                BLUEPRINT.ENVIRONMENT,
+                f"{application['id']}/{environment['id']}",
+                markers[environment["id"]],
+            )
         ]
-        await asyncio.gather(*tasks)
-        logger.info(f"Finished syncing entities for blueprint {BLUEPRINT.ENVIRONMENT}")
-
-    async def sync_workloads(self):
-        logger.info(f"Syncing entities for blueprint {BLUEPRINT.WORKLOAD}")
-
-        def create_workload_entity(resource, application):
-            identifier = f"{application['id']}/{environment['id']}/{resource['res_id'].replace('modules.', '')}"
-            return {
-                "identifier": identifier,
-                "title": self.remove_symbols_and_title_case(
-                    resource["res_id"].replace("modules.", "")
-                ),
-                "properties": {
-                    "status": resource["status"],
-                    "class": resource["class"],
-                    "driverType": resource["driver_type"],
-                    "definitionVersionId": resource["def_version_id"],
-                    "definitionId": resource["def_id"],
-                    "updatedAt": resource["updated_at"],
-                    "graphResourceID": resource["gu_res_id"],
-                },
-                "relations": {
-                    BLUEPRINT.ENVIRONMENT: f"{application['id']}/{environment['id']}",
-                },
+        for context, entity in zip(
+            changed, self.mapper.map_batch(BLUEPRINT.ENVIRONMENT, changed)
+        ):
+            await self.write_entity(
+                BLUEPRINT.ENVIRONMENT, entity, markers[context["environment"]["id"]]
+            )
+
+    async def sync_workloads(
+        self,
+        application: Dict[str, Any],
+        environment: Dict[str, Any],
+        resources: EnvironmentResources,
+        start: int = 0,
+    ) -> None:
+        """
+        Writes the workloads of an environment, the workload resources under
+        "modules", read from the resource indexes. Only the resources added from
+        position start on are considered.
+        """
+        unit = f"{application['id']}/{environment['id']}"
+        if not self.is_pending(BLUEPRINT.WORKLOAD, unit=unit):
+            return
+        logger.debug(f"Syncing entities for blueprint {BLUEPRINT.WORKLOAD}")
+        changed = [
+            {
+                "application": application,
+                "environment": environment,
+                "resource": resource,
             }
+            for resource in resources.find("workload", prefix="modules", start=start)
+            if not self.is_unchanged(
+                BLUEPRINT.WORKLOAD,
+                f"{application['id']}/{environment['id']}/{resource['res_id'].replace('modules.', '')}",
+                resource["updated_at"],
+            )
+        ]
+        for context, entity in zip(
+            changed, self.mapper.map_batch(BLUEPRINT.WORKLOAD, changed)
+        ):
+            await self.write_entity(
+                BLUEPRINT.WORKLOAD, entity, context["resource"]["updated_at"], unit
+            )
 
-        applications = await self.humanitec_client.get_all_applications()
-        for application in applications:
-            environments = await self.humanitec_client.get_all_environments(application)
-            for environment in environments:
-                resources = await self.humanitec_client.get_all_resources(
-                    application, environment
-                )
-                resource_group = self.humanitec_client.group_resources_by_type(
-                    resources
+    async def sync_resource_graphs(
+        self, model: HumanitecModel, partial: bool = False
+    ) -> None:
+        """
+        Writes every graph node once, after the nodes it depends on. Nodes shared
+        between environments (same guresid) are written once, related to the
+        environment with the smallest application and environment ids, whatever
+        the order of the crawl. A partial sync of some environments keeps the
+        owners found by the last full sync when they are smaller. Only nodes
+        that are part of a dependency cycle are written in two phases: first
+        without relations, then with them once the whole cycle exists.
+        """
+        if not self.is_pending(BLUEPRINT.RESOURCE_GRAPH):
+            return
+        logger.info(f"Syncing entities for blueprint {BLUEPRINT.RESOURCE_GRAPH}")
+        owners = dict(self.graph_owners) if partial else {}
+        unique_nodes: Dict[
+            str, Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]
+        ] = {}
+        for application, environment, node in model.iter_graph_nodes():
+            guresid = node["guresid"]
+            owner = owners.get(guresid)
+            if owner is None or (application["id"], environment["id"]) < (
+                owner[0]["id"],
+                owner[1]["id"],
+            ):
+                owners[guresid] = owner = (application, environment)
+                unique_nodes[guresid] = (application, environment, node)
+            elif guresid not in unique_nodes:
+                unique_nodes[guresid] = (*owner, node)
+        self.graph_owners = owners
+
+        waves, cyclic_ids = order_graph_nodes(
+            [node for _, _, node in unique_nodes.values()]
+        )
+        self.graph_stats = {
+            "nodes": sum(1 for _ in model.iter_graph_nodes()),
+            "unique_nodes": len(unique_nodes),
+            "waves": len(waves),
+            "two_phase_nodes": 0,
+        }
+
+        for wave in waves:
+            second_phase = []
+            for node in wave:
+                application, environment, _ = unique_nodes[node["guresid"]]
+                changes = await self.write_entity(
+                    BLUEPRINT.RESOURCE_GRAPH,
+                    self.create_resource_graph_entity(
+                        application, environment, node, True
+                    ),
+                    defer_relations=node["guresid"] in cyclic_ids,
                 )
-                tasks = [
-                    self.port_client.upsert_entity(
-                        blueprint_id=BLUEPRINT.WORKLOAD,
-                        entity_object=create_workload_entity(resource, application),
-                    )
-                    for resource in resource_group.get("modules", [])
-                    if resource and resource["type"] == "workload"
-                ]
-                await asyncio.gather(*tasks)
-        logger.info(f"Finished syncing entities for blueprint {BLUEPRINT.WORKLOAD}")
+                if changes and node["guresid"] in cyclic_ids:
+                    second_phase.append(changes)
+            await self.entity_writer.flush(BLUEPRINT.RESOURCE_GRAPH)
 
-    async def sync_resource_graphs(self) -> None:
-        logger.info(f"Syncing entities for blueprint {BLUEPRINT.RESOURCE_GRAPH}")
+            for entity in second_phase:
+                await self.entity_writer.add(BLUEPRINT.RESOURCE_GRAPH, entity)
+            self.graph_stats["two_phase_nodes"] += len(second_phase)
 
-        def create_resource_graph_entity(
-            graph_data, include_relations, application, environment
-        ):
-            entity = {
-                "identifier": graph_data["guresid"],
-                "title": self.remove_symbols_and_title_case(graph_data["def_id"]),
-                "properties": {
-                    "type": graph_data["type"],
-                    "class": graph_data["class"],
-                    "resourceSchema": graph_data["resource_schema"],
-                    "resource": graph_data["resource"],
-                },
-                "relations": {},
-            }
-            if include_relations:
+        await self.entity_writer.flush(BLUEPRINT.RESOURCE_GRAPH, wait=False)
+        logger.info(f"Resource graph write statistics: {self.graph_stats}")
 
-                entity["relations"] = {
-                    BLUEPRINT.RESOURCE_GRAPH: graph_data["depends_on"],
-                    BLUEPRINT.ENVIRONMENT: f"{application['id']}/{environment['id']}",
+    async def enrich_resources_with_graph(
+        self,
+        application: Dict[str, Any],
+        environment: Dict[str, Any],
+        resources: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolves the resource graph of all resources of an environment with one
+        POST per chunk of --enrichment-chunk-size resources, and stores the
+        matching graph node under the "__resourceGraph" key of each resource.
+        Nodes are matched back to resources by (id, type).
+        """
+        chunk_size = self.enrichment_chunk_size
+        for start in range(0, len(resources), chunk_size):
+            chunk = resources[start : start + chunk_size]
+            data = [
+                {
+                    "id": resource["res_id"],
+                    "type": resource["type"],
+                    "resource": resource["resource"],
                 }
-            return entity
+                for resource in chunk
+            ]
+            try:
+                response = await self.humanitec_client.get_resource_graph(
+                    application, environment, data
+                )
+            except Exception as e:
+                logger.error(
+                    f"Failed to enrich {len(chunk)} resources of {environment['id']} environment in {application['id']} with graph: {str(e)}"
+                )
+                continue
+
+            nodes_by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+            for node in response or []:
+                nodes_by_key.setdefault((node.get("id"), node.get("type")), node)
+            for resource in chunk:
+                if node := nodes_by_key.get((resource["res_id"], resource["type"])):
+                    resource["__resourceGraph"] = node
+        return resources
 
-        applications = await self.humanitec_client.get_all_applications()
-        for application in applications:
-            environments = await self.humanitec_client.get_all_environments(application)
-            for environment in environments:
-                graph_nodes = await self.humanitec_client.get_dependency_graph(
-                    application, environment
+    async def sync_resources(self, model: HumanitecModel) -> None:
+        if not self.is_pending(BLUEPRINT.RESOURCE):
+            return
+        logger.info(f"Syncing entities for blueprint {BLUEPRINT.RESOURCE}")
+        pending = []
+        for application, environment in model.iter_environments():
+            if not self.is_pending(
+                BLUEPRINT.RESOURCE, unit=f"{application['id']}/{environment['id']}"
+            ):
+                continue
+            resources = [
+                resource
+                for resource in model.resources.get(
+                    (application["id"], environment["id"]), []
                 )
+                if not self.is_unchanged(
+                    BLUEPRINT.RESOURCE,
+                    f"{resource['app_id']}/{resource['env_id']}/{resource['res_id']}",
+                    resource["updated_at"],
+                )
+            ]
+            if resources:
+                pending.append((application, environment, resources))
+            else:
+                self.close_checkpoint_unit(BLUEPRINT.RESOURCE, application, environment)
 
-                # First pass: Create entities without relations
-                tasks = [
-                    self.port_client.upsert_entity(
-                        blueprint_id=BLUEPRINT.RESOURCE_GRAPH,
-                        entity_object=create_resource_graph_entity(
-                            node, False, application, environment
-                        ),
-                    )
-                    for node in graph_nodes
-                ]
-                await asyncio.gather(*tasks)
-
-                # Second pass: Update entities with relations
-                tasks = [
-                    self.port_client.upsert_entity(
-                        blueprint_id=BLUEPRINT.RESOURCE_GRAPH,
-                        entity_object=create_resource_graph_entity(
-                            node, True, application, environment
-                        ),
-                    )
-                    for node in graph_nodes
-                ]
-                await asyncio.gather(*tasks)
-        logger.info(
-            f"Finished syncing entities for blueprint {BLUEPRINT.RESOURCE_GRAPH}"
+        if self.enrich_resources:
+            environments_resources = self.fan_out(
+                pending, self.enrich_resources_with_graph
+            )
+        else:
+            environments_resources = self.iter_pending_resources(pending)
+
+        async for (application, environment, _), resources in environments_resources:
+            unit = f"{application['id']}/{environment['id']}"
+            entities = self.mapper.map_batch(
+                BLUEPRINT.RESOURCE, [{"resource": resource} for resource in resources]
+            )
+            for resource, entity in zip(resources, entities):
+                await self.write_entity(
+                    BLUEPRINT.RESOURCE, entity, resource["updated_at"], unit
+                )
+            self.close_checkpoint_unit(BLUEPRINT.RESOURCE, application, environment)
+        await self.entity_writer.flush(BLUEPRINT.RESOURCE, wait=False)
+
+    @staticmethod
+    async def iter_pending_resources(
+        pending: List[Tuple[Dict[str, Any], Dict[str, Any], List[Dict[str, Any]]]],
+    ) -> AsyncIterator[Tuple[Any, List[Dict[str, Any]]]]:
+        for application, environment, resources in pending:
+            yield (application, environment, resources), resources
+
+    async def sync_all(self) -> None:
+        """
+        Crawls every Humanitec organization once, concurrently, and writes
+        their entities through the shared Port writer.
+        """
+        self.start_run()
+        if self.port_snapshot:
+            self.snapshot_task = asyncio.create_task(
+                self.port_snapshot.load(self.port_client, self.synced_blueprints)
+            )
+        for exporter in self.org_exporters:
+            exporter.port_snapshot = self.port_snapshot
+            exporter.snapshot_task = self.snapshot_task
+        results = await asyncio.gather(
+            *(exporter.sync_org() for exporter in self.org_exporters),
+            return_exceptions=len(self.org_exporters) > 1,
         )
 
-    async def enrich_resource_with_graph(self, resource, application, environment):
+        models: Dict[str, HumanitecModel] = {}
+        for exporter, result in zip(self.org_exporters, results):
+            if isinstance(result, BaseException):
+                logger.error(
+                    f"Sync of organization {exporter.org.org_id} failed: {str(result)}"
+                )
+                self.failed_orgs.append(exporter.org.org_id)
+                continue
+            models[exporter.org.org_id] = result
+        crawl_complete = not self.get_failed_requests()
+        if isinstance(self.entity_writer, NDJSONEntitySink):
+            self.entity_writer.close(crawl_complete)
+        await self.finish_run(crawl_complete, models)
+
+    async def sync_org(self) -> HumanitecModel:
+        """
+        Crawls the Humanitec organization once and writes the entities of every
+        blueprint in dependency order. Entities are queued page by page while
+        the listings are streamed, each layer is written in the background
+        while the next layer is crawled, and only awaited before the entities
+        that relate to it are sent.
+        """
+        model = HumanitecModel()
+        checkpoint_task = (
+            asyncio.create_task(self.save_checkpoints()) if self.checkpoint else None
+        )
         try:
-            logger.info("Enriching resource %s with graph", resource["res_id"])
-            data = {
-                "id": resource["res_id"],
-                "type": resource["type"],
-                "resource": resource["resource"],
-            }
-            response = await self.humanitec_client.get_resource_graph(
-                application, environment, [data]
+            await self.replay_checkpoint()
+            with self.phase("crawl_applications"):
+                await self.crawl_applications(model)
+            self.close_checkpoint_unit(BLUEPRINT.APPLICATION)
+            with self.phase("crawl_environments"):
+                await self.crawl_environments(model)
+            self.close_checkpoint_unit(BLUEPRINT.ENVIRONMENT)
+            with self.phase("crawl_environment_data"):
+                await self.crawl_environment_data(model)
+            self.close_checkpoint_unit(BLUEPRINT.WORKLOAD)
+            logger.info(
+                f"Finished crawling Humanitec organization {self.org.org_id}: {model.summary()}"
             )
+            with self.phase("sync_resource_graphs"):
+                await self.sync_resource_graphs(model)
+            self.close_checkpoint_unit(BLUEPRINT.RESOURCE_GRAPH)
+
+            with self.phase("sync_resources"):
+                await self.entity_writer.flush(BLUEPRINT.WORKLOAD)
+                await self.sync_resources(model)
+            self.close_checkpoint_unit(BLUEPRINT.RESOURCE)
+            with self.phase("flush"):
+                await self.entity_writer.flush()
+        finally:
+            if checkpoint_task:
+                checkpoint_task.cancel()
+                self.finish_checkpoint()
+        return model
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """
+        Times a phase of the sync, per organization when several organizations
+        are synced concurrently.
+        """
+        return self.metrics.phase(
+            f"{self.org.org_id}/{name}" if self.scheduler else name
+        )
 
-            resource.update(
-                {"__resourceGraph": i for i in response if i["type"] == data["type"]}
+    def get_failed_requests(self) -> List[str]:
+        if not self.scheduler:
+            return self.humanitec_client.failed_requests
+        return [f"orgs/{org_id}" for org_id in self.failed_orgs] + [
+            f"orgs/{exporter.org.org_id}/{path}"
+            for exporter in self.org_exporters
+            for path in exporter.humanitec_client.failed_requests
+        ]
+
+    def get_seen_identifiers(self) -> Dict[str, Set[str]]:
+        seen: Dict[str, Set[str]] = {}
+        for exporter in self.org_exporters:
+            for blueprint_id, identifiers in exporter.seen_identifiers.items():
+                seen.setdefault(blueprint_id, set()).update(identifiers)
+        return seen
+
+    def close_checkpoint_unit(
+        self,
+        blueprint_id: str,
+        application: Dict[str, Any] | None = None,
+        environment: Dict[str, Any] | None = None,
+    ) -> None:
+        """
+        Marks that every entity of the blueprint, or of the blueprint in the
+        environment, was queued. Units whose Humanitec listings failed are not
+        closed, so a resumed run crawls them again.
+        """
+        if not self.checkpoint:
+            return
+        failed_requests = self.humanitec_client.failed_requests
+        if application is None or environment is None:
+            if not failed_requests:
+                self.checkpoint.close(blueprint_id)
+            return
+        resources_path = f"apps/{application['id']}/envs/{environment['id']}/resources"
+        if resources_path not in failed_requests:
+            self.checkpoint.close(
+                blueprint_id, f"{application['id']}/{environment['id']}"
             )
-            return resource
-        except Exception as e:
-            logger.error(
-                f"Failed to enrich resource {resource['res_id']} with graph: %s", str(e)
+
+    def save_checkpoint(self) -> None:
+        self.checkpoint.update(self.entity_writer.results)  # type: ignore[union-attr]
+        self.checkpoint.save(self.entity_writer.get_queued())  # type: ignore[union-attr]
+
+    async def save_checkpoints(self) -> None:
+        while True:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                self.save_checkpoint()
+            except Exception as e:
+                logger.warning(f"Failed to save checkpoint: {str(e)}")
+
+    def finish_checkpoint(self) -> None:
+        """
+        Removes the checkpoint once every synced blueprint is complete, and
+        otherwise saves it so that --resume only retries what is missing.
+        """
+        checkpoint: SyncCheckpoint = self.checkpoint  # type: ignore[assignment]
+        checkpoint.update(self.entity_writer.results)
+        incomplete = [
+            blueprint_id
+            for blueprint_id in self.synced_blueprints
+            if blueprint_id not in checkpoint.completed_blueprints
+        ]
+        if not incomplete:
+            checkpoint.remove()
+            return
+        self.save_checkpoint()
+        logger.warning(
+            f"Blueprints {incomplete} were not completely synced, run with --resume to retry them, progress was saved to {checkpoint.path}"
+        )
+
+    async def replay_checkpoint(self) -> None:
+        """
+        Writes the entities that were still queued when the interrupted run
+        saved its checkpoint, parents first. Entities queued without their
+        relations (the first write of a relation cycle) are left to the crawl.
+        The entities Port acknowledged in the interrupted run count as seen,
+        as the crawl skips the units they were completed in.
+        """
+        if not self.checkpoint:
+            return
+        for blueprint_id, hashes in self.checkpoint.acknowledged.items():
+            self.seen_identifiers.setdefault(blueprint_id, set()).update(hashes)
+            if self.sync_state:
+                for identifier, entity_hash in hashes.items():
+                    self.sync_state.confirm(blueprint_id, identifier, entity_hash)
+        pending = self.checkpoint.take_pending()
+        for blueprint_id in reversed(RECONCILE_ORDER):
+            records = [
+                record
+                for record in pending.get(blueprint_id, [])
+                if "relations" in record["entity"]
+            ]
+            if not (records and self.sync_filter.includes(blueprint_id)):
+                continue
+            logger.info(
+                f"Replaying {len(records)} pending {blueprint_id} entities from the checkpoint"
             )
-            return resource
+            for record in records:
+                # Same bookkeeping as a crawled entity, so that reconciliation
+                # and the incremental state account for it
+                if self.should_write(blueprint_id, record["entity"]):
+                    self.metrics.count_entity(blueprint_id)
+                    await self.entity_writer.add(blueprint_id, record["entity"])
+            await self.entity_writer.flush(blueprint_id)
+            upserted = set(
+                self.entity_writer.results.get(blueprint_id, {}).get("upserted", [])
+            )
+            for record in records:
+                if record["entity"]["identifier"] in upserted:
+                    self.checkpoint.acknowledge(
+                        blueprint_id, record["entity"]["identifier"], record["hash"]
+                    )
+            self.checkpoint.stats["replayed"] += len(records)
 
-    async def sync_resources(self) -> None:
-        logger.info(f"Syncing entities for blueprint {BLUEPRINT.RESOURCE}")
+    async def import_entities(self, path: str) -> None:
+        """
+        Replays a file written with --export-to into Port, streaming it record
+        by record. Flush barriers in the file keep the dependency order of the
+        original sync, and entities that are part of a relation cycle are
+        written without relations first, then completely.
+        """
+        logger.info(f"Importing entities from {path}")
+        if self.port_snapshot:
+            await self.port_snapshot.load(self.port_client, self.synced_blueprints)
+        crawl_complete = False
+        second_phase: Dict[Tuple[str, str], Dict[str, Any] | None] = {}
+        with self.metrics.phase("import"):
+            for record in iter_export_records(path):
+                if "flush" in record:
+                    await self.entity_writer.flush(record["flush"])
+                    continue
+                if "summary" in record:
+                    crawl_complete = record["summary"]["crawl_complete"]
+                    continue
 
-        def create_resource_entity(resource):
-            workload_id = (
-                resource["res_id"].split(".")[1]
-                if resource["res_id"].split(".")[0].startswith("modules")
-                else ""
+                blueprint_id, entity = record["blueprint"], record["entity"]
+                key = (blueprint_id, entity["identifier"])
+                if key in second_phase:
+                    if changes := second_phase.pop(key):
+                        await self.entity_writer.add(blueprint_id, changes)
+                    continue
+                changes = await self.write_entity(
+                    blueprint_id,
+                    entity,
+                    defer_relations=bool(record.get("without_relations")),
+                )
+                if record.get("without_relations"):
+                    second_phase[key] = changes
+        with self.metrics.phase("flush"):
+            await self.entity_writer.flush()
+
+        if not crawl_complete:
+            logger.warning(
+                f"{path} does not come from a complete crawl, stale entities will not be deleted"
             )
-            resource_id = (
-                f"{resource['app_id']}/{resource['env_id']}/{resource['res_id']}"
+        await self.finish_run(crawl_complete=crawl_complete)
+
+    async def finish_run(
+        self, crawl_complete: bool, models: Dict[str, HumanitecModel] | None = None
+    ) -> None:
+        if self.port_snapshot:
+            logger.info(f"Port diff summary: {self.port_snapshot.stats}")
+        if self.reconciler:
+            with self.metrics.phase("reconcile"):
+                await self.reconciler.reconcile(
+                    self.get_seen_identifiers(), crawl_complete=crawl_complete
+                )
+
+        self.log_failures()
+        self.commit_state(
+            partial=self.sync_filter.is_scoped
+            or any(
+                exporter.checkpoint and exporter.checkpoint.resumed
+                for exporter in self.org_exporters
             )
-            entity = {
-                "identifier": resource_id,
-                "title": self.remove_symbols_and_title_case(resource["def_id"]),
-                "properties": {
-                    "type": resource["type"],
-                    "class": resource["class"],
-                    "resource": resource["resource"],
-                    "status": resource["status"],
-                    "updateAt": resource["updated_at"],
-                    "driverType": resource["driver_type"],
+        )
+        await self.write_run_report(models, crawl_complete)
+        logger.info("Event Finished")
+
+    def start_run(self) -> None:
+        """
+        Resets the per-run state, so that a long-running process can sync
+        several times.
+        """
+        self.entity_writer.results = {}
+        self.failed_orgs = []
+        if self.sync_state:
+            self.sync_state.counts = {}
+        self.payload_policy.reset()
+        if self.port_snapshot:
+            self.port_snapshot = PortSnapshot(self.serializer)
+        for exporter in self.org_exporters:
+            exporter.humanitec_client.reset()
+            exporter.seen_identifiers = {}
+            exporter.graph_stats = {}
+            if exporter.checkpoint:
+                exporter.checkpoint.reset()
+
+    def commit_state(self, partial: bool = False) -> None:
+        if not self.sync_state:
+            return
+        self.sync_state.commit(
+            {
+                blueprint_id: set(results["upserted"])
+                for blueprint_id, results in self.entity_writer.results.items()
+            },
+            partial=partial,
+        )
+        self.sync_state.save()
+
+    async def sync_environment(self, app_id: str, env_id: str) -> None:
+        """
+        Re-syncs the environment, workload, resource graph and resource entities
+        of a single environment, e.g. after a deployment. Stale entities are
+        left to the next full sync.
+        """
+        if not self.in_shard(app_id):
+            logger.debug(f"Ignoring {app_id}/{env_id}, it belongs to another shard")
+            return
+        self.start_run()
+        self.humanitec_client.invalidate_environment(app_id, env_id)
+        try:
+            application = await self.humanitec_client.get_application(app_id)
+            environment = await self.humanitec_client.get_environment(app_id, env_id)
+        except Exception as e:
+            logger.warning(f"Skipping sync of {app_id}/{env_id}: {str(e)}")
+            return
+        if not (
+            self.sync_filter.match_application(application)
+            and self.sync_filter.match_environment(environment)
+        ):
+            logger.debug(f"Ignoring {app_id}/{env_id}, it does not match the filters")
+            return
+
+        model = HumanitecModel()
+        model.applications = [application]
+        model.add_environments(application, [environment])
+        resource_list, graph_nodes = await asyncio.gather(
+            self.humanitec_client.get_all_resources(application, environment),
+            self.humanitec_client.get_dependency_graph(application, environment),
+        )
+        resources = EnvironmentResources(resource_list)
+        self.dedupe_graph_nodes(graph_nodes)
+        model.add_environment_data(application, environment, resources, graph_nodes)
+
+        # The Port snapshot is only up to date right after a full sync loads it
+        port_snapshot, self.port_snapshot = self.port_snapshot, None
+        try:
+            with self.metrics.phase("sync_environment"):
+                await self.sync_environments(application, [environment])
+                await self.entity_writer.flush(BLUEPRINT.ENVIRONMENT)
+                await self.sync_workloads(application, environment, resources)
+                await self.sync_resource_graphs(model, partial=True)
+                await self.entity_writer.flush(BLUEPRINT.WORKLOAD)
+                await self.sync_resources(model)
+                await self.entity_writer.flush()
+        finally:
+            self.port_snapshot = port_snapshot
+
+        self.log_failures()
+        self.commit_state(partial=True)
+        logger.info(
+            f"Synced environment {env_id} of {app_id}: {self.entity_writer.summary()}"
+        )
+
+    async def close(self) -> None:
+        if self.http_cache:
+            self.http_cache.close()
+        await self.humanitec_http_client.aclose()
+        await self.port_http_client.aclose()
+
+    def log_failures(self, limit: int = 20) -> None:
+        """
+        Logs the first failed upserts individually and summarizes the rest, the
+        complete list is part of the run report.
+        """
+        failures = [
+            (blueprint_id, failure)
+            for blueprint_id, results in self.entity_writer.results.items()
+            for failure in results["failed"]
+        ]
+        for blueprint_id, failure in failures[:limit]:
+            logger.warning(
+                f"Failed to upsert {blueprint_id} entity {failure['identifier']}: {failure['error']}"
+            )
+        if len(failures) > limit:
+            logger.warning(f"... and {len(failures) - limit} more failed upserts")
+
+    def build_run_report(
+        self, models: Dict[str, HumanitecModel] | None, crawl_complete: bool
+    ) -> Dict[str, Any]:
+        report = self.metrics.report()
+        report.update(
+            {
+                "crawl_complete": crawl_complete,
+                "model": (
+                    merge_reports([model.summary() for model in models.values()])
+                    if models
+                    else None
+                ),
+                "upserts": self.entity_writer.summary(),
+                "failed_upserts": {
+                    blueprint_id: results["failed"]
+                    for blueprint_id, results in self.entity_writer.results.items()
+                    if results["failed"]
+                },
+                "failed_requests": self.get_failed_requests(),
+                "port_token": self.port_client.token_manager.stats,
+                "humanitec_requests": self.humanitec_request_executor.summary(),
+                "port_requests": self.port_request_executor.summary(),
+                "connection_pools": {
+                    "humanitec": self.humanitec_pool.summary(),
+                    "port": self.port_pool.summary(),
+                },
+                "runtime": {
+                    "json_backend": self.serializer.name,
+                    "event_loop": type(asyncio.get_running_loop()).__module__.split(
+                        "."
+                    )[0],
                 },
-                "relations": {},
+                "graph": merge_reports(
+                    [exporter.graph_stats for exporter in self.org_exporters]
+                ),
+                "payload": self.payload_policy.summary(),
             }
-            if workload_id:
-                workload_id = f"{resource['app_id']}/{resource['env_id']}/{workload_id}"
-                entity["relations"][BLUEPRINT.WORKLOAD] = workload_id
-            return entity
-
-        applications = await self.humanitec_client.get_all_applications()
-        for application in applications:
-            environments = await self.humanitec_client.get_all_environments(application)
-            for environment in environments:
-                resources = await self.humanitec_client.get_all_resources(
-                    application, environment
-                )
+        )
+        if self.port_client.compression_stats["requests"]:
+            report["port_compression"] = self.port_client.compression_stats
+        if self.http_cache:
+            report["http_cache"] = self.http_cache.stats
+        if self.sync_state:
+            report["incremental"] = self.sync_state.counts
+        if self.port_snapshot:
+            report["diff"] = self.port_snapshot.stats
+        if self.reconciler:
+            report["reconcile"] = self.reconciler.stats
+        if self.checkpoint and not self.scheduler:
+            report["checkpoint"] = self.checkpoint.summary()
+        if self.scheduler:
+            report["orgs"] = {
+                exporter.org.org_id: {
+                    "prefix": exporter.org.prefix,
+                    "crawl_complete": not (
+                        exporter.humanitec_client.failed_requests
+                        or exporter.org.org_id in self.failed_orgs
+                    ),
+                    "model": (
+                        models[exporter.org.org_id].summary()
+                        if models and exporter.org.org_id in models
+                        else None
+                    ),
+                    "graph": exporter.graph_stats,
+                    "scheduler": self.scheduler.summary()[exporter.org.org_id],
+                    **(
+                        {"checkpoint": exporter.checkpoint.summary()}
+                        if exporter.checkpoint
+                        else {}
+                    ),
+                }
+                for exporter in self.org_exporters
+            }
+        if self.shard_count > 1:
+            # Needed by the merge step to find stale entities across all shards
+            report["shard"] = {"index": self.shard_index, "count": self.shard_count}
+            report["seen_identifiers"] = {
+                blueprint_id: sorted(identifiers)
+                for blueprint_id, identifiers in self.get_seen_identifiers().items()
+            }
+        return report
 
-                entity_tasks = [
-                    self.port_client.upsert_entity(
-                        blueprint_id=BLUEPRINT.RESOURCE,
-                        entity_object=create_resource_entity(resource),
+    async def write_run_report(
+        self, models: Dict[str, HumanitecModel] | None, crawl_complete: bool
+    ) -> None:
+        report = self.build_run_report(models, crawl_complete)
+        logger.info(
+            f"Run finished in {report['duration_seconds']}s, "
+            f"phases: {report['phases_seconds']}, entities: {report['entities']}, "
+            f"upserts: {report['upserts']}"
+        )
+        if self.report_file:
+            with open(self.report_file, "w") as file:
+                json.dump(report, file, indent=2, default=str)
+            logger.info(f"Wrote run report to {self.report_file}")
+        if not (self.prometheus_file or self.pushgateway_url):
+            return
+        metrics = self.metrics.to_prometheus()
+        if self.prometheus_file:
+            with open(self.prometheus_file, "w") as file:
+                file.write(metrics)
+        if self.pushgateway_url:
+            url = (
+                f"{self.pushgateway_url.rstrip('/')}/metrics/job/humanitec_integration"
+            )
+            try:
+                async with httpx.AsyncClient(timeout=10.0) as client:
+                    response = await client.put(
+                        url,
+                        content=metrics,
+                        headers={"Content-Type": "text/plain; version=0.0.4"},
                     )
-                    for resource in resources
-                ]
-                await asyncio.gather(*entity_tasks)
-                logger.info(
-                    "Upserted resource entities for %s environment", environment["id"]
-                )
+                response.raise_for_status()
+            except Exception as e:
+                logger.error(f"Failed to push metrics to {url}: {str(e)}")
 
-        logger.info(f"Finished syncing entities for blueprint {BLUEPRINT.RESOURCE}")
+    async def merge_shard_reports(self, paths: List[str]) -> None:
+        """
+        Combines the run reports of the shards of a sync into a single report
+        and, with --reconcile, deletes the entities that no shard has seen. Stale
+        entities are only deleted when every shard reported a complete crawl.
+        """
+        reports = []
+        for path in paths:
+            with open(path) as file:
+                reports.append(json.load(file))
 
-    async def sync_all(self) -> None:
-        await self.sync_applications()
-        await self.sync_environments()
-        await self.sync_workloads()
-        await self.sync_resource_graphs()
-        await self.sync_resources()
-        logger.info("Event Finished")
+        shard_counts = {report.get("shard", {}).get("count") for report in reports}
+        shard_indexes = {report.get("shard", {}).get("index") for report in reports}
+        shard_count = next(iter(shard_counts)) if len(shard_counts) == 1 else None
+        if not shard_count:
+            logger.error(
+                f"Reports have missing or different shard counts {sorted(map(str, shard_counts))}, they must come from the shards of one sync"
+            )
+            crawl_complete = False
+        else:
+            crawl_complete = shard_indexes == set(range(shard_count))
+        if shard_count and not crawl_complete:
+            logger.warning(
+                f"Reports cover shards {sorted(map(str, shard_indexes))} of {shard_count}, expected every shard of one sync"
+            )
 
-    async def __call__(self, args) -> None:
-        await self.sync_all()
+        seen: Dict[str, Set[str]] = {}
+        overlaps: Dict[str, int] = {}
+        for report in reports:
+            report.pop("shard", None)
+            for blueprint_id, identifiers in report.pop("seen_identifiers", {}).items():
+                blueprint_seen = seen.setdefault(blueprint_id, set())
+                overlap = blueprint_seen.intersection(identifiers)
+                if overlap:
+                    overlaps[blueprint_id] = overlaps.get(blueprint_id, 0) + len(
+                        overlap
+                    )
+                blueprint_seen.update(identifiers)
+        if overlaps:
+            logger.warning(f"Entities written by more than one shard: {overlaps}")
 
+        merged = merge_reports(reports)
+        crawl_complete = crawl_complete and merged.get("crawl_complete", False)
+        merged.update(
+            {
+                "crawl_complete": crawl_complete,
+                "shards": len(reports),
+                "shard_overlaps": overlaps,
+            }
+        )
+        if self.reconciler:
+            with self.metrics.phase("reconcile"):
+                await self.reconciler.reconcile(seen, crawl_complete=crawl_complete)
+            merged["reconcile"] = self.reconciler.stats
+            merged["port_requests"] = self.port_request_executor.summary()
 
-if __name__ == "__main__":
+        logger.info(
+            f"Merged {len(reports)} shard reports, entities: {merged.get('entities')}, upserts: {merged.get('upserts')}"
+        )
+        if self.report_file:
+            with open(self.report_file, "w") as file:
+                json.dump(merged, file, indent=2, default=str)
+            logger.info(f"Wrote merged run report to {self.report_file}")
 
-    def validate_args(args):
-        required_keys = ["org_id", "api_key", "port_client_id", "port_client_secret"]
-        missing_keys = [key for key in required_keys if not getattr(args, key)]
+    async def __call__(self, args) -> None:
+        try:
+            if args.daemon:
+                await SyncDaemon(
+                    self,
+                    host=args.webhook_host,
+                    port=args.webhook_port,
+                    secret=args.webhook_secret,
+                    debounce=args.debounce,
+                    full_sync_interval=args.full_sync_interval,
+                ).run()
+            elif args.merge_reports:
+                await self.merge_shard_reports(
+                    [path.strip() for path in args.merge_reports.split(",")]
+                )
+            elif self.import_from:
+                await self.import_entities(self.import_from)
+            else:
+                await self.sync_all()
+        finally:
+            await self.close()
 
-        if missing_keys:
-            logger.error(f"The following keys are required: {', '.join(missing_keys)}")
-            return False
-        return True
 
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--org-id",
         required=False,
         default=config("ORG_ID", ""),
         type=str,
-        help="Humanitec organization ID",
+        help="Humanitec organization ID, or comma separated IDs to sync several organizations",
+    )
+    parser.add_argument(
+        "--orgs-file",
+        default=config("ORGS_FILE", ""),
+        help='JSON list of the organizations to sync, e.g. [{"id": "acme", "api_key_env": "ACME_API_KEY", "prefix": "acme"}]',
     )
     parser.add_argument(
         "--api-key",
         required=False,
         default=config("API_KEY", ""),
         type=str,
-        help="Humanitec API key",
+        help="Humanitec API key, API_KEY_<ORG_ID> overrides it for one organization",
     )
     parser.add_argument(
         "--api-url",
         type=str,
-        default=config("API_URL", "https://api.humanitec.com"),
+        default=config("API_URL", "https://api.humanitec.io"),
         help="Humanitec API URL",
     )
     parser.add_argument(
@@ -347,11 +1432,412 @@ if __name__ == "__main__":
         default=config("PORT_CLIENT_SECRET", ""),
         help="Port client secret",
     )
+    parser.add_argument(
+        "--port-api-url",
+        type=str,
+        default=config("PORT_API_URL", "https://api.getport.io/v1"),
+        help="Port API URL",
+    )
+    parser.add_argument(
+        "--port-batch-size",
+        type=int,
+        default=config("PORT_BATCH_SIZE", 20, cast=int),
+        help="Number of entities sent per Port bulk upsert request (max 20)",
+    )
+    parser.add_argument(
+        "--port-max-concurrency",
+        type=int,
+        default=config("PORT_MAX_CONCURRENCY", 5, cast=int),
+        help="Maximum number of concurrent Port bulk upsert requests",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=config("MAX_CONCURRENCY", 10, cast=int),
+        help="Maximum number of concurrent Humanitec requests when fanning out over applications and environments",
+    )
+    parser.add_argument(
+        "--humanitec-max-connections",
+        type=int,
+        default=config("HUMANITEC_MAX_CONNECTIONS", 0, cast=int),
+        help="Size of the Humanitec connection pool (0 uses --max-concurrency)",
+    )
+    parser.add_argument(
+        "--port-max-connections",
+        type=int,
+        default=config("PORT_MAX_CONNECTIONS", 0, cast=int),
+        help="Size of the Port connection pool (0 uses --port-max-concurrency)",
+    )
+    parser.add_argument(
+        "--max-keepalive-connections",
+        type=int,
+        default=config("MAX_KEEPALIVE_CONNECTIONS", 0, cast=int),
+        help="Idle connections kept open per pool (0 keeps the whole pool open)",
+    )
+    parser.add_argument(
+        "--keepalive-expiry",
+        type=float,
+        default=config("KEEPALIVE_EXPIRY", 30.0, cast=float),
+        help="Seconds an idle connection is kept open",
+    )
+    parser.add_argument(
+        "--pool-timeout",
+        type=float,
+        default=config("POOL_TIMEOUT", 30.0, cast=float),
+        help="Seconds a request waits for a free connection before failing",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=config("HTTP2", False, cast=bool),
+        help="Multiplex requests over HTTP/2 connections (requires the h2 package)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=config("INCREMENTAL", False, cast=bool),
+        help="Skip entities that did not change since the previous run recorded in --state-file",
+    )
+    parser.add_argument(
+        "--state-file",
+        type=str,
+        default=config("STATE_FILE", ".humanitec-sync-state.json"),
+        help="Path of the state file used by --incremental",
+    )
+    parser.add_argument(
+        "--checkpoint-file",
+        type=str,
+        default=config("CHECKPOINT_FILE", ".humanitec-sync-checkpoint.json"),
+        help="Path of the file the progress of a sync is saved to, removed once the sync completes",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=config("CHECKPOINT_INTERVAL", 0.0, cast=float),
+        help="Seconds between two saves of --checkpoint-file, 0 disables checkpoints unless --resume is set, which saves every 30 seconds",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=config("RESUME", False, cast=bool),
+        help="Skip the work completed by the interrupted sync saved in --checkpoint-file",
+    )
+    parser.add_argument(
+        "--payload-rules",
+        type=str,
+        default=config("PAYLOAD_RULES", ""),
+        help="Per property size rules, e.g. resourceSchema=summarize:16384,humanitecResource.resource=truncate:65536 (actions: prune, truncate, summarize)",
+    )
+    parser.add_argument(
+        "--dedupe-properties",
+        type=str,
+        default=config("DEDUPE_PROPERTIES", ""),
+        help="Comma separated properties whose identical values are stored and processed once, e.g. resourceSchema",
+    )
+    parser.add_argument(
+        "--max-entity-kb",
+        type=float,
+        default=config("MAX_ENTITY_KB", 0.0, cast=float),
+        help="Entities larger than this have their largest properties summarized, 0 disables the limit",
+    )
+    parser.add_argument(
+        "--port-max-batch-kb",
+        type=float,
+        default=config("PORT_MAX_BATCH_KB", 4096.0, cast=float),
+        help="Upper bound of the entities sent in one Port bulk request, 0 disables the limit",
+    )
+    parser.add_argument(
+        "--port-compress-requests",
+        action="store_true",
+        default=config("PORT_COMPRESS_REQUESTS", False, cast=bool),
+        help="Send Port request bodies gzip compressed, falls back to plain bodies if Port rejects them",
+    )
+    parser.add_argument(
+        "--json-backend",
+        default=config("JSON_BACKEND", "auto"),
+        help="JSON codec of the Humanitec and Port requests: orjson, msgspec, json, or auto to use the fastest installed one",
+    )
+    parser.add_argument(
+        "--event-loop",
+        default=config("EVENT_LOOP", "auto"),
+        help="Event loop to run on: uvloop, asyncio, or auto to use uvloop when it is installed",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=str,
+        default=config("HTTP_CACHE", ""),
+        help="Path of a SQLite file used to cache Humanitec GET responses between runs",
+    )
+    parser.add_argument(
+        "--http-cache-max-mb",
+        type=int,
+        default=config("HTTP_CACHE_MAX_MB", 256, cast=int),
+        help="Maximum size of the Humanitec HTTP cache before least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--http-cache-ttl",
+        type=str,
+        default=config("HTTP_CACHE_TTL", ""),
+        help="Per endpoint TTLs in seconds, e.g. apps=600,envs=600,resources=0,graphs=forever",
+    )
+    parser.add_argument(
+        "--enrich-resources",
+        action="store_true",
+        default=config("ENRICH_RESOURCES", False, cast=bool),
+        help="Attach the resource graph of every resource to the humanitecResource entities",
+    )
+    parser.add_argument(
+        "--enrichment-chunk-size",
+        type=int,
+        default=config("ENRICHMENT_CHUNK_SIZE", 100, cast=int),
+        help="Maximum number of resources sent per resource graph request",
+    )
+    parser.add_argument(
+        "--humanitec-rate-limit",
+        type=float,
+        default=config("HUMANITEC_RATE_LIMIT", 0, cast=float),
+        help="Maximum Humanitec requests per second (0 disables the limit)",
+    )
+    parser.add_argument(
+        "--port-rate-limit",
+        type=float,
+        default=config("PORT_RATE_LIMIT", 0, cast=float),
+        help="Maximum Port requests per second (0 disables the limit)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=config("MAX_RETRIES", 5, cast=int),
+        help="Maximum number of retries for throttled or failed requests",
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        default=config("RECONCILE", False, cast=bool),
+        help="Delete Port entities that no longer exist in Humanitec after the sync",
+    )
+    parser.add_argument(
+        "--reconcile-max-delete-ratio",
+        type=float,
+        default=config("RECONCILE_MAX_DELETE_RATIO", 0.3, cast=float),
+        help="Abort reconciliation if a blueprint would lose more than this fraction of its entities",
+    )
+    parser.add_argument(
+        "--delete-batch-size",
+        type=int,
+        default=config("DELETE_BATCH_SIZE", 100, cast=int),
+        help="Number of entities deleted per Port bulk delete request",
+    )
+    parser.add_argument(
+        "--diff-against-port",
+        action="store_true",
+        default=config("DIFF_AGAINST_PORT", False, cast=bool),
+        help="Read existing entities from Port first and only send entities and properties that changed",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=config("PAGE_SIZE", 0, cast=int),
+        help="Number of items requested per page from Humanitec list endpoints (0 uses the API default)",
+    )
+    parser.add_argument(
+        "--export-to",
+        default=config("EXPORT_TO", ""),
+        help="Crawl Humanitec and write the entities to this gzip compressed NDJSON file instead of Port",
+    )
+    parser.add_argument(
+        "--import-from",
+        default=config("IMPORT_FROM", ""),
+        help="Write the entities of a file created with --export-to to Port instead of crawling Humanitec",
+    )
+    parser.add_argument(
+        "--mapping-file",
+        default=config("MAPPING_FILE", os.path.join(RESOURCES_DIR, "mappings.json")),
+        help="Declarative mapping of Humanitec records to Port entities",
+    )
+    parser.add_argument(
+        "--apps",
+        default=config("APPS", ""),
+        help="Comma-separated glob patterns of the application ids to sync",
+    )
+    parser.add_argument(
+        "--envs",
+        default=config("ENVS", ""),
+        help="Comma-separated glob patterns of the environment ids to sync",
+    )
+    parser.add_argument(
+        "--env-types",
+        default=config("ENV_TYPES", ""),
+        help="Comma-separated glob patterns of the environment types to sync",
+    )
+    parser.add_argument(
+        "--blueprints",
+        default=config("BLUEPRINTS", ""),
+        help=f"Comma-separated blueprints to sync, out of {', '.join(RECONCILE_ORDER)}",
+    )
+    parser.add_argument(
+        "--shard-index",
+        type=int,
+        default=config("SHARD_INDEX", 0, cast=int),
+        help="Index of the applications shard synced by this process, starting at 0",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        default=config("SHARD_COUNT", 1, cast=int),
+        help="Number of shards the applications are split into by a stable hash of their id",
+    )
+    parser.add_argument(
+        "--merge-reports",
+        default=config("MERGE_REPORTS", ""),
+        help="Comma-separated run reports of all shards of a sync to merge (and reconcile with --reconcile)",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=config("DAEMON", False, cast=bool),
+        help="Keep running and re-sync environments when Humanitec deployment webhooks arrive",
+    )
+    parser.add_argument(
+        "--webhook-host",
+        default=config("WEBHOOK_HOST", "127.0.0.1"),
+        help="Address the webhook endpoint listens on in daemon mode, other addresses than localhost require --webhook-secret",
+    )
+    parser.add_argument(
+        "--webhook-port",
+        type=int,
+        default=config("WEBHOOK_PORT", 8000, cast=int),
+        help="Port the webhook endpoint listens on in daemon mode",
+    )
+    parser.add_argument(
+        "--webhook-secret",
+        default=config("WEBHOOK_SECRET", ""),
+        help="Shared secret expected in the Authorization: Bearer header of webhook requests",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=config("DEBOUNCE", 30.0, cast=float),
+        help="Seconds to wait for further events on an environment before syncing it",
+    )
+    parser.add_argument(
+        "--full-sync-interval",
+        type=float,
+        default=config("FULL_SYNC_INTERVAL", 86400.0, cast=float),
+        help="Seconds between full syncs in daemon mode",
+    )
+    parser.add_argument(
+        "--report-file",
+        default=config("REPORT_FILE", ""),
+        help="Write a JSON report with timings, request metrics and sync statistics to this file",
+    )
+    parser.add_argument(
+        "--prometheus-file",
+        default=config("PROMETHEUS_FILE", ""),
+        help="Write the run metrics in the Prometheus text format to this file",
+    )
+    parser.add_argument(
+        "--pushgateway-url",
+        default=config("PUSHGATEWAY_URL", ""),
+        help="Push the run metrics to this Prometheus Pushgateway",
+    )
+    return parser
+
+
+def install_event_loop(name: str) -> None:
+    """
+    Makes asyncio.run() use uvloop when it is selected and installed, uvloop
+    is an optional dependency.
+    """
+    if name == "asyncio":
+        return
+    try:
+        import uvloop  # type: ignore
+    except ImportError:
+        if name == "uvloop":
+            logger.warning(
+                "The uvloop package is not installed, falling back to asyncio"
+            )
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+if __name__ == "__main__":
+
+    def validate_args(args):
+        required_keys = []
+        if not (args.import_from or args.merge_reports or args.orgs_file):
+            required_keys += ["org_id"]
+        if not args.export_to:
+            required_keys += ["port_client_id", "port_client_secret"]
+        missing_keys = [key for key in required_keys if not getattr(args, key)]
+
+        if missing_keys:
+            logger.error(f"The following keys are required: {', '.join(missing_keys)}")
+            return False
+        if args.export_to and args.import_from:
+            logger.error("--export-to and --import-from cannot be used together")
+            return False
+        if not (args.import_from or args.merge_reports):
+            try:
+                orgs = load_orgs(args.org_id, args.api_key, args.orgs_file)
+            except (OSError, ValueError) as e:
+                logger.error(f"Invalid organizations: {str(e)}")
+                return False
+            if not orgs:
+                logger.error("No organization to sync")
+                return False
+            if len(orgs) > 1 and (args.daemon or args.export_to):
+                logger.error(
+                    "--daemon and --export-to only support a single organization"
+                )
+                return False
+        if args.json_backend != "auto" and args.json_backend not in SERIALIZERS:
+            logger.error(f"Unknown --json-backend {args.json_backend}")
+            return False
+        if args.event_loop not in ("auto", "uvloop", "asyncio"):
+            logger.error(f"Unknown --event-loop {args.event_loop}")
+            return False
+        if unknown := set(parse_patterns(args.blueprints)) - set(RECONCILE_ORDER):
+            logger.error(f"Unknown blueprints: {', '.join(sorted(unknown))}")
+            return False
+        try:
+            PayloadPolicy.parse_rules(args.payload_rules)
+        except ValueError as e:
+            logger.error(f"Invalid --payload-rules: {str(e)}")
+            return False
+        if not 0 <= args.shard_index < max(1, args.shard_count):
+            logger.error("--shard-index must be between 0 and --shard-count - 1")
+            return False
+        if (
+            args.daemon
+            and not args.webhook_secret
+            and args.webhook_host not in ("127.0.0.1", "::1", "localhost")
+        ):
+            logger.error(
+                "--webhook-secret is required when the webhook endpoint listens on another address than localhost"
+            )
+            return False
+        if args.daemon and (args.export_to or args.import_from):
+            logger.error("--daemon cannot be used with --export-to or --import-from")
+            return False
+        if args.resume and (
+            args.export_to or args.import_from or args.daemon or args.merge_reports
+        ):
+            logger.error("--resume only applies to syncs from Humanitec to Port")
+            return False
+        if args.checkpoint_interval < 0:
+            logger.error("--checkpoint-interval cannot be negative")
+            return False
+        return True
+
+    parser = build_parser()
     args = parser.parse_args()
     if not (validate_args(args)):
         import sys
 
         sys.exit()
 
+    install_event_loop(args.event_loop)
     exporter = HumanitecExporter(args)
     asyncio.run(exporter(args))
@@ -0,0 +1,267 @@
+import functools
+import itertools
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from loguru import logger
+
+SYMBOLS = re.compile(r"[^A-Za-z0-9\s]")
+PLACEHOLDER = re.compile(r"\{([^{}]+)\}")
+
+Context = Dict[str, Any]
+Transform = Callable[[Context], Dict[str, Any]]
+BatchTransform = Callable[[Iterable[Context]], List[Dict[str, Any]]]
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+@functools.lru_cache(maxsize=65536)
+def normalize_title(value: str) -> str:
+    """
+    Replaces symbols with spaces and title cases the result. Titles repeat a
+    lot (definition ids, workload names), so the result is memoized.
+    """
+    return SYMBOLS.sub(" ", value).title()
+
+
+class TransformCompiler:
+    """
+    Generates the Python source of the transform of one blueprint mapping, so
+    that mapping an entity costs about as much as the hand-written dict it
+    replaces. Value specs of the mapping file:
+      "a.b"                             value at a dotted path
+      "{a.b}/{c}"                       template, None if any value is None
+      {"const": value}                  constant
+      {"path": "a.b"}                   value at a dotted path
+      {"title": spec}                   spec with symbols removed, title cased
+      {"replace": [spec, old, new]}     str.replace on the value of spec
+      {"regex": [spec, pattern]}        first group of pattern searched in spec
+    Every distinct spec is evaluated once per entity, even when several fields
+    use it.
+    """
+
+    def __init__(self, blueprint_id: str) -> None:
+        self.blueprint_id = blueprint_id
+        self.namespace: Dict[str, Any] = {
+            "normalize_title": normalize_title,
+            "EMPTY": {},
+        }
+        self.roots: Dict[str, str] = {}
+        self.variables: Dict[str, str] = {}
+        self.values: Dict[str, str] = {}
+        self.lines: List[str] = []
+        self.names = itertools.count()
+
+    def new_name(self, prefix: str) -> str:
+        return f"{prefix}{next(self.names)}"
+
+    def assign(self, expression: str) -> str:
+        if IDENTIFIER.match(expression):
+            return expression
+        name = self.new_name("v")
+        self.lines.append(f"{name} = {expression}")
+        return name
+
+    def add_constant(self, value: Any) -> str:
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return repr(value)
+        name = self.new_name("c")
+        self.namespace[name] = value
+        return name
+
+    def path(self, path: str) -> str:
+        root, *keys = path.split(".")
+        if root in self.variables:
+            expression = self.variables[root]
+        else:
+            if root not in self.roots:
+                self.roots[root] = f"r{len(self.roots)}"
+            expression = self.roots[root]
+        for index, key in enumerate(keys):
+            if index:
+                expression = f"({expression} or EMPTY)"
+            expression = f"{expression}.get({key!r})"
+        return expression
+
+    def template(self, template: str) -> str:
+        parts = []
+        names = []
+        position = 0
+        for match in PLACEHOLDER.finditer(template):
+            literal = template[position : match.start()]
+            parts.append(literal.replace("{", "{{").replace("}", "}}"))
+            name = self.named(match[1])
+            names.append(name)
+            parts.append(f"{{{name}}}")
+            position = match.end()
+        parts.append(template[position:].replace("{", "{{").replace("}", "}}"))
+        if not names:
+            return repr(template)
+        checks = " and ".join(f"{name} is not None" for name in dict.fromkeys(names))
+        return f'f{"".join(parts)!r} if {checks} else None'
+
+    def value(self, spec: Any) -> str:
+        """Returns an expression, or the local name, holding the value of spec."""
+        key = json.dumps(spec, sort_keys=True)
+        if key not in self.values:
+            self.values[key] = self.compile_value(spec)
+        return self.values[key]
+
+    def named(self, spec: Any) -> str:
+        """Like value, but the value is held in a local for reuse."""
+        name = self.assign(self.value(spec))
+        self.values[json.dumps(spec, sort_keys=True)] = name
+        return name
+
+    def compile_value(self, spec: Any) -> str:
+        if isinstance(spec, str):
+            if PLACEHOLDER.search(spec):
+                return self.assign(self.template(spec))
+            return self.path(spec)
+        if not isinstance(spec, dict):
+            raise ValueError(f"Invalid mapping value {spec!r}")
+        if "const" in spec:
+            return self.add_constant(spec["const"])
+        if "path" in spec:
+            return self.path(spec["path"])
+        if "title" in spec:
+            name = self.named(spec["title"])
+            return self.assign(
+                f"normalize_title({name}) if {name} is not None else None"
+            )
+        if "replace" in spec:
+            inner, old, new = spec["replace"]
+            name = self.named(inner)
+            return self.assign(
+                f"{name}.replace({old!r}, {new!r}) if {name} is not None else None"
+            )
+        if "regex" in spec:
+            inner, pattern = spec["regex"]
+            name = self.named(inner)
+            regex = self.new_name("c")
+            self.namespace[regex] = re.compile(pattern)
+            match = self.assign(
+                f"{regex}.search({name}) if {name} is not None else None"
+            )
+            return self.assign(f"{match}[1] if {match} else None")
+        raise ValueError(f"Invalid mapping value {spec!r}")
+
+    def compile(self, spec: Dict[str, Any]) -> Tuple[Transform, BatchTransform, str]:
+        for name, value in spec.get("variables", {}).items():
+            self.variables[name] = self.named(value)
+        identifier = self.named(spec["identifier"])
+        self.lines.append(f"if {identifier} is None:")
+        self.lines.append("    raise_missing_identifier(context)")
+        self.namespace["raise_missing_identifier"] = self.raise_missing_identifier
+        fields = [f'"identifier": {identifier}']
+        if "title" in spec:
+            fields.append(f'"title": {self.value(spec["title"])}')
+
+        properties = []
+        optional_properties = []
+        for name, value in spec.get("properties", {}).items():
+            omit_if_none = isinstance(value, dict) and value.get("omit_if_none", False)
+            if omit_if_none:
+                optional_properties.append((name, self.named(value)))
+            else:
+                properties.append(f"{name!r}: {self.value(value)}")
+        relations = [
+            (name, self.named(value))
+            for name, value in spec.get("relations", {}).items()
+        ]
+        self.lines.append(f"properties = {{{', '.join(properties)}}}")
+        for name, value in optional_properties:
+            self.lines.append(f"if {value} is not None:")
+            self.lines.append(f"    properties[{name!r}] = {value}")
+        self.lines.append("relations = {}")
+        for name, value in relations:
+            self.lines.append(f"if {value} is not None:")
+            self.lines.append(f"    relations[{name!r}] = {value}")
+        fields += ['"properties": properties', '"relations": relations']
+
+        body = [f"{local} = context[{root!r}]" for root, local in self.roots.items()]
+        body += self.lines
+        entity = f"{{{', '.join(fields)}}}"
+        source = "\n".join(
+            ["def transform(context):"]
+            + [f"    {line}" for line in body]
+            + [f"    return {entity}", "", "def transform_batch(contexts):"]
+            + ["    entities = []", "    append = entities.append"]
+            + ["    for context in contexts:"]
+            + [f"        {line}" for line in body]
+            + [f"        append({entity})", "    return entities", ""]
+        )
+        exec(compile(source, f"<mapping {self.blueprint_id}>", "exec"), self.namespace)
+        return self.namespace["transform"], self.namespace["transform_batch"], source
+
+    def raise_missing_identifier(self, context: Context) -> None:
+        raise ValueError(
+            f"Cannot build a {self.blueprint_id} identifier from {list(context)}"
+        )
+
+
+class EntityMapper:
+    """
+    Builds Port entities from Humanitec records according to a declarative
+    mapping file keyed by blueprint identifier, like resources/blueprints.json.
+    Every mapping is compiled once into a transform function and a batch
+    transform function.
+    """
+
+    def __init__(self, mappings: Dict[str, Dict[str, Any]]) -> None:
+        self.mappings = mappings
+        self.transforms: Dict[str, Transform] = {}
+        self.batch_transforms: Dict[str, BatchTransform] = {}
+        self.sources: Dict[str, str] = {}
+        for blueprint_id, spec in mappings.items():
+            transform, batch_transform, source = TransformCompiler(
+                blueprint_id
+            ).compile(spec)
+            self.transforms[blueprint_id] = transform
+            self.batch_transforms[blueprint_id] = batch_transform
+            self.sources[blueprint_id] = source
+
+    @classmethod
+    def from_file(cls, path: str) -> "EntityMapper":
+        with open(path) as mapping_file:
+            return cls(json.load(mapping_file))
+
+    def check_blueprints(self, path: str) -> None:
+        """
+        Warns about the mapped properties and relations that the blueprints in
+        resources/blueprints.json do not define, which Port does not store, and
+        about the blueprint properties that no mapping sets.
+        """
+        with open(path) as blueprints_file:
+            blueprints = {
+                blueprint["identifier"]: blueprint
+                for blueprint in json.load(blueprints_file)
+            }
+        for blueprint_id, spec in self.mappings.items():
+            if blueprint_id not in blueprints:
+                logger.warning(f"Mapping for unknown blueprint {blueprint_id}")
+                continue
+            blueprint = blueprints[blueprint_id]
+            unknown_properties = set(spec.get("properties", {})) - set(
+                blueprint["schema"]["properties"]
+            )
+            unknown_relations = set(spec.get("relations", {})) - set(
+                blueprint.get("relations", {})
+            )
+            if unknown_properties or unknown_relations:
+                logger.warning(
+                    f"Mapping of {blueprint_id} sets properties {sorted(unknown_properties)} and relations {sorted(unknown_relations)} not defined in {path}"
+                )
+            if unset_properties := set(blueprint["schema"]["properties"]) - set(
+                spec.get("properties", {})
+            ):
+                logger.warning(
+                    f"Mapping of {blueprint_id} does not set properties {sorted(unset_properties)} defined in {path}"
+                )
+
+    def map(self, blueprint_id: str, context: Context) -> Dict[str, Any]:
+        return self.transforms[blueprint_id](context)
+
+    def map_batch(
+        self, blueprint_id: str, contexts: Iterable[Context]
+    ) -> List[Dict[str, Any]]:
+        return self.batch_transforms[blueprint_id](contexts)
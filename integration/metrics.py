@@ -0,0 +1,197 @@
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ID_SEGMENT = re.compile(r"(?<=/)(apps|envs|graphs|blueprints|orgs)/[^/]+")
+
+
+def get_endpoint_template(url: str) -> str:
+    """
+    Replaces identifiers in a request path with placeholders, e.g.
+    /orgs/acme/apps/web/envs/dev/resources -> /orgs/{orgs}/apps/{apps}/envs/{envs}/resources
+    """
+    path = urlsplit(url).path
+    return ID_SEGMENT.sub(lambda match: f"{match.group(1)}/{{{match.group(1)}}}", path)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+    def to_dict(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0,
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """
+    Collects request, entity and phase metrics for a run and renders them as a
+    JSON report or in the Prometheus text exposition format.
+    """
+
+    def __init__(self) -> None:
+        self.latencies: Dict[Tuple[str, str, str], Histogram] = {}
+        self.status_codes: Dict[Tuple[str, str, str, int], int] = {}
+        self.bytes_sent: Dict[str, int] = {}
+        self.bytes_received: Dict[str, int] = {}
+        self.entities: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self.started_at = time.monotonic()
+
+    def observe_request(
+        self,
+        method: str,
+        url: str,
+        status_code: int,
+        duration: float,
+        bytes_sent: int,
+        bytes_received: int,
+    ) -> None:
+        host = urlsplit(url).netloc
+        template = get_endpoint_template(url)
+        key = (host, method, template)
+        self.latencies.setdefault(key, Histogram()).observe(duration)
+        status_key = (host, method, template, status_code)
+        self.status_codes[status_key] = self.status_codes.get(status_key, 0) + 1
+        self.bytes_sent[host] = self.bytes_sent.get(host, 0) + bytes_sent
+        self.bytes_received[host] = self.bytes_received.get(host, 0) + bytes_received
+
+    def count_entity(self, blueprint_id: str) -> None:
+        self.entities[blueprint_id] = self.entities.get(blueprint_id, 0) + 1
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0.0) + time.monotonic() - started_at
+            )
+
+    def report(self) -> Dict[str, Any]:
+        requests: Dict[str, Dict[str, Any]] = {}
+        for (host, method, template), histogram in self.latencies.items():
+            requests[f"{method} {host}{template}"] = {
+                "latency_seconds": histogram.to_dict(),
+                "status_codes": {
+                    str(status): count
+                    for (
+                        status_host,
+                        status_method,
+                        status_template,
+                        status,
+                    ), count in self.status_codes.items()
+                    if (status_host, status_method, status_template)
+                    == (host, method, template)
+                },
+            }
+        return {
+            "duration_seconds": round(time.monotonic() - self.started_at, 3),
+            "phases_seconds": {
+                name: round(value, 3) for name, value in self.phases.items()
+            },
+            "entities": self.entities,
+            "requests": requests,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+    def to_prometheus(self, prefix: str = "humanitec_integration") -> str:
+        lines: List[str] = []
+
+        def add(
+            name: str, metric_type: str, samples: List[Tuple[Dict[str, Any], float]]
+        ) -> None:
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            lines.extend(
+                f"{prefix}_{name}{format_labels(labels)} {value}"
+                for labels, value in samples
+            )
+
+        lines.append(f"# TYPE {prefix}_request_duration_seconds histogram")
+        for (host, method, template), histogram in self.latencies.items():
+            labels = {"host": host, "method": method, "endpoint": template}
+            for bound, count in histogram.to_dict()["buckets"].items():
+                lines.append(
+                    f"{prefix}_request_duration_seconds_bucket{format_labels({**labels, 'le': bound})} {count}"
+                )
+            lines.append(
+                f"{prefix}_request_duration_seconds_bucket{format_labels({**labels, 'le': '+Inf'})} {histogram.count}"
+            )
+            lines.append(
+                f"{prefix}_request_duration_seconds_sum{format_labels(labels)} {histogram.sum}"
+            )
+            lines.append(
+                f"{prefix}_request_duration_seconds_count{format_labels(labels)} {histogram.count}"
+            )
+
+        add(
+            "requests_total",
+            "counter",
+            [
+                (
+                    {
+                        "host": host,
+                        "method": method,
+                        "endpoint": template,
+                        "status": status,
+                    },
+                    count,
+                )
+                for (host, method, template, status), count in self.status_codes.items()
+            ],
+        )
+        add(
+            "bytes_sent_total",
+            "counter",
+            [({"host": host}, value) for host, value in self.bytes_sent.items()],
+        )
+        add(
+            "bytes_received_total",
+            "counter",
+            [({"host": host}, value) for host, value in self.bytes_received.items()],
+        )
+        add(
+            "entities_total",
+            "counter",
+            [({"blueprint": name}, value) for name, value in self.entities.items()],
+        )
+        add(
+            "phase_duration_seconds",
+            "gauge",
+            [({"phase": name}, value) for name, value in self.phases.items()],
+        )
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for value in labels.values()
+    )
+    return (
+        "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+    )
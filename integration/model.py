@@ -0,0 +1,144 @@
+from typing import Any, Dict, List, Set, Tuple
+from clients.cache import EnvironmentResources
+
+
+class HumanitecModel:
+    """
+    In-memory snapshot of a Humanitec organization built by a single crawl.
+
+    Environments are keyed by application id, resources and dependency graph
+    nodes by (application id, environment id).
+    """
+
+    def __init__(self) -> None:
+        self.applications: List[Dict[str, Any]] = []
+        self.environments: Dict[str, List[Dict[str, Any]]] = {}
+        self.resources: Dict[Tuple[str, str], EnvironmentResources] = {}
+        self.graph_nodes: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+
+    def add_environments(
+        self, application: Dict[str, Any], environments: List[Dict[str, Any]]
+    ) -> None:
+        self.environments[application["id"]] = environments
+
+    def add_environment_data(
+        self,
+        application: Dict[str, Any],
+        environment: Dict[str, Any],
+        resources: EnvironmentResources,
+        graph_nodes: List[Dict[str, Any]],
+    ) -> None:
+        key = (application["id"], environment["id"])
+        self.resources[key] = resources
+        self.graph_nodes[key] = graph_nodes
+
+    def iter_environments(self):
+        for application in self.applications:
+            for environment in self.environments.get(application["id"], []):
+                yield application, environment
+
+    def iter_resources(self):
+        for application, environment in self.iter_environments():
+            for resource in self.resources.get(
+                (application["id"], environment["id"]), []
+            ):
+                yield application, environment, resource
+
+    def iter_graph_nodes(self):
+        for application, environment in self.iter_environments():
+            for node in self.graph_nodes.get(
+                (application["id"], environment["id"]), []
+            ):
+                yield application, environment, node
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "applications": len(self.applications),
+            "environments": sum(len(envs) for envs in self.environments.values()),
+            "resources": sum(len(items) for items in self.resources.values()),
+            "graph_nodes": sum(len(nodes) for nodes in self.graph_nodes.values()),
+        }
+
+
+def order_graph_nodes(
+    nodes: List[Dict[str, Any]],
+) -> Tuple[List[List[Dict[str, Any]]], Set[str]]:
+    """
+    Orders dependency graph nodes into waves so that every node comes after the
+    nodes it depends on. Strongly connected components are found with an
+    iterative Tarjan traversal; nodes that belong to a real cycle are returned
+    in the second value since they cannot be ordered and need a two-phase write.
+    Dependencies on nodes that are not part of the graph are ignored.
+    """
+    by_id = {node["guresid"]: node for node in nodes}
+    dependencies = {
+        node_id: [dep for dep in node.get("depends_on") or [] if dep in by_id]
+        for node_id, node in by_id.items()
+    }
+
+    index_of: Dict[str, int] = {}
+    low_link: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    component_of: Dict[str, int] = {}
+    components: List[List[str]] = []
+
+    for root in by_id:
+        if root in index_of:
+            continue
+        work = [(root, 0)]
+        while work:
+            node_id, child_position = work.pop()
+            if child_position == 0:
+                index_of[node_id] = low_link[node_id] = len(index_of)
+                stack.append(node_id)
+                on_stack.add(node_id)
+            children = dependencies[node_id]
+            if child_position < len(children):
+                work.append((node_id, child_position + 1))
+                child = children[child_position]
+                if child not in index_of:
+                    work.append((child, 0))
+                elif child in on_stack:
+                    low_link[node_id] = min(low_link[node_id], index_of[child])
+                continue
+            for child in children:
+                if component_of.get(child) is None and child in on_stack:
+                    low_link[node_id] = min(low_link[node_id], low_link[child])
+            if low_link[node_id] == index_of[node_id]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component_of[member] = len(components)
+                    component.append(member)
+                    if member == node_id:
+                        break
+                components.append(component)
+
+    cyclic: Set[str] = set()
+    for component in components:
+        if len(component) > 1 or component[0] in dependencies[component[0]]:
+            cyclic.update(component)
+
+    # Tarjan emits components in reverse topological order of the dependency
+    # edges, i.e. dependencies first, so each component's wave is one past the
+    # deepest wave among the components it depends on
+    wave_of: Dict[int, int] = {}
+    for position, component in enumerate(components):
+        wave_of[position] = max(
+            (
+                wave_of[component_of[dep]] + 1
+                for member in component
+                for dep in dependencies[member]
+                if component_of[dep] != position
+            ),
+            default=0,
+        )
+
+    waves: List[List[Dict[str, Any]]] = [
+        [] for _ in range(max(wave_of.values(), default=-1) + 1)
+    ]
+    for node_id, node in by_id.items():
+        waves[wave_of[component_of[node_id]]].append(node)
+    return waves, cyclic
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import re
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+from decouple import config  # type: ignore
+from filters import parse_patterns
+
+
+class OrgConfig:
+    """
+    A Humanitec organization to sync. Entities of an organization with a prefix
+    get identifiers of the form "<prefix>/<identifier>", which keeps the
+    entities of organizations that reuse application ids apart in Port.
+    """
+
+    def __init__(self, org_id: str, api_key: str, prefix: str = "") -> None:
+        self.org_id = org_id
+        self.api_key = api_key
+        self.prefix = prefix
+
+    def namespace(self, identifier: str) -> str:
+        return f"{self.prefix}/{identifier}" if self.prefix else identifier
+
+    def namespace_entity(self, entity: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Prefixes the identifier of the entity and of every entity it relates
+        to, which all belong to the same organization.
+        """
+        if not self.prefix:
+            return entity
+        relations = {
+            blueprint_id: (
+                [self.namespace(target) for target in target_ids]
+                if isinstance(target_ids, list)
+                else self.namespace(target_ids) if target_ids else target_ids
+            )
+            for blueprint_id, target_ids in (entity.get("relations") or {}).items()
+        }
+        namespaced = {**entity, "identifier": self.namespace(entity["identifier"])}
+        if "relations" in entity:
+            namespaced["relations"] = relations
+        return namespaced
+
+
+def get_api_key_variable(org_id: str) -> str:
+    return "API_KEY_" + re.sub(r"[^A-Z0-9]", "_", org_id.upper())
+
+
+def load_orgs(org_ids: str, api_key: str, orgs_file: str = "") -> List[OrgConfig]:
+    """
+    Reads the organizations to sync from --orgs-file, or from the comma
+    separated --org-id. Without a file, the API key of an organization is read
+    from API_KEY_<ORG_ID> and defaults to --api-key. Identifiers are prefixed
+    with the organization id when several organizations are synced, unless the
+    file sets another "prefix" (an empty prefix keeps the plain identifiers).
+    """
+    if orgs_file:
+        with open(orgs_file) as file:
+            records = json.load(file)
+    else:
+        records = [{"id": org_id} for org_id in parse_patterns(org_ids)]
+
+    orgs: List[OrgConfig] = []
+    for record in records:
+        org_id = record.get("id")
+        if not org_id:
+            raise ValueError(f"Organization without an id: {record}")
+        if any(org.org_id == org_id for org in orgs):
+            raise ValueError(f"Organization {org_id} is listed twice")
+        key = (
+            config(record["api_key_env"], "")
+            if "api_key_env" in record
+            else record.get("api_key") or config(get_api_key_variable(org_id), api_key)
+        )
+        if not key:
+            raise ValueError(f"No API key for organization {org_id}")
+        default_prefix = org_id if len(records) > 1 else ""
+        orgs.append(OrgConfig(org_id, key, record.get("prefix", default_prefix)))
+
+    prefixes = [org.prefix for org in orgs]
+    if len(set(prefixes)) < len(prefixes):
+        raise ValueError("Organizations must have distinct identifier prefixes")
+    return orgs
+
+
+class FairScheduler:
+    """
+    Shares a number of concurrent slots between organizations. Callers wait in
+    one queue per organization and a freed slot goes to the next organization
+    in turn, so an organization with thousands of environments cannot hold
+    every slot while the others wait behind it.
+    """
+
+    def __init__(self, slots: int) -> None:
+        self.slots = max(1, slots)
+        self.in_use = 0
+        self.queues: Dict[str, Deque[asyncio.Future]] = {}
+        # Organizations with waiting callers, in the order they are served
+        self.turns: Deque[str] = deque()
+        self.stats: Dict[str, Dict[str, Any]] = {}
+
+    def for_org(self, org_id: str) -> "OrgSlots":
+        self.stats[org_id] = {"acquired": 0, "waited": 0, "wait_seconds": 0.0}
+        return OrgSlots(self, org_id)
+
+    async def acquire(self, org_id: str) -> None:
+        stats = self.stats[org_id]
+        stats["acquired"] += 1
+        if self.in_use < self.slots and not self.turns:
+            self.in_use += 1
+            return
+        queue = self.queues.setdefault(org_id, deque())
+        if not queue:
+            self.turns.append(org_id)
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        stats["waited"] += 1
+        started_at = time.monotonic()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # A slot handed over to a cancelled caller goes to the next one
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            stats["wait_seconds"] += time.monotonic() - started_at
+
+    def release(self) -> None:
+        while self.turns:
+            org_id = self.turns.popleft()
+            queue = self.queues[org_id]
+            future = queue.popleft()
+            if queue:
+                self.turns.append(org_id)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_use -= 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            org_id: {**stats, "wait_seconds": round(stats["wait_seconds"], 3)}
+            for org_id, stats in self.stats.items()
+        }
+
+
+class OrgSlots:
+    """The slots of one organization, used like an asyncio.Semaphore."""
+
+    def __init__(self, scheduler: FairScheduler, org_id: str) -> None:
+        self.scheduler = scheduler
+        self.org_id = org_id
+
+    async def __aenter__(self) -> None:
+        await self.scheduler.acquire(self.org_id)
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.scheduler.release()
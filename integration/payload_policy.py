@@ -0,0 +1,296 @@
+import hashlib
+from typing import Any, Dict, List, Set, Tuple
+from loguru import logger
+from clients.serializer import JSONSerializer
+
+ACTIONS = ("prune", "truncate", "summarize")
+TRUNCATED_SUFFIX = "...[truncated]"
+
+
+def get_size(value: Any, serializer: JSONSerializer) -> int:
+    """Size of the value serialized as compact JSON, in bytes."""
+    return len(serializer.dumps(value))
+
+
+def summarize(value: Any, size: int, digest: str) -> Any:
+    """
+    Replaces a value by a description of it: its size, a hash that tells
+    identical values apart and, for objects, its keys.
+    """
+    if isinstance(value, str):
+        return f"[{size} bytes, sha1 {digest}]"
+    summary: Dict[str, Any] = {"bytes": size, "sha1": digest}
+    if isinstance(value, dict):
+        summary["keys"] = sorted(value)[:100]
+    elif isinstance(value, list):
+        summary["items"] = len(value)
+    return {"_summary": summary}
+
+
+def truncate_value(value: Any, string_limit: int, list_limit: int) -> Any:
+    if isinstance(value, str) and len(value) > string_limit:
+        return value[:string_limit] + TRUNCATED_SUFFIX
+    if isinstance(value, list):
+        return [
+            truncate_value(item, string_limit, list_limit)
+            for item in value[:list_limit]
+        ]
+    if isinstance(value, dict):
+        return {
+            key: truncate_value(item, string_limit, list_limit)
+            for key, item in value.items()
+        }
+    return value
+
+
+def truncate(value: Any, max_bytes: int, serializer: JSONSerializer) -> Any | None:
+    """
+    Shortens long strings and lists inside the value, halving the limits until
+    it fits. Returns None if the value does not fit even then.
+    """
+    string_limit, list_limit = max(16, max_bytes // 2), max(1, max_bytes // 64)
+    while True:
+        truncated = truncate_value(value, string_limit, list_limit)
+        if get_size(truncated, serializer) <= max_bytes:
+            return truncated
+        if string_limit <= 16 and list_limit <= 1:
+            return None
+        string_limit, list_limit = max(16, string_limit // 2), max(1, list_limit // 2)
+
+
+def prune(value: Any, max_bytes: int, serializer: JSONSerializer) -> Any | None:
+    """
+    Drops the largest keys of an object until it fits and lists them under
+    "_pruned". Returns None if the value is not an object or still too large.
+    """
+    if not isinstance(value, dict):
+        return None
+    sizes = sorted(
+        ((get_size(item, serializer), key) for key, item in value.items()),
+        reverse=True,
+    )
+    pruned = dict(value)
+    pruned_keys: List[str] = []
+    for _, key in sizes:
+        del pruned[key]
+        pruned_keys.append(key)
+        if get_size({**pruned, "_pruned": pruned_keys}, serializer) <= max_bytes:
+            return {**pruned, "_pruned": pruned_keys}
+    return None
+
+
+class PayloadRule:
+    def __init__(self, action: str, max_bytes: int) -> None:
+        if action not in ACTIONS:
+            raise ValueError(
+                f"Unknown payload action {action}, expected one of {', '.join(ACTIONS)}"
+            )
+        self.action = action
+        self.max_bytes = max_bytes
+
+
+class PayloadPolicy:
+    """
+    Keeps entity payloads small before they are sent to Port. Property values
+    that exceed the size of their rule are pruned, truncated or summarized,
+    and entities that are still larger than max_entity_bytes have their
+    largest properties summarized.
+
+    Entities are measured with the serializer of the Port client, and only when
+    a rule or size limit is active (measure is set by writers that limit the
+    size of their batches). apply returns the size, so that the writer does
+    not serialize the entity again.
+
+    Identical values of the dedupe properties (e.g. the resourceSchema shared
+    by many graph nodes) are kept in memory once, and measured and transformed
+    once, whatever the number of entities that carry them.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, PayloadRule] | None = None,
+        dedupe_properties: Set[str] | None = None,
+        max_entity_bytes: int = 0,
+        serializer: JSONSerializer | None = None,
+        measure: bool = False,
+    ) -> None:
+        # Keyed by "blueprint.property" or by "property" for every blueprint
+        self.rules = rules or {}
+        self.dedupe_properties = dedupe_properties or set()
+        self.max_entity_bytes = max_entity_bytes
+        self.serializer = serializer or JSONSerializer()
+        self.measure = measure or bool(self.rules) or bool(max_entity_bytes)
+        self.blobs: Dict[str, Any] = {}
+        # Size and hash of the stored values, by object id
+        self.interned: Dict[int, Tuple[int, str]] = {}
+        self.transformed: Dict[Tuple[str, str, int], Any] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self.dedupe_stats = {"values": 0, "duplicates": 0, "duplicate_bytes": 0}
+
+    def reset(self) -> None:
+        """Starts the statistics and stored values of a new run."""
+        self.blobs = {}
+        self.interned = {}
+        self.transformed = {}
+        self.stats = {}
+        self.dedupe_stats = {"values": 0, "duplicates": 0, "duplicate_bytes": 0}
+
+    @staticmethod
+    def parse_rules(value: str) -> Dict[str, PayloadRule]:
+        """
+        Parses a comma separated list such as
+        "resourceSchema=summarize:16384,humanitecResource.resource=truncate:65536".
+        """
+        rules: Dict[str, PayloadRule] = {}
+        for item in filter(None, (part.strip() for part in value.split(","))):
+            name, _, rule = item.partition("=")
+            action, _, max_bytes = rule.partition(":")
+            rules[name.strip()] = PayloadRule(action.strip(), int(max_bytes or 0))
+        return rules
+
+    def get_rule(self, blueprint_id: str, name: str) -> PayloadRule | None:
+        return self.rules.get(f"{blueprint_id}.{name}") or self.rules.get(name)
+
+    def get_stats(self, blueprint_id: str) -> Dict[str, int]:
+        if blueprint_id not in self.stats:
+            self.stats[blueprint_id] = {
+                "entities": 0,
+                "bytes_in": 0,
+                "bytes_out": 0,
+                "max_entity_bytes": 0,
+                "oversized": 0,
+                **{action: 0 for action in ACTIONS},
+            }
+        return self.stats[blueprint_id]
+
+    def intern(self, value: Any) -> Any:
+        """
+        Returns the stored value equal to this one, storing it if it is new, so
+        that identical values are kept in memory once.
+        """
+        if id(value) in self.interned:
+            return value
+        serialized = self.serializer.dumps_canonical(value)
+        digest = hashlib.sha1(serialized).hexdigest()
+        if digest in self.blobs:
+            self.dedupe_stats["duplicates"] += 1
+            self.dedupe_stats["duplicate_bytes"] += len(serialized)
+            return self.blobs[digest]
+        self.dedupe_stats["values"] += 1
+        self.blobs[digest] = value
+        self.interned[id(value)] = (len(serialized), digest)
+        return value
+
+    def transform(self, rule: PayloadRule, value: Any, size: int, digest: str) -> Any:
+        """
+        Applies the rule, falling back to a summary when pruning or truncating
+        cannot make the value fit.
+        """
+        transformed = None
+        if rule.action == "prune":
+            transformed = prune(value, rule.max_bytes, self.serializer)
+        elif rule.action == "truncate":
+            transformed = truncate(value, rule.max_bytes, self.serializer)
+        return (
+            transformed if transformed is not None else summarize(value, size, digest)
+        )
+
+    def apply(
+        self, blueprint_id: str, entity: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], int | None]:
+        """
+        Returns the entity to write and its serialized size, or None as size
+        when nothing needs it measured.
+        """
+        stats = self.get_stats(blueprint_id)
+        properties = entity.get("properties") or {}
+        changed: Dict[str, Any] = {}
+        for name, value in properties.items():
+            if not isinstance(value, (dict, list, str)):
+                continue
+            rule = self.get_rule(blueprint_id, name)
+            dedupe = name in self.dedupe_properties
+            if not (rule or dedupe):
+                continue
+            if dedupe:
+                shared = self.intern(value)
+                if shared is not value:
+                    changed[name] = value = shared
+                size, digest = self.interned[id(value)]
+                if not (rule and size > rule.max_bytes):
+                    continue
+                key = (digest, rule.action, rule.max_bytes)
+                if key not in self.transformed:
+                    self.transformed[key] = self.transform(rule, value, size, digest)
+                changed[name] = self.transformed[key]
+            else:
+                serialized = self.serializer.dumps_canonical(value)
+                size = len(serialized)
+                if not (rule and size > rule.max_bytes):
+                    continue
+                digest = hashlib.sha1(serialized).hexdigest()
+                changed[name] = self.transform(rule, value, size, digest)
+            stats[rule.action] += 1
+
+        stats["entities"] += 1
+        if not self.measure:
+            if changed:
+                entity = {**entity, "properties": {**properties, **changed}}
+            return entity, None
+
+        size_in = get_size(entity, self.serializer)
+        if changed:
+            entity = {**entity, "properties": {**properties, **changed}}
+        size_out = get_size(entity, self.serializer) if changed else size_in
+        if self.max_entity_bytes and size_out > self.max_entity_bytes:
+            entity, size_out = self.shrink(blueprint_id, entity, size_out)
+
+        stats["bytes_in"] += size_in
+        stats["bytes_out"] += size_out
+        stats["max_entity_bytes"] = max(stats["max_entity_bytes"], size_out)
+        return entity, size_out
+
+    def shrink(
+        self, blueprint_id: str, entity: Dict[str, Any], size: int
+    ) -> Tuple[Dict[str, Any], int]:
+        """
+        Summarizes the largest properties of an entity above max_entity_bytes
+        until it fits.
+        """
+        stats = self.get_stats(blueprint_id)
+        properties = dict(entity.get("properties") or {})
+        sizes = sorted(
+            (
+                (get_size(value, self.serializer), name)
+                for name, value in properties.items()
+                if isinstance(value, (dict, list, str))
+            ),
+            reverse=True,
+        )
+        rule = PayloadRule("summarize", 0)
+        for property_size, name in sizes:
+            digest = self.serializer.hash(properties[name])
+            properties[name] = self.transform(
+                rule, properties[name], property_size, digest
+            )
+            stats["summarize"] += 1
+            size = get_size({**entity, "properties": properties}, self.serializer)
+            if size <= self.max_entity_bytes:
+                break
+        else:
+            stats["oversized"] += 1
+            logger.warning(
+                f"{blueprint_id} entity {entity['identifier']} is still {size} bytes after summarizing its properties"
+            )
+        return {**entity, "properties": properties}, size
+
+    def summary(self) -> Dict[str, Any]:
+        bytes_in = sum(stats["bytes_in"] for stats in self.stats.values())
+        bytes_out = sum(stats["bytes_out"] for stats in self.stats.values())
+        return {
+            "blueprints": self.stats,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_saved": bytes_in - bytes_out,
+            "dedupe": self.dedupe_stats,
+        }
@@ -0,0 +1,90 @@
+import asyncio
+from typing import Any, Dict, List
+from loguru import logger
+from clients.port_client import PortClient
+from clients.serializer import JSONSerializer
+
+
+class PortSnapshot:
+    """
+    Snapshot of the entities currently stored in Port, used to skip upserts that
+    would not change anything. Only a hash of every property is kept so that
+    large resource blobs are not held in memory twice.
+    """
+
+    def __init__(self, serializer: JSONSerializer | None = None) -> None:
+        self.serializer = serializer or JSONSerializer()
+        self.entities: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def hash_value(self, value: Any) -> str:
+        return self.serializer.hash(value)
+
+    def compact(self, entity: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "title": entity.get("title"),
+            "properties": {
+                name: self.hash_value(value)
+                for name, value in (entity.get("properties") or {}).items()
+            },
+            "relations": {
+                name: self.hash_value(value)
+                for name, value in (entity.get("relations") or {}).items()
+            },
+        }
+
+    async def load_blueprint(self, port_client: PortClient, blueprint_id: str) -> None:
+        entities = self.entities.setdefault(blueprint_id, {})
+        async for page in port_client.iter_entities(
+            blueprint_id, include=["identifier", "title", "properties", "relations"]
+        ):
+            for entity in page:
+                entities[entity["identifier"]] = self.compact(entity)
+        logger.info(
+            f"Loaded {len(entities)} existing {blueprint_id} entities from Port"
+        )
+
+    async def load(self, port_client: PortClient, blueprint_ids: List[str]) -> None:
+        await asyncio.gather(
+            *(
+                self.load_blueprint(port_client, blueprint_id)
+                for blueprint_id in blueprint_ids
+            )
+        )
+
+    def count(self, blueprint_id: str, outcome: str) -> None:
+        counts = self.stats.setdefault(
+            blueprint_id, {"new": 0, "changed": 0, "unchanged": 0}
+        )
+        counts[outcome] += 1
+
+    def diff(self, blueprint_id: str, entity: Dict[str, Any]) -> Dict[str, Any] | None:
+        """
+        Returns None when the entity already exists in Port with the same values,
+        the whole entity when it does not exist yet, and otherwise an entity
+        holding only the title, properties and relations that changed, which
+        Port merges into the existing entity.
+        """
+        existing = self.entities.get(blueprint_id, {}).get(entity["identifier"])
+        if existing is None:
+            self.count(blueprint_id, "new")
+            return entity
+
+        changes: Dict[str, Any] = {"identifier": entity["identifier"]}
+        if entity.get("title") != existing["title"]:
+            changes["title"] = entity.get("title")
+        for section in ("properties", "relations"):
+            changed_values = {
+                name: value
+                for name, value in (entity.get(section) or {}).items()
+                if existing[section].get(name, self.hash_value(None))
+                != self.hash_value(value)
+            }
+            if changed_values:
+                changes[section] = changed_values
+
+        if len(changes) == 1:
+            self.count(blueprint_id, "unchanged")
+            return None
+        self.count(blueprint_id, "changed")
+        return changes
@@ -0,0 +1,108 @@
+import asyncio
+from typing import Dict, List, Set
+from loguru import logger
+from clients.port_client import PortClient
+
+
+class Reconciler:
+    """
+    Deletes Port entities that were not seen in the latest Humanitec crawl.
+
+    Existing identifiers are fetched for every blueprint before anything is
+    deleted so the safety checks can look at the whole picture: nothing is
+    deleted when the crawl was incomplete or when a blueprint would lose more
+    than max_delete_ratio of its entities. Orphans are deleted children first,
+    following the order of blueprint_ids, in bounded concurrent batches.
+    """
+
+    def __init__(
+        self,
+        port_client: PortClient,
+        blueprint_ids: List[str],
+        max_delete_ratio: float = 0.3,
+        batch_size: int = 100,
+        max_concurrency: int = 5,
+    ) -> None:
+        self.port_client = port_client
+        self.blueprint_ids = blueprint_ids
+        self.max_delete_ratio = max_delete_ratio
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    async def get_existing_identifiers(self) -> Dict[str, Set[str]]:
+        identifiers = await asyncio.gather(
+            *(
+                self.port_client.get_entity_identifiers(blueprint_id)
+                for blueprint_id in self.blueprint_ids
+            )
+        )
+        return dict(zip(self.blueprint_ids, identifiers))
+
+    def compute_orphans(
+        self, existing: Dict[str, Set[str]], seen: Dict[str, Set[str]]
+    ) -> Dict[str, Set[str]]:
+        return {
+            blueprint_id: existing.get(blueprint_id, set())
+            - seen.get(blueprint_id, set())
+            for blueprint_id in self.blueprint_ids
+        }
+
+    def check_safety(
+        self, existing: Dict[str, Set[str]], orphans: Dict[str, Set[str]]
+    ) -> bool:
+        safe = True
+        for blueprint_id in self.blueprint_ids:
+            existing_count = len(existing.get(blueprint_id, set()))
+            orphan_count = len(orphans.get(blueprint_id, set()))
+            if existing_count and orphan_count / existing_count > self.max_delete_ratio:
+                logger.error(
+                    f"Refusing to reconcile: {orphan_count} of {existing_count} {blueprint_id} entities would be deleted, above the {self.max_delete_ratio:.0%} threshold"
+                )
+                safe = False
+        return safe
+
+    async def delete_batch(self, blueprint_id: str, identifiers: List[str]) -> None:
+        stats = self.stats[blueprint_id]
+        async with self.semaphore:
+            try:
+                await self.port_client.delete_entities(blueprint_id, identifiers)
+                stats["deleted"] += len(identifiers)
+            except Exception as e:
+                logger.error(
+                    f"Failed to delete {len(identifiers)} {blueprint_id} entities: {str(e)}"
+                )
+                stats["failed"] += len(identifiers)
+
+    async def delete_orphans(self, orphans: Dict[str, Set[str]]) -> None:
+        for blueprint_id in self.blueprint_ids:
+            identifiers = sorted(orphans.get(blueprint_id, set()))
+            self.stats[blueprint_id] = {
+                "orphans": len(identifiers),
+                "deleted": 0,
+                "failed": 0,
+            }
+            if not identifiers:
+                continue
+            logger.info(f"Deleting {len(identifiers)} stale {blueprint_id} entities")
+            await asyncio.gather(
+                *(
+                    self.delete_batch(
+                        blueprint_id, identifiers[index : index + self.batch_size]
+                    )
+                    for index in range(0, len(identifiers), self.batch_size)
+                )
+            )
+
+    async def reconcile(
+        self, seen: Dict[str, Set[str]], crawl_complete: bool = True
+    ) -> None:
+        if not crawl_complete:
+            logger.error("Skipping reconciliation because the Humanitec crawl was incomplete")
+            return
+        existing = await self.get_existing_identifiers()
+        orphans = self.compute_orphans(existing, seen)
+        if not self.check_safety(existing, orphans):
+            return
+        await self.delete_orphans(orphans)
+        logger.info(f"Reconciliation summary: {self.stats}")
@@ -0,0 +1,64 @@
+import hashlib
+from typing import Any, Dict, List
+
+# Report values that describe a peak or a wall clock duration, which are not
+# added up when the reports of parallel shards are merged
+MAX_KEYS = {
+    "duration_seconds",
+    "phases_seconds",
+    "concurrency_limit",
+    "peak_waiting",
+    "peak_in_flight",
+    "max_entity_bytes",
+}
+
+
+def get_shard(app_id: str, shard_count: int) -> int:
+    """
+    Maps an application to a shard. Unlike hash(), the result is the same in
+    every process and on every machine.
+    """
+    digest = hashlib.sha1(app_id.encode()).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def get_shard_path(path: str, shard_index: int, shard_count: int) -> str:
+    """
+    Gives every shard its own copy of a local file (sync state, HTTP cache),
+    since each shard only stages the entities of its own applications.
+    """
+    if shard_count <= 1 or not path:
+        return path
+    return f"{path}.shard-{shard_index}-of-{shard_count}"
+
+
+def merge_values(key: str, left: Any, right: Any, use_max: bool = False) -> Any:
+    if isinstance(left, dict) and isinstance(right, dict):
+        merged = dict(left)
+        for name, value in right.items():
+            merged[name] = (
+                merge_values(name, merged[name], value, use_max or name in MAX_KEYS)
+                if name in merged
+                else value
+            )
+        if "mean" in merged and merged.get("count"):
+            merged["mean"] = round(merged["sum"] / merged["count"], 6)
+        return merged
+    if isinstance(left, list) and isinstance(right, list):
+        return left + right
+    if isinstance(left, bool) or isinstance(right, bool):
+        return left and right
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return max(left, right) if use_max else left + right
+    return left if left is not None else right
+
+
+def merge_reports(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Combines the run reports of all shards of a sync: counters are added up,
+    durations and peaks take the maximum and lists are concatenated.
+    """
+    merged: Dict[str, Any] = {}
+    for report in reports:
+        merged = merge_values("", merged, report) if merged else dict(report)
+    return merged
@@ -0,0 +1,140 @@
+import os
+from typing import Any, Dict
+from loguru import logger
+from clients.serializer import JSONSerializer
+
+
+class SyncState:
+    """
+    Persists a content hash of every entity written to Port, keyed by blueprint
+    and identifier, so that incremental runs can skip unchanged entities.
+
+    Entities are staged while the run is in progress and only committed to the
+    state once Port has acknowledged them, so failed writes are retried on the
+    next run.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, serializer: JSONSerializer | None = None) -> None:
+        self.path = path
+        self.serializer = serializer or JSONSerializer()
+        self.entities: Dict[str, Dict[str, Dict[str, str | None]]] = {}
+        self.staged: Dict[str, Dict[str, Dict[str, str | None]]] = {}
+        self.decisions: Dict[str, Dict[str, bool]] = {}
+        # Hashes of the entities Port already stores, committed like
+        # acknowledged ones although this run did not write them
+        self.confirmed: Dict[str, Dict[str, str | None]] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            logger.info(f"No sync state found at {self.path}, running a full sync")
+            return
+        try:
+            with open(self.path, "rb") as state_file:
+                data = self.serializer.loads(state_file.read())
+            if data.get("version") == self.VERSION:
+                self.entities = data.get("entities", {})
+                logger.info(
+                    f"Loaded sync state for {sum(len(ids) for ids in self.entities.values())} entities from {self.path}"
+                )
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable sync state {self.path}: {str(e)}")
+
+    def save(self) -> None:
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "wb") as state_file:
+            state_file.write(
+                self.serializer.dumps(
+                    {"version": self.VERSION, "entities": self.entities}
+                )
+            )
+        os.replace(temporary_path, self.path)
+        logger.info(f"Saved sync state to {self.path}")
+
+    def hash_entity(self, entity: Dict[str, Any]) -> str:
+        return self.serializer.hash(entity)
+
+    def count(self, blueprint_id: str, outcome: str) -> None:
+        counts = self.counts.setdefault(
+            blueprint_id, {"created": 0, "updated": 0, "skipped": 0}
+        )
+        counts[outcome] += 1
+
+    def is_unchanged(
+        self, blueprint_id: str, identifier: str, marker: str | None
+    ) -> bool:
+        """
+        Cheap pre-filter run before an entity is built: an entity whose update
+        marker (e.g. updated_at) matches the previous run is considered unchanged.
+        """
+        previous = self.entities.get(blueprint_id, {}).get(identifier)
+        if marker and previous and previous.get("marker") == marker:
+            self.staged.setdefault(blueprint_id, {})[identifier] = previous
+            self.count(blueprint_id, "skipped")
+            return True
+        return False
+
+    def should_write(
+        self, blueprint_id: str, entity: Dict[str, Any], marker: str | None = None
+    ) -> bool:
+        identifier = entity["identifier"]
+        decisions = self.decisions.setdefault(blueprint_id, {})
+        # Entities seen several times in one run (e.g. graph nodes shared between
+        # environments) follow the decision made for their first occurrence
+        if identifier in decisions:
+            return decisions[identifier]
+
+        entity_hash = self.hash_entity(entity)
+        record = {"hash": entity_hash, "marker": marker}
+        previous = self.entities.get(blueprint_id, {}).get(identifier)
+        self.staged.setdefault(blueprint_id, {})[identifier] = record
+
+        if previous and previous.get("hash") == entity_hash:
+            self.count(blueprint_id, "skipped")
+            decisions[identifier] = False
+        else:
+            self.count(blueprint_id, "updated" if previous else "created")
+            decisions[identifier] = True
+        return decisions[identifier]
+
+    def confirm(
+        self, blueprint_id: str, identifier: str, entity_hash: str | None = None
+    ) -> None:
+        """
+        Records that Port already holds the staged entity, e.g. per a diff, or
+        stages an entity this run did not build with the hash Port holds.
+        """
+        staged = self.staged.setdefault(blueprint_id, {})
+        if entity_hash is None:
+            entity_hash = staged[identifier]["hash"]
+        else:
+            staged.setdefault(identifier, {"hash": entity_hash, "marker": None})
+        self.confirmed.setdefault(blueprint_id, {})[identifier] = entity_hash
+
+    def commit(self, written: Dict[str, set], partial: bool = False) -> None:
+        """
+        Moves staged records into the persisted state. Skipped entities are kept
+        as is, written entities only if Port acknowledged them or was confirmed
+        to hold them already. A partial commit (a sync of part of the
+        organization) keeps the records it did not stage.
+        """
+        for blueprint_id, records in self.staged.items():
+            previous_records = self.entities.get(blueprint_id, {})
+            acknowledged = written.get(blueprint_id, set())
+            confirmed = self.confirmed.get(blueprint_id, {})
+            committed = dict(previous_records) if partial else {}
+            for identifier, record in records.items():
+                if (
+                    identifier in acknowledged
+                    or confirmed.get(identifier) == record["hash"]
+                    or previous_records.get(identifier, {}).get("hash")
+                    == record["hash"]
+                ):
+                    committed[identifier] = record
+            self.entities[blueprint_id] = committed
+        self.staged = {}
+        self.decisions = {}
+        self.confirmed = {}
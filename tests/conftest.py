@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The integration runs as a script from integration/, and the tests reuse the
+# reference implementations and synthetic organization of benchmarks/
+sys.path.insert(0, os.path.join(ROOT_DIR, "integration"))
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
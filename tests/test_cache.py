@@ -0,0 +1,63 @@
+from clients.cache import EnvironmentResources
+
+
+def make_resource(res_id, resource_type, resource_class="default"):
+    return {
+        "gu_res_id": f"gu-{res_id}",
+        "res_id": res_id,
+        "type": resource_type,
+        "class": resource_class,
+    }
+
+
+def make_resources():
+    return EnvironmentResources(
+        [
+            make_resource("modules.api", "workload"),
+            make_resource("modules.api.externals.db", "postgres", "large"),
+            make_resource("shared.dns", "dns"),
+            make_resource("modules.worker", "workload"),
+            make_resource("modules.worker.externals.db", "postgres"),
+        ]
+    )
+
+
+def res_ids(resources):
+    return [resource["res_id"] for resource in resources]
+
+
+def test_keyed_lookups():
+    resources = make_resources()
+
+    assert len(resources) == 5
+    assert resources.get("gu-shared.dns")["type"] == "dns"
+    assert resources.get_by_res_id("modules.worker")["gu_res_id"] == "gu-modules.worker"
+    assert resources.get("gu-missing") is None
+    assert resources.get_by_res_id("missing") is None
+
+
+def test_find_intersects_the_secondary_indexes():
+    resources = make_resources()
+
+    assert res_ids(resources.find("workload", prefix="modules")) == [
+        "modules.api",
+        "modules.worker",
+    ]
+    assert res_ids(resources.find("postgres", resource_class="default")) == [
+        "modules.worker.externals.db"
+    ]
+    assert res_ids(resources.find(prefix="shared")) == ["shared.dns"]
+    assert resources.find("workload", prefix="shared") == []
+    assert resources.find("unknown") == []
+    assert len(resources.find()) == 5
+
+
+def test_find_from_a_position_selects_the_last_page():
+    resources = make_resources()
+    start = len(resources)
+    resources.add(make_resource("modules.cron", "workload"))
+
+    assert res_ids(resources.find("workload", prefix="modules", start=start)) == [
+        "modules.cron"
+    ]
+    assert res_ids(resources.find(start=start)) == ["modules.cron"]
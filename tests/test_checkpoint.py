@@ -0,0 +1,121 @@
+from checkpoint import SyncCheckpoint
+from state import SyncState
+
+BLUEPRINT = "humanitecResource"
+SCOPE = {"blueprints": [BLUEPRINT]}
+
+
+def entity(identifier: str, **properties):
+    return {"identifier": identifier, "properties": properties}
+
+
+def results(*identifiers: str):
+    return {BLUEPRINT: {"upserted": list(identifiers)}}
+
+
+def test_unit_completes_once_every_entity_is_acknowledged(tmp_path):
+    checkpoint = SyncCheckpoint(str(tmp_path / "checkpoint.json"), SCOPE)
+    checkpoint.track(BLUEPRINT, entity("a"), unit="app/dev")
+    checkpoint.track(BLUEPRINT, entity("b"), unit="app/dev")
+    checkpoint.close(BLUEPRINT, "app/dev")
+    assert not checkpoint.is_complete(BLUEPRINT, "app/dev")
+
+    # The writer results grow during the run, only new entries are applied
+    checkpoint.update(results("a"))
+    assert not checkpoint.is_complete(BLUEPRINT, "app/dev")
+    checkpoint.update(results("a", "b"))
+
+    assert checkpoint.is_complete(BLUEPRINT, "app/dev")
+    assert not checkpoint.is_complete(BLUEPRINT, "app/prod")
+    assert set(checkpoint.acknowledged[BLUEPRINT]) == {"a", "b"}
+    checkpoint.close(BLUEPRINT)
+    assert checkpoint.is_complete(BLUEPRINT)
+
+
+def test_failed_entities_keep_their_unit_incomplete(tmp_path):
+    checkpoint = SyncCheckpoint(str(tmp_path / "checkpoint.json"), SCOPE)
+    checkpoint.track(BLUEPRINT, entity("a"), unit="app/dev")
+    checkpoint.track(BLUEPRINT, entity("b"), unit="app/dev")
+    checkpoint.close(BLUEPRINT, "app/dev")
+    checkpoint.close(BLUEPRINT)
+
+    checkpoint.update(results("a"))
+
+    assert not checkpoint.is_complete(BLUEPRINT, "app/dev")
+    assert not checkpoint.is_complete(BLUEPRINT)
+    assert list(checkpoint.queued[BLUEPRINT]) == ["b"]
+
+
+def test_two_phase_entities_are_acknowledged_with_their_second_write(tmp_path):
+    checkpoint = SyncCheckpoint(str(tmp_path / "checkpoint.json"), SCOPE)
+    checkpoint.track(BLUEPRINT, entity("a"), writes=2)
+    checkpoint.close(BLUEPRINT)
+
+    checkpoint.update(results("a"))
+    assert "a" not in checkpoint.acknowledged.get(BLUEPRINT, {})
+    checkpoint.update(results("a", "a"))
+
+    assert "a" in checkpoint.acknowledged[BLUEPRINT]
+    assert checkpoint.is_complete(BLUEPRINT)
+
+
+def test_resume_restores_progress_and_pending_entities(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = SyncCheckpoint(path, SCOPE)
+    written, queued = entity("a", status="Active"), entity("b", status="Active")
+    checkpoint.track(BLUEPRINT, written, unit="app/dev")
+    checkpoint.track(BLUEPRINT, queued, unit="app/prod")
+    checkpoint.close(BLUEPRINT, "app/dev")
+    checkpoint.update(results("a"))
+    checkpoint.save({BLUEPRINT: [queued]})
+
+    resumed = SyncCheckpoint(path, SCOPE)
+    assert resumed.load()
+
+    assert resumed.resumed
+    assert resumed.is_complete(BLUEPRINT, "app/dev")
+    assert not resumed.is_complete(BLUEPRINT, "app/prod")
+    assert resumed.is_acknowledged(BLUEPRINT, written)
+    assert not resumed.is_acknowledged(BLUEPRINT, entity("a", status="Failed"))
+    assert resumed.stats["skipped"] == 1
+    pending = resumed.take_pending()
+    assert pending == {
+        BLUEPRINT: [{"hash": resumed.serializer.hash(queued), "entity": queued}]
+    }
+    assert resumed.take_pending() == {}
+
+
+def test_checkpoints_of_another_scope_are_ignored(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = SyncCheckpoint(path, SCOPE)
+    checkpoint.track(BLUEPRINT, entity("a"))
+    checkpoint.close(BLUEPRINT)
+    checkpoint.update(results("a"))
+    checkpoint.save({})
+
+    other = SyncCheckpoint(path, {"blueprints": ["humanitecWorkload"]})
+
+    assert not other.load()
+    assert not other.resumed
+    assert not other.is_complete(BLUEPRINT)
+    assert not SyncCheckpoint(str(tmp_path / "missing.json"), SCOPE).load()
+
+
+def test_acknowledged_entities_are_committed_to_the_state(tmp_path):
+    checkpoint = SyncCheckpoint(str(tmp_path / "checkpoint.json"), SCOPE)
+    state = SyncState(str(tmp_path / "state.json"))
+    written, changed = entity("a"), entity("b")
+    for identifier, hashed in (("a", written), ("b", changed)):
+        checkpoint.acknowledge(
+            BLUEPRINT, identifier, checkpoint.serializer.hash(hashed)
+        )
+
+    # What a resumed run does for the entities of the interrupted run
+    for identifier, entity_hash in checkpoint.acknowledged[BLUEPRINT].items():
+        state.confirm(BLUEPRINT, identifier, entity_hash)
+    # b changed since and its write failed
+    assert state.should_write(BLUEPRINT, entity("b", status="Failed"))
+    state.commit({})
+
+    assert set(state.entities[BLUEPRINT]) == {"a"}
+    assert not state.should_write(BLUEPRINT, written)
@@ -0,0 +1,70 @@
+import asyncio
+
+import daemon
+from daemon import SyncDaemon
+
+
+class FakeExporter:
+    def __init__(self) -> None:
+        self.synced = []
+
+    async def sync_environment(self, app_id: str, env_id: str) -> None:
+        self.synced.append((app_id, env_id))
+
+
+async def send(sync_daemon: SyncDaemon, request: bytes) -> bytes:
+    server = await asyncio.start_server(sync_daemon.handle_connection, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), 5)
+        writer.close()
+    return response
+
+
+def webhook(body: bytes, headers: str = "") -> bytes:
+    return (
+        f"POST /webhook HTTP/1.1\r\n{headers}Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode() + body
+
+
+def test_accepts_authorized_events():
+    sync_daemon = SyncDaemon(FakeExporter(), secret="s", debounce=0)
+    response = asyncio.run(
+        send(
+            sync_daemon,
+            webhook(b'{"app_id": "a", "env_id": "e"}', "Authorization: Bearer s\r\n"),
+        )
+    )
+    assert response.startswith(b"HTTP/1.1 202")
+    assert sync_daemon.stats["events"] == 1
+
+
+def test_rejects_events_without_the_secret():
+    sync_daemon = SyncDaemon(FakeExporter(), secret="s")
+    response = asyncio.run(
+        send(sync_daemon, webhook(b'{"app_id": "a", "env_id": "e"}'))
+    )
+    assert response.startswith(b"HTTP/1.1 401")
+    assert sync_daemon.stats["events"] == 0
+
+
+def test_rejects_oversized_bodies_without_reading_them():
+    request = (
+        "POST /webhook HTTP/1.1\r\n"
+        f"Content-Length: {daemon.MAX_BODY_SIZE + 1}\r\n\r\n"
+    ).encode()
+    response = asyncio.run(send(SyncDaemon(FakeExporter()), request))
+    assert response.startswith(b"HTTP/1.1 413")
+
+
+def test_closes_connections_of_slow_clients(monkeypatch):
+    monkeypatch.setattr(daemon, "READ_TIMEOUT", 0.1)
+    # The headers are never completed
+    response = asyncio.run(
+        send(SyncDaemon(FakeExporter()), b"POST /webhook HTTP/1.1\r\n")
+    )
+    assert response == b""
@@ -0,0 +1,107 @@
+import copy
+import json
+import os
+
+import pytest
+from loguru import logger
+
+from main import BLUEPRINT, BLUEPRINTS_FILE, RESOURCES_DIR
+from mapping import EntityMapper
+from mapping_benchmark import LEGACY, build_contexts
+from synthetic_org import SyntheticOrg
+
+MAPPINGS_FILE = os.path.join(RESOURCES_DIR, "mappings.json")
+
+with open(MAPPINGS_FILE) as mappings_file:
+    MAPPED_BLUEPRINTS = sorted(json.load(mappings_file))
+
+
+def build_edge_contexts(org: SyntheticOrg):
+    """Contexts the synthetic organization does not produce on its own."""
+    application = {**org.applications[0], "name": "my-app_v2 (beta)"}
+    environment = {
+        key: value
+        for key, value in org.environments[application["id"]][0].items()
+        if key != "last_deploy"
+    }
+    resource = org.resources[(application["id"], environment["id"])][-1]
+    return {
+        BLUEPRINT.APPLICATION: [{"application": application}],
+        BLUEPRINT.ENVIRONMENT: [
+            {"application": application, "environment": environment}
+        ],
+        BLUEPRINT.RESOURCE: [
+            {"resource": {**resource, "res_id": "shared.dns"}},
+            {"resource": {**resource, "__resourceGraph": [{"guresid": "g"}]}},
+        ],
+    }
+
+
+@pytest.fixture(scope="module")
+def mapper():
+    return EntityMapper.from_file(MAPPINGS_FILE)
+
+
+@pytest.fixture(scope="module")
+def contexts():
+    org = SyntheticOrg(apps=3, envs=3, resources=12, graph_nodes=6, payload_bytes=16)
+    contexts = build_contexts(org)
+    for blueprint_id, edge_contexts in build_edge_contexts(org).items():
+        contexts[blueprint_id].extend(edge_contexts)
+    return contexts
+
+
+def test_every_mapped_blueprint_has_a_reference():
+    assert MAPPED_BLUEPRINTS == sorted(LEGACY)
+
+
+@pytest.mark.parametrize("blueprint_id", MAPPED_BLUEPRINTS)
+def test_compiled_mapping_matches_reference(mapper, contexts, blueprint_id):
+    blueprint_contexts = contexts[blueprint_id]
+    assert blueprint_contexts
+    expected = [
+        LEGACY[blueprint_id](copy.deepcopy(context)) for context in blueprint_contexts
+    ]
+
+    assert [
+        mapper.map(blueprint_id, copy.deepcopy(context))
+        for context in blueprint_contexts
+    ] == expected
+    assert mapper.map_batch(blueprint_id, copy.deepcopy(blueprint_contexts)) == expected
+
+
+def test_check_blueprints_warns_about_undefined_properties(tmp_path):
+    mapper = EntityMapper(
+        {
+            BLUEPRINT.APPLICATION: {
+                "identifier": "application.id",
+                "properties": {"createdAt": "application.created_at"},
+            }
+        }
+    )
+    blueprints_file = tmp_path / "blueprints.json"
+    blueprints_file.write_text(
+        json.dumps(
+            [{"identifier": BLUEPRINT.APPLICATION, "schema": {"properties": {}}}]
+        )
+    )
+    records = []
+    handler_id = logger.add(records.append, level="WARNING")
+    try:
+        mapper.check_blueprints(str(blueprints_file))
+    finally:
+        logger.remove(handler_id)
+
+    assert len(records) == 1
+    assert "createdAt" in records[0]
+
+
+def test_shipped_blueprints_match_the_mappings():
+    records = []
+    handler_id = logger.add(records.append, level="WARNING")
+    try:
+        EntityMapper.from_file(MAPPINGS_FILE).check_blueprints(BLUEPRINTS_FILE)
+    finally:
+        logger.remove(handler_id)
+
+    assert records == []
@@ -0,0 +1,89 @@
+import random
+
+from model import order_graph_nodes
+
+
+def node(guresid: str, *depends_on: str):
+    return {"guresid": guresid, "depends_on": list(depends_on)}
+
+
+def wave_ids(waves):
+    return [sorted(item["guresid"] for item in wave) for wave in waves]
+
+
+def test_dependencies_come_first():
+    nodes = [node("app", "db", "dns"), node("db", "vpc"), node("dns"), node("vpc")]
+
+    waves, cyclic = order_graph_nodes(nodes)
+
+    assert wave_ids(waves) == [["dns", "vpc"], ["db"], ["app"]]
+    assert cyclic == set()
+
+
+def test_cycles_share_a_wave_after_their_dependencies():
+    nodes = [
+        node("a", "b", "base"),
+        node("b", "c"),
+        node("c", "a"),
+        node("base"),
+        node("top", "a"),
+    ]
+
+    waves, cyclic = order_graph_nodes(nodes)
+
+    assert wave_ids(waves) == [["base"], ["a", "b", "c"], ["top"]]
+    assert cyclic == {"a", "b", "c"}
+
+
+def test_self_loops_are_cyclic():
+    waves, cyclic = order_graph_nodes([node("a", "a"), node("b", "a")])
+
+    assert wave_ids(waves) == [["a"], ["b"]]
+    assert cyclic == {"a"}
+
+
+def test_unknown_dependencies_are_ignored():
+    nodes = [node("a", "elsewhere"), {"guresid": "b", "depends_on": None}]
+
+    waves, cyclic = order_graph_nodes(nodes)
+
+    assert wave_ids(waves) == [["a", "b"]]
+    assert cyclic == set()
+    assert order_graph_nodes([]) == ([], set())
+
+
+def test_deep_chains_do_not_recurse():
+    nodes = [node(str(index), str(index + 1)) for index in range(5000)]
+
+    waves, cyclic = order_graph_nodes(nodes)
+
+    assert len(waves) == 5000
+    assert waves[0][0]["guresid"] == "4999"
+    assert cyclic == set()
+
+
+def test_random_graphs_are_ordered():
+    generator = random.Random(8)
+    for _ in range(20):
+        ids = [str(index) for index in range(40)]
+        nodes = [
+            node(node_id, *generator.sample(ids, generator.randint(0, 3)))
+            for node_id in ids
+        ]
+
+        waves, cyclic = order_graph_nodes(nodes)
+
+        wave_of = {
+            item["guresid"]: position
+            for position, wave in enumerate(waves)
+            for item in wave
+        }
+        assert sorted(wave_of) == sorted(ids)
+        for item in nodes:
+            for dependency in item["depends_on"]:
+                if dependency == item["guresid"]:
+                    assert dependency in cyclic
+                elif wave_of[dependency] >= wave_of[item["guresid"]]:
+                    # Only the nodes of a cycle share their wave
+                    assert wave_of[dependency] == wave_of[item["guresid"]]
+                    assert {dependency, item["guresid"]} <= cyclic
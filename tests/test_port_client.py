@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import httpx
+
+from clients.port_client import PortClient, PortTokenManager
+
+CONCURRENT_REQUESTS = 10
+
+
+class FakePort:
+    """
+    Issues numbered tokens and rejects the stale one. Rejections are held back
+    until every request reached the server, so that all of them see a 401.
+    """
+
+    def __init__(self) -> None:
+        self.token_requests = 0
+        self.stale_requests = 0
+        self.all_stale = asyncio.Event()
+        self.authorizations = []
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/auth/access_token"):
+            self.token_requests += 1
+            await asyncio.sleep(0.01)
+            return httpx.Response(
+                200, json={"accessToken": f"token-{self.token_requests}"}
+            )
+        authorization = request.headers["Authorization"]
+        self.authorizations.append(authorization)
+        if authorization == "Bearer stale":
+            self.stale_requests += 1
+            if self.stale_requests == CONCURRENT_REQUESTS:
+                self.all_stale.set()
+            await self.all_stale.wait()
+            return httpx.Response(401, json={"ok": False})
+        return httpx.Response(200, json={"ok": True})
+
+
+def make_client(fake_port: FakePort) -> PortClient:
+    return PortClient(
+        "id",
+        "secret",
+        httpx_async_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(fake_port.handle)
+        ),
+        base_url="https://port.test/v1",
+    )
+
+
+def test_concurrent_401s_refresh_the_token_once():
+    async def run():
+        fake_port = FakePort()
+        port_client = make_client(fake_port)
+        # A token that is still valid locally but that Port already revoked
+        port_client.token_manager.access_token = "stale"
+        port_client.token_manager.expires_at = time.monotonic() + 3600
+        responses = await asyncio.gather(
+            *(
+                port_client.upsert_entity("blueprint", {"identifier": str(index)})
+                for index in range(CONCURRENT_REQUESTS)
+            )
+        )
+        return fake_port, port_client, responses
+
+    fake_port, port_client, responses = asyncio.run(run())
+
+    assert responses == [{"ok": True}] * CONCURRENT_REQUESTS
+    assert fake_port.token_requests == 1
+    assert fake_port.authorizations.count("Bearer token-1") == CONCURRENT_REQUESTS
+    assert port_client.token_manager.stats["token_requests"] == 1
+    assert (
+        port_client.token_manager.stats["unauthorized_retries"] == CONCURRENT_REQUESTS
+    )
+
+
+def test_concurrent_callers_share_one_token_request():
+    calls = []
+
+    async def fetch_token():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return {"accessToken": "token", "expiresIn": 3600}
+
+    async def run():
+        token_manager = PortTokenManager(fetch_token)
+        tokens = await asyncio.gather(*(token_manager.get_token() for _ in range(5)))
+        return token_manager, tokens
+
+    token_manager, tokens = asyncio.run(run())
+
+    assert tokens == ["token"] * 5
+    assert len(calls) == 1
+    assert token_manager.stats == {
+        "token_requests": 1,
+        "cache_hits": 4,
+        "unauthorized_retries": 0,
+    }
+
+
+def test_tokens_are_refreshed_before_they_expire():
+    responses = iter(
+        [{"accessToken": "first", "expiresIn": 30}, {"accessToken": "second"}]
+    )
+
+    async def fetch_token():
+        return next(responses)
+
+    async def run():
+        token_manager = PortTokenManager(fetch_token, refresh_margin=60)
+        return [await token_manager.get_token(), await token_manager.get_token()]
+
+    # The first token expires within the refresh margin and is replaced
+    assert asyncio.run(run()) == ["first", "second"]
+
+
+def test_invalidate_ignores_tokens_already_replaced():
+    token_manager = PortTokenManager(lambda: None)  # type: ignore[arg-type,return-value]
+    token_manager.access_token = "current"
+    token_manager.expires_at = time.monotonic() + 3600
+
+    token_manager.invalidate("stale")
+    assert token_manager.is_valid()
+
+    token_manager.invalidate("current")
+    assert not token_manager.is_valid()
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Dict, List, Set, Tuple
+
+from main import BLUEPRINT, RECONCILE_ORDER
+from reconciler import Reconciler
+
+
+class FakePortClient:
+    """Serves the identifiers stored in Port and records the deletions."""
+
+    def __init__(
+        self, existing: Dict[str, Set[str]], failing: Set[str] | None = None
+    ) -> None:
+        self.existing = existing
+        self.failing = failing or set()
+        self.listed: List[str] = []
+        self.deleted: List[Tuple[str, List[str]]] = []
+
+    async def get_entity_identifiers(self, blueprint_id: str) -> Set[str]:
+        self.listed.append(blueprint_id)
+        return set(self.existing.get(blueprint_id, set()))
+
+    async def delete_entities(self, blueprint_id: str, identifiers: List[str]) -> None:
+        # Yields so that batches of one blueprint interleave
+        await asyncio.sleep(0)
+        if blueprint_id in self.failing:
+            raise RuntimeError("delete failed")
+        self.deleted.append((blueprint_id, identifiers))
+
+
+def identifiers(prefix: str, count: int) -> Set[str]:
+    return {f"{prefix}-{index}" for index in range(count)}
+
+
+def reconcile(
+    port_client: FakePortClient,
+    seen: Dict[str, Set[str]],
+    crawl_complete: bool = True,
+    **kwargs,
+) -> Reconciler:
+    reconciler = Reconciler(port_client, RECONCILE_ORDER, **kwargs)  # type: ignore[arg-type]
+    asyncio.run(reconciler.reconcile(seen, crawl_complete=crawl_complete))
+    return reconciler
+
+
+def test_deletes_orphans_up_to_the_threshold():
+    existing = {BLUEPRINT.APPLICATION: identifiers("app", 10)}
+    seen = {BLUEPRINT.APPLICATION: identifiers("app", 7)}
+    port_client = FakePortClient(existing)
+
+    reconciler = reconcile(port_client, seen, max_delete_ratio=0.3)
+
+    assert port_client.deleted == [(BLUEPRINT.APPLICATION, ["app-7", "app-8", "app-9"])]
+    assert reconciler.stats[BLUEPRINT.APPLICATION] == {
+        "orphans": 3,
+        "deleted": 3,
+        "failed": 0,
+    }
+
+
+def test_refuses_to_delete_above_the_threshold():
+    existing = {
+        BLUEPRINT.APPLICATION: identifiers("app", 10),
+        BLUEPRINT.RESOURCE: identifiers("resource", 10),
+    }
+    # Few resources disappeared, but 4 of 10 applications did
+    seen = {
+        BLUEPRINT.APPLICATION: identifiers("app", 6),
+        BLUEPRINT.RESOURCE: identifiers("resource", 9),
+    }
+    port_client = FakePortClient(existing)
+
+    reconciler = reconcile(port_client, seen, max_delete_ratio=0.3)
+
+    assert port_client.deleted == []
+    assert reconciler.stats == {}
+
+
+def test_skips_a_partial_crawl():
+    existing = {BLUEPRINT.APPLICATION: identifiers("app", 10)}
+    port_client = FakePortClient(existing)
+
+    reconciler = reconcile(port_client, {}, crawl_complete=False)
+
+    assert port_client.listed == []
+    assert port_client.deleted == []
+    assert reconciler.stats == {}
+
+
+def test_deletes_children_before_parents():
+    existing = {
+        blueprint_id: identifiers(blueprint_id, 10) for blueprint_id in RECONCILE_ORDER
+    }
+    seen = {
+        blueprint_id: identifiers(blueprint_id, 7) for blueprint_id in RECONCILE_ORDER
+    }
+    port_client = FakePortClient(existing)
+
+    reconcile(port_client, seen, batch_size=1, max_concurrency=3)
+
+    deleted_blueprints = [blueprint_id for blueprint_id, _ in port_client.deleted]
+    assert deleted_blueprints == [
+        blueprint_id for blueprint_id in RECONCILE_ORDER for _ in range(3)
+    ]
+    assert RECONCILE_ORDER.index(BLUEPRINT.RESOURCE) < RECONCILE_ORDER.index(
+        BLUEPRINT.WORKLOAD
+    )
+    assert RECONCILE_ORDER[-1] == BLUEPRINT.APPLICATION
+
+
+def test_counts_failed_deletions():
+    existing = {BLUEPRINT.RESOURCE: identifiers("resource", 10)}
+    seen = {BLUEPRINT.RESOURCE: identifiers("resource", 8)}
+    port_client = FakePortClient(existing, failing={BLUEPRINT.RESOURCE})
+
+    reconciler = reconcile(port_client, seen, batch_size=1)
+
+    assert reconciler.stats[BLUEPRINT.RESOURCE] == {
+        "orphans": 2,
+        "deleted": 0,
+        "failed": 2,
+    }
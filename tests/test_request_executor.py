@@ -0,0 +1,188 @@
+import asyncio
+import email.utils
+import time
+
+import httpx
+import pytest
+
+from clients import request_executor
+from clients.request_executor import (
+    AdaptiveConcurrencyLimiter,
+    RequestExecutor,
+    TokenBucket,
+)
+
+URL = "https://api.test/items"
+
+
+class FakeServer:
+    """Answers requests with the given responses in turn, the last one repeating."""
+
+    def __init__(self, *responses) -> None:
+        self.responses = list(responses)
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.responses[min(len(self.requests), len(self.responses)) - 1]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def send(server: FakeServer, method: str = "GET", **kwargs):
+    idempotent = kwargs.pop("idempotent", None)
+    kwargs.setdefault("backoff_base", 0)
+
+    async def run():
+        executor = RequestExecutor(
+            httpx.AsyncClient(transport=httpx.MockTransport(server.handle)), **kwargs
+        )
+        return executor, await executor.request(method, URL, idempotent=idempotent)
+
+    return asyncio.run(run())
+
+
+def test_token_bucket_limits_the_rate_after_the_burst():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=2)
+        started_at = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        return time.monotonic() - started_at
+
+    # Two requests pass at once, the other four wait 1/50s each
+    assert asyncio.run(run()) >= 0.07
+
+
+def test_token_bucket_pause_blocks_callers():
+    async def run():
+        bucket = TokenBucket(rate=0)
+        bucket.pause(0.05)
+        started_at = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started_at
+
+    assert asyncio.run(run()) >= 0.04
+
+
+def test_concurrency_limit_grows_additively_and_halves_when_throttled():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(max_concurrency=8, min_concurrency=2)
+        limits = []
+        for throttled in (True, True, True, False, False):
+            await limiter.acquire()
+            await limiter.release(throttled)
+            limits.append(limiter.limit)
+        return limiter, limits
+
+    limiter, limits = asyncio.run(run())
+
+    assert limits[:3] == [4.0, 2.0, 2.0]
+    assert limits[3] == pytest.approx(2.5)
+    assert limits[4] == pytest.approx(2.9)
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_limit_blocks_above_the_limit():
+    async def run():
+        limiter = AdaptiveConcurrencyLimiter(max_concurrency=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0.01)
+        blocked = not waiter.done()
+        await limiter.release()
+        await asyncio.wait_for(waiter, 1)
+        return blocked
+
+    assert asyncio.run(run())
+
+
+def test_429_waits_for_retry_after():
+    server = FakeServer(
+        httpx.Response(429, headers={"Retry-After": "0.05"}), httpx.Response(200)
+    )
+    started_at = time.monotonic()
+
+    executor, response = send(server, "POST", max_concurrency=4)
+
+    assert response.status_code == 200
+    assert time.monotonic() - started_at >= 0.04
+    # Throttled requests are retried whatever the method
+    assert len(server.requests) == 2
+    stats = executor.summary()["api.test"]
+    assert stats["throttled"] == 1
+    assert stats["retries"] == 1
+    assert stats["concurrency_limit"] == pytest.approx(2.5)
+
+
+def test_parse_retry_after():
+    retry_at = email.utils.formatdate(time.time() + 30, usegmt=True)
+
+    assert RequestExecutor.parse_retry_after("2.5") == 2.5
+    assert RequestExecutor.parse_retry_after("-1") == 0.0
+    assert 25 < RequestExecutor.parse_retry_after(retry_at) <= 30
+    assert RequestExecutor.parse_retry_after("soon") is None
+    assert RequestExecutor.parse_retry_after(None) is None
+
+
+def test_backoff_is_jittered_and_capped(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(
+        request_executor.random, "uniform", lambda low, high: bounds.append((low, high))
+    )
+    executor = RequestExecutor(httpx.AsyncClient(), backoff_base=0.5, backoff_max=3.0)
+
+    for attempt in range(4):
+        executor.get_backoff(attempt)
+
+    assert bounds == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 3.0)]
+
+
+def test_idempotent_requests_are_retried_after_server_errors():
+    server = FakeServer(httpx.Response(503), httpx.Response(503), httpx.Response(200))
+
+    executor, response = send(server, "GET")
+
+    assert response.status_code == 200
+    assert len(server.requests) == 3
+    assert executor.summary()["api.test"]["server_errors"] == 2
+
+
+def test_server_errors_are_returned_once_retries_are_exhausted():
+    server = FakeServer(httpx.Response(502))
+
+    _, response = send(server, "GET", max_retries=2)
+
+    assert response.status_code == 502
+    assert len(server.requests) == 3
+
+
+def test_non_idempotent_requests_are_not_retried():
+    server = FakeServer(httpx.Response(503), httpx.Response(200))
+
+    _, response = send(server, "POST")
+
+    assert response.status_code == 503
+    assert len(server.requests) == 1
+
+
+def test_post_marked_idempotent_is_retried():
+    server = FakeServer(httpx.Response(503), httpx.Response(200))
+
+    _, response = send(server, "POST", idempotent=True)
+
+    assert response.status_code == 200
+    assert len(server.requests) == 2
+
+
+def test_transport_errors_are_only_retried_for_idempotent_requests():
+    error = httpx.ConnectError("connection refused")
+
+    _, response = send(FakeServer(error, httpx.Response(200)), "PUT")
+    assert response.status_code == 200
+
+    server = FakeServer(error, httpx.Response(200))
+    with pytest.raises(httpx.ConnectError):
+        send(server, "POST")
+    assert len(server.requests) == 1